@@ -0,0 +1,522 @@
+#!/usr/bin/env python3
+"""
+Asteroid Miner benchmarks
+Runs reproducible playing-state scenarios and prints per-phase timings as JSON
+
+    python benchmarks/run_benchmarks.py [--quick] [--only NAME,NAME] [--out FILE] [--no-render]
+
+Simulation phases come from Simulation.timer and render passes from
+WorldRenderer.timer, drawn offscreen with SDL's dummy video driver.
+"""
+import os
+import sys
+import json
+import math
+import contextlib
+import time
+import random
+import socket
+import platform
+import tempfile
+import threading
+import multiprocessing
+
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+os.environ.setdefault("PYGAME_HIDE_SUPPORT_PROMPT", "1")
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import pygame
+import main
+import server
+import protocol
+
+SEED = 1234
+SCREEN_SIZE = (1920, 1080)
+RENDER_EVERY = 2  # Sim ticks per rendered frame, 120 Hz sim at 60 fps
+
+
+# ==================== WORLD BUILDERS ====================
+def new_world(rng, backend="list"):
+    """Fresh game state with the starting asteroids removed"""
+    gs = main.create_new_game_state(backend, rng=rng)
+    for asteroid in list(gs["asteroids"]):
+        gs["asteroids"].remove(asteroid)
+    return gs
+
+def fill_asteroids(gs, count, rng, spread=1000.0, health=None):
+    """Scatter count asteroids around the ship, inside the despawn distance"""
+    for _ in range(count):
+        ang = rng.uniform(0, 2 * math.pi)
+        dist = spread * math.sqrt(rng.random())
+        radius = rng.randint(main.MIN_ASTEROID_RADIUS, 24)
+        hp = health if health is not None else rng.randint(6, 18)
+        asteroid = main.Asteroid(gs["worldxposition"] + math.cos(ang) * dist,
+                                 gs["worldyposition"] + math.sin(ang) * dist,
+                                 rng.uniform(-30, 30), rng.uniform(-30, 30),
+                                 health=hp, golden=rng.random() < 0.08, rng=rng)
+        asteroid.radius = radius
+        gs["asteroids"].append(asteroid)
+
+def fill_loot(gs, count, rng, spread=1000.0):
+    mats = list(main.MATERIAL_COLORS)
+    for _ in range(count):
+        ang = rng.uniform(0, 2 * math.pi)
+        dist = 60 + spread * math.sqrt(rng.random())
+        mat = rng.choice(mats)
+        gs["floating_loot"].append({
+            "mat": mat,
+            "x": gs["worldxposition"] + math.cos(ang) * dist,
+            "y": gs["worldyposition"] + math.sin(ang) * dist,
+            "vx": 0.0,
+            "vy": 0.0,
+            "color": list(main.MATERIAL_COLORS[mat]),
+            "lifetime": -1,
+        })
+
+def fill_cargo(gs, rng):
+    capacity = 5 + 5 * gs["upgrades"].get("storage", 0)
+    mats = list(main.MATERIAL_COLORS)
+    while len(gs["carried_items"]) < capacity:
+        mat = rng.choice(mats)
+        gs["carried_items"].append({
+            "mat": mat,
+            "rel_angle": math.pi + rng.uniform(-0.8, 0.8),
+            "ang_vel": rng.uniform(-1.0, 1.0),
+            "length": 55 + rng.uniform(-10, 15),
+            "color": list(main.MATERIAL_COLORS[mat]),
+        })
+
+def equip(gs, power, level=5):
+    gs["powers"] = {"owned": [power], "equipped": power, "levels": {power: level}}
+
+def bullet_ring(count, speed=main.BULLET_SPEED):
+    """Per-tick hook that fires count bullets in a ring around the ship"""
+    def hook(sim, tick):
+        gs = sim.gs
+        for k in range(count):
+            ang = (tick * 0.37 + k / count) * 2 * math.pi
+            gs["bullets"].spawn(gs["worldxposition"], gs["worldyposition"],
+                                math.cos(ang) * speed, math.sin(ang) * speed, main.BULLET_LIFE)
+    return hook
+
+
+# ==================== SCENARIOS ====================
+# Each builder returns (game_state, options). Options: ticks, inputs, hook,
+# max_asteroids (spawner ceiling, defaults to the starting count).
+STEADY = {"rotate": 1, "thrust": False, "fire": True}
+CRUISE = {"rotate": 1, "thrust": True, "fire": True}
+
+def asteroid_field(count, backend="list"):
+    def build(rng):
+        gs = new_world(rng, backend)
+        fill_asteroids(gs, count, rng)
+        ticks = max(20, min(600, 120000 // count))
+        return gs, {"ticks": ticks, "inputs": STEADY}
+    return build
+
+def ultra_fire_auto_aim_storm(rng):
+    # Only one power can be equipped, so Auto Aim steers a ring volley at Ultra Fire rates
+    gs = new_world(rng)
+    fill_asteroids(gs, 500, rng)
+    equip(gs, "auto_aim")
+    return gs, {"ticks": 240, "inputs": STEADY, "hook": bullet_ring(12)}
+
+def ultra_fire(rng):
+    gs = new_world(rng)
+    fill_asteroids(gs, 250, rng)
+    equip(gs, "ultra_fire")
+    gs["upgrades"]["shoot_speed"] = 10
+    return gs, {"ticks": 600, "inputs": STEADY}
+
+def bullet_split_chain(rng):
+    gs = new_world(rng)
+    fill_asteroids(gs, 400, rng, spread=500.0, health=400)
+    equip(gs, "bullet_split")
+    return gs, {"ticks": 240, "inputs": STEADY, "hook": bullet_ring(4)}
+
+def explosive_chain(rng):
+    gs = new_world(rng)
+    fill_asteroids(gs, 400, rng, spread=500.0, health=400)
+    equip(gs, "explosive_shots")
+    return gs, {"ticks": 240, "inputs": STEADY, "hook": bullet_ring(4)}
+
+def full_cargo(rng):
+    gs = new_world(rng)
+    gs["upgrades"]["storage"] = 10
+    fill_cargo(gs, rng)
+    fill_asteroids(gs, 28, rng)
+    return gs, {"ticks": 1200, "inputs": CRUISE}
+
+def loot_field(rng):
+    # Cargo is full so the field stays put and every item is updated each tick
+    gs = new_world(rng)
+    fill_cargo(gs, rng)
+    fill_loot(gs, 5000, rng)
+    fill_asteroids(gs, 28, rng)
+    return gs, {"ticks": 240, "inputs": STEADY}
+
+def loot_trail(rng):
+    # A long session: loot never despawns, so most of it is far off-screen
+    gs = new_world(rng)
+    fill_cargo(gs, rng)
+    fill_loot(gs, 5000, rng, spread=8000.0)
+    fill_asteroids(gs, 28, rng)
+    return gs, {"ticks": 240, "inputs": STEADY}
+
+SIM_SCENARIOS = {
+    "asteroids_28": asteroid_field(28),
+    "asteroids_250": asteroid_field(250),
+    "asteroids_1000": asteroid_field(1000),
+    "asteroids_10000": asteroid_field(10000),
+    "ultra_fire": ultra_fire,
+    "auto_aim_bullet_storm": ultra_fire_auto_aim_storm,
+    "bullet_split_chain": bullet_split_chain,
+    "explosive_chain": explosive_chain,
+    "full_cargo": full_cargo,
+    "loot_field": loot_field,
+    "loot_trail": loot_trail,
+}
+if main.np is not None:
+    SIM_SCENARIOS["asteroids_10000_numpy"] = asteroid_field(10000, "numpy")
+
+
+# ==================== RUNNERS ====================
+def per_tick_ms(totals, count):
+    return {phase: round(1000.0 * secs / count, 4) for phase, secs in sorted(totals.items())}
+
+def run_sim_scenario(build, quick=False, renderer=None):
+    rng = random.Random(SEED)
+    gs, options = build(rng)
+    sim = main.Simulation(gs, seed=SEED, view_size=SCREEN_SIZE)
+    sim.max_asteroids = options.get("max_asteroids", max(len(gs["asteroids"]), main.MAX_ASTEROIDS))
+    sim.timer.enabled = True
+    ticks = options["ticks"] // 4 if quick else options["ticks"]
+    ticks = max(ticks, RENDER_EVERY)
+    hook = options.get("hook")
+    sim.inputs = options["inputs"]
+
+    frames = 0
+    render_secs = 0.0
+    if renderer is not None:
+        renderer.timer.enabled = True
+        renderer.timer.reset()
+
+    sim_secs = 0.0
+    for tick in range(ticks):
+        if hook is not None:
+            hook(sim, tick)
+        start = time.perf_counter()
+        sim.step(sim.dt_fixed)
+        sim_secs += time.perf_counter() - start
+        if renderer is not None and tick % RENDER_EVERY == 0:
+            start = time.perf_counter()
+            renderer.draw(gs, gs["worldxposition"], gs["worldyposition"], gs["player"].rotation,
+                          player_name="bench", thrusting=sim.inputs.get("thrust", False),
+                          dt=sim.dt_fixed * RENDER_EVERY, sparkle_emitters=sim.sparkle_emitters)
+            render_secs += time.perf_counter() - start
+            frames += 1
+
+    result = {
+        "ticks": ticks,
+        "sim_ms_per_tick": round(1000.0 * sim_secs / ticks, 4),
+        "phases_ms_per_tick": per_tick_ms(sim.timer.totals, ticks),
+        "final": {
+            "asteroids": len(gs["asteroids"]),
+            "bullets": len(gs["bullets"]),
+            "floating_loot": len(gs["floating_loot"]),
+            "carried_items": len(gs["carried_items"]),
+        },
+    }
+    if frames:
+        result["frames"] = frames
+        result["render_ms_per_frame"] = round(1000.0 * render_secs / frames, 4)
+        result["render_passes_ms_per_frame"] = per_tick_ms(renderer.timer.totals, frames)
+        result["render_counts_per_frame"] = {name: round(n / frames, 1)
+                                             for name, n in sorted(renderer.timer.counters.items())}
+    return result
+
+def run_save_load(quick=False):
+    """save_world/load_world round trips of a big world"""
+    rng = random.Random(SEED)
+    gs = new_world(rng)
+    fill_asteroids(gs, 10000, rng, spread=5000.0)
+    fill_loot(gs, 5000, rng, spread=5000.0)
+    rounds = 1 if quick else 3
+
+    saves_dir = main.SAVES_DIR
+    main.SAVES_DIR = tempfile.mkdtemp(prefix="asteroidminer-bench-")
+    try:
+        save_secs = 0.0
+        load_secs = 0.0
+        for _ in range(rounds):
+            start = time.perf_counter()
+            main.save_world("bench", gs)
+            save_secs += time.perf_counter() - start
+            start = time.perf_counter()
+            loaded = main.load_game_state_from_data(main.load_world("bench"))
+            load_secs += time.perf_counter() - start
+        size = os.path.getsize(os.path.join(main.SAVES_DIR, "bench.json"))
+        main.delete_world("bench")
+        os.rmdir(main.SAVES_DIR)
+    finally:
+        main.SAVES_DIR = saves_dir
+
+    return {
+        "rounds": rounds,
+        "phases_ms_per_round": {
+            "save": round(1000.0 * save_secs / rounds, 4),
+            "load": round(1000.0 * load_secs / rounds, 4),
+        },
+        "file_bytes": size,
+        "final": {"asteroids": len(loaded["asteroids"]), "floating_loot": len(loaded["floating_loot"])},
+    }
+
+# ==================== SERVER ====================
+def flood_updates(port, clients, seconds):
+    """Sender process: join clients players, then send updates round robin as fast as possible"""
+    socks = []
+    for i in range(clients):
+        sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        sock.sendto(json.dumps({"type": "join", "name": f"bot{i}", "x": 0, "y": 0, "rotation": 0,
+                                "color_index": i % 6}).encode(), ("127.0.0.1", port))
+        socks.append(sock)
+    end = time.perf_counter() + seconds
+    n = 0
+    while time.perf_counter() < end:
+        for i, sock in enumerate(socks):
+            msg = json.dumps({"type": "update", "x": n * 0.5, "y": i * 10.0, "rotation": n * 0.01,
+                              "color_index": i % 6, "ship": "default"}).encode()
+            try:
+                sock.sendto(msg, ("127.0.0.1", port))
+            except OSError:
+                pass  # Local buffer full, the server is behind
+            n += 1
+
+def run_server_ingest(quick=False):
+    """Datagrams per second GameServer.run handles under a flood of player updates"""
+    clients = 40
+    senders = 2
+    seconds = 1.0 if quick else 3.0
+    game_server = server.GameServer(host="127.0.0.1", port=0)
+    thread = threading.Thread(target=game_server.run, daemon=True)
+    thread.start()
+
+    procs = [multiprocessing.Process(target=flood_updates, args=(game_server.port, clients // senders, seconds))
+             for _ in range(senders)]
+    for proc in procs:
+        proc.start()
+    time.sleep(seconds * 0.2)  # Let joins land and the queues fill
+    before = dict(game_server.stats)
+    start = time.perf_counter()
+    time.sleep(seconds * 0.6)
+    elapsed = time.perf_counter() - start
+    after = dict(game_server.stats)
+    for proc in procs:
+        proc.join()
+    game_server.stop()
+    thread.join(timeout=2.0)
+
+    def rate(key):
+        return round((after[key] - before[key]) / elapsed, 1)
+    return {
+        "clients": clients,
+        "seconds": round(elapsed, 3),
+        "packets_in_per_sec": rate("packets_in"),
+        "packets_out_per_sec": rate("packets_out"),
+        "wakeups_per_sec": rate("wakeups"),
+        "players": len(game_server.players),
+    }
+
+def run_protocol_codec(quick=False):
+    """Bytes and encode/decode time of one state broadcast, JSON against the binary protocol"""
+    rng = random.Random(SEED)
+    players = [{"id": f"192.168.1.{i}:{50000 + i}", "pid": i + 1, "name": f"Miner{i:03d}",
+                "x": rng.uniform(-20000, 20000), "y": rng.uniform(-20000, 20000),
+                "rotation": rng.uniform(0, 2 * math.pi), "color_index": i % 6,
+                "ship": protocol.SHIP_DESIGNS[i % len(protocol.SHIP_DESIGNS)]} for i in range(50)]
+    json_players = [{k: v for k, v in p.items() if k != "pid"} for p in players]
+    rounds = 200 if quick else 2000
+
+    def timed(fn):
+        start = time.perf_counter()
+        for _ in range(rounds):
+            out = fn()
+        return out, round(1e6 * (time.perf_counter() - start) / rounds, 2)
+
+    json_msg, json_encode = timed(lambda: json.dumps({"type": "state", "players": json_players}).encode())
+    _, json_decode = timed(lambda: json.loads(json_msg.decode()))
+    # A keyframe, with the snapshot the server builds once per broadcast
+    binary_msg, binary_encode = timed(
+        lambda: protocol.encode_state(1, {p["pid"]: protocol.snapshot_entry(p) for p in players}))
+    _, binary_decode = timed(lambda: protocol.decode(binary_msg))
+    update_json = json.dumps({"type": "update", "x": 1234.5, "y": -678.9, "rotation": 1.0,
+                              "color_index": 1, "ship": "arrow"}).encode()
+    update_binary = protocol.encode_update(1, protocol.NO_SEQ, 1234.5, -678.9, 1.0, 1, "arrow")
+    return {
+        "players": len(players),
+        "state_bytes": {"json": len(json_msg), "binary": len(binary_msg)},
+        "update_bytes": {"json": len(update_json), "binary": len(update_binary)},
+        "state_us": {"json_encode": json_encode, "json_decode": json_decode,
+                     "binary_encode": binary_encode, "binary_decode": binary_decode},
+    }
+
+class CaptureSocket:
+    """Stands in for GameServer's socket, counting what it would send"""
+
+    def __init__(self):
+        self.sent = []
+
+    def sendto(self, data, addr):
+        self.sent.append((addr, data))
+
+    def close(self):
+        pass
+
+def run_state_broadcast(quick=False):
+    """Bytes out per broadcast for 50 players with 10 moving, full JSON rosters against binary deltas"""
+    players = 50
+    moving = 10
+    broadcasts = 40 if quick else 200
+    result = {"players": players, "moving": moving, "broadcasts": broadcasts, "bytes_per_broadcast": {}}
+    for mode in ("json", "keyframes", "deltas"):
+        game_server = server.GameServer(host="127.0.0.1", port=0, interest_radius=1e9)  # Everyone in view
+        game_server.server.close()
+        game_server.server = CaptureSocket()
+        if mode == "keyframes":
+            game_server.keyframe_interval = 0.0
+        version = 0 if mode == "json" else protocol.PROTOCOL_VERSION
+        addrs = [("10.0.0.1", 40000 + i) for i in range(players)]
+        for i, addr in enumerate(addrs):
+            game_server.handle_message(json.dumps({"type": "join", "name": f"Miner{i:03d}", "color_index": i % 6,
+                                                   "protocol": version}).encode(), addr)
+        acks = {addr: protocol.NO_SEQ for addr in addrs}
+        seqs = {addr: protocol.NO_SEQ for addr in addrs}
+        sent_bytes = 0
+        start = time.perf_counter()
+        for tick in range(broadcasts):
+            for i, addr in enumerate(addrs):
+                x = i * 100.0 + (tick * 3.0 if i < moving else 0.0)
+                seqs[addr] = protocol.next_seq(seqs[addr])
+                if version:
+                    msg = protocol.encode_update(seqs[addr], acks[addr], x, 0.0, 0.0, i % 6, "default")
+                else:
+                    msg = json.dumps({"type": "update", "x": x, "y": 0.0, "rotation": 0.0,
+                                      "color_index": i % 6, "ship": "default"}).encode()
+                game_server.handle_message(msg, addr)
+            game_server.broadcast_state()
+            for addr, data in game_server.server.sent:
+                sent_bytes += len(data)
+                acks[addr] = game_server.broadcast_seq
+            game_server.server.sent.clear()
+        elapsed = time.perf_counter() - start
+        result["bytes_per_broadcast"][mode] = round(sent_bytes / broadcasts, 1)
+        result.setdefault("server_ms_per_broadcast", {})[mode] = round(1000.0 * elapsed / broadcasts, 3)
+    return result
+
+def run_interest_broadcast(quick=False):
+    """200 players over a 20k square, with and without area-of-interest filtering"""
+    rng = random.Random(SEED)
+    players = 200
+    broadcasts = 40 if quick else 200
+    start_positions = [(rng.uniform(-10000, 10000), rng.uniform(-10000, 10000)) for _ in range(players)]
+    result = {"players": players, "broadcasts": broadcasts}
+    for mode, radius in (("everyone", 1e9), ("interest", server.DEFAULT_INTEREST_RADIUS)):
+        game_server = server.GameServer(host="127.0.0.1", port=0, interest_radius=radius)
+        game_server.server.close()
+        game_server.server = CaptureSocket()
+        addrs = [("10.0.0.1", 40000 + i) for i in range(players)]
+        for i, addr in enumerate(addrs):
+            game_server.handle_message(json.dumps({"type": "join", "name": f"Miner{i:03d}", "color_index": i % 6,
+                                                   "protocol": protocol.PROTOCOL_VERSION}).encode(), addr)
+        acks = {addr: protocol.NO_SEQ for addr in addrs}
+        seqs = {addr: protocol.NO_SEQ for addr in addrs}
+        sent_bytes = 0
+        largest = 0
+        start = time.perf_counter()
+        for tick in range(broadcasts):
+            for i, addr in enumerate(addrs):
+                x, y = start_positions[i]
+                seqs[addr] = protocol.next_seq(seqs[addr])
+                game_server.handle_message(protocol.encode_update(
+                    seqs[addr], acks[addr], x + tick * 5.0, y, tick * 0.05, i % 6, "default"), addr)
+            game_server.broadcast_state()
+            for addr, data in game_server.server.sent:
+                sent_bytes += len(data)
+                largest = max(largest, len(data))
+                if data[0] in (protocol.MSG_STATE, protocol.MSG_FRAGMENT):  # Big states go out in fragments
+                    acks[addr] = game_server.broadcast_seq
+            game_server.server.sent.clear()
+        elapsed = time.perf_counter() - start
+        result[mode] = {
+            "bytes_per_broadcast": round(sent_bytes / broadcasts, 1),
+            "largest_datagram": largest,
+            "fragmented_messages": game_server.stats["fragmented"],
+            "server_ms_per_broadcast": round(1000.0 * elapsed / broadcasts, 3),
+        }
+    return result
+
+def make_renderer():
+    pygame.init()
+    screen = pygame.display.set_mode(SCREEN_SIZE)
+    asteroid_img = pygame.image.load(os.path.join(ROOT, "textures", "asteroid.png")).convert_alpha()
+    return main.WorldRenderer(screen, asteroid_img, pygame.font.SysFont(None, 24))
+
+def run(names=None, quick=False, render=True):
+    # The in-process GameServer logs joins with print(), keep stdout for the report
+    with contextlib.redirect_stdout(sys.stderr):
+        return run_scenarios(names, quick, render)
+
+def run_scenarios(names, quick, render):
+    renderer = make_renderer() if render else None
+    results = {}
+    for name, build in SIM_SCENARIOS.items():
+        if names and name not in names:
+            continue
+        print(f"running {name}...", file=sys.stderr)
+        results[name] = run_sim_scenario(build, quick, renderer)
+    if not names or "save_load" in names:
+        print("running save_load...", file=sys.stderr)
+        results["save_load"] = run_save_load(quick)
+    if not names or "server_ingest" in names:
+        print("running server_ingest...", file=sys.stderr)
+        results["server_ingest"] = run_server_ingest(quick)
+    if not names or "protocol_codec" in names:
+        print("running protocol_codec...", file=sys.stderr)
+        results["protocol_codec"] = run_protocol_codec(quick)
+    if not names or "state_broadcast" in names:
+        print("running state_broadcast...", file=sys.stderr)
+        results["state_broadcast"] = run_state_broadcast(quick)
+    if not names or "interest_broadcast" in names:
+        print("running interest_broadcast...", file=sys.stderr)
+        results["interest_broadcast"] = run_interest_broadcast(quick)
+    return {
+        "meta": {
+            "seed": SEED,
+            "quick": quick,
+            "sim_rate": main.SIM_RATE,
+            "screen": list(SCREEN_SIZE) if render else None,
+            "python": platform.python_version(),
+            "pygame": pygame.version.ver,
+            "numpy": main.np.__version__ if main.np is not None else None,
+        },
+        "scenarios": results,
+    }
+
+if __name__ == "__main__":
+    args = sys.argv[1:]
+    quick = "--quick" in args
+    render = "--no-render" not in args
+    names = None
+    out = None
+    if "--only" in args:
+        names = set(args[args.index("--only") + 1].split(","))
+    if "--out" in args:
+        out = args[args.index("--out") + 1]
+
+    report = json.dumps(run(names, quick, render), indent=2)
+    if out:
+        with open(out, "w") as f:
+            f.write(report + "\n")
+    print(report)
@@ -2,16 +2,30 @@ import pygame
 import os
 import random
 import math
+import bisect
 import json
 import socket
 import threading
 import subprocess
 import sys
+import time
+import types
+from array import array
+from collections import OrderedDict, deque
+
+import protocol
+
+try:
+    import numpy as np  # Optional: enables the vectorized "numpy" asteroid backend
+except ImportError:
+    np = None
 
 # ==================== CONSTANTS ====================
 SAVES_DIR = os.path.join(os.path.dirname(__file__), "saves")
 SETTINGS_FILE = os.path.join(os.path.dirname(__file__), "settings.json")
+PROFILES_DIR = os.path.join(os.path.dirname(__file__), "profiles")
 DEFAULT_PORT = 5555
+RECV_BUFFER = 65535  # Bytes read per datagram, one that fills it may have been cut short
 
 # Game states
 STATE_MENU = "menu"
@@ -39,6 +53,106 @@ PUBLIC_SERVERS = [
 # Outer space distance threshold
 OUTER_SPACE_DISTANCE = 3000
 
+# World landmarks
+BASE_X = 200.0
+BASE_Y = 200.0
+BASE_SELL_RADIUS = 120.0
+DROP_ZONE_X = 350.0  # Power shop material drop zone (next to base)
+DROP_ZONE_Y = 200.0
+DROP_ZONE_RADIUS = 80.0
+POWER_SHOP_X = 400.0
+POWER_SHOP_Y = 200.0
+POWER_SHOP_RADIUS = 100.0
+POWER_SHOP_MATERIALS = {"Iron": 10, "Copper": 5, "Titanium": 3, "Uranium": 2, "Power Core": 1}
+
+# Fixed-timestep simulation
+SIM_RATE = 120  # Simulation steps per second, independent of the frame rate
+SIM_DT = 1.0 / SIM_RATE
+MAX_FRAME_TIME = 0.25  # Longer frames are clamped so a stall can't queue up endless steps
+MAX_ASTEROIDS = 28
+ASTEROID_SPAWN_INTERVAL = 0.18
+
+# Render caches
+ASTEROID_SPRITE_CACHE_BYTES = 8 * 1024 * 1024  # Every radius 8..80, plain and golden, fits in ~5 MB
+GOLD_OVERLAY_CACHE_BYTES = 4 * 1024 * 1024
+TEXT_CACHE_BYTES = 4 * 1024 * 1024
+VIGNETTE_CACHE_BYTES = 32 * 1024 * 1024  # One outer space vignette per resolution, 10 MB at most
+OUTER_SPACE_VIGNETTE_RADIUS = 800
+GLOW_CACHE_BYTES = 16 * 1024 * 1024  # A level 5 magnet field alone is 9 MB
+SHIP_SPRITE_ANGLES = 256  # Rotation steps per ship design and color, about 1.4 degrees apart
+SHIP_SPRITE_CACHE_BYTES = 16 * 1024 * 1024  # A design in one color is about 1 MB over all angles
+MENU_BG_COLOR = (10, 10, 30)
+MENU_BG_ASTEROIDS = 15
+MENU_BG_ASTEROID_FRAMES = 72  # Pre-rotated frames per background asteroid, 5 degrees apart
+MENU_REFRESH_MS = 500  # Idle menus still redraw this often, for cursor blinks and status text
+MINIMAP_SIZE = 160
+MINIMAP_RANGE = 10000  # World units from the minimap's center to its edge
+GLOW_ALPHA_STEP = 16  # Fading layers snap to this many alpha levels apart
+VIEW_CULL_MARGIN = 40  # Pixels past the screen edge that still count as on screen
+ASTEROID_LABEL_PAD = 32  # Health bar and number sit this far outside an asteroid's radius
+TEXT_CACHE_ITEMS = 1024  # Labels are tiny, so bound the count too
+
+WORLD_FONT_SIZE = 24  # Name tags, asteroid health and floating texts at full resolution
+
+# Frame pacing and resolution scaling (settings.json: target_fps, vsync, render_scale, dynamic_resolution)
+DEFAULT_TARGET_FPS = 60
+RENDER_SCALE_MIN = 0.5
+RENDER_SCALE_STEP = 0.05
+RENDER_SCALE_INTERVAL = 0.5  # Seconds between dynamic resolution adjustments
+RENDER_SCALE_SMOOTHING = 0.1  # Weight of the newest frame in the smoothed frame time
+RENDER_SCALE_DOWN_AT = 0.9  # Drop resolution when frames take this share of the frame budget
+RENDER_SCALE_UP_AT = 0.6  # Raise it again once they are back under this share
+
+# Golden asteroid sparkles
+SPARKLE_INTERVAL = 0.06  # Seconds between sparkles per golden asteroid, via Asteroid.particle_timer
+SPARKLE_LIFE = 0.35
+SPARKLE_POOL_CAPACITY = 512
+SPARKLE_COLORS = [(255, 255, 150), (255, 215, 0), (255, 255, 200)]
+
+# Frame profiler (F3 overlay, F4 trace capture)
+PROFILER_HISTORY = 180  # Frames kept for the overlay
+PROFILER_TRACE_FRAMES = 120  # Frames captured per Chrome trace
+
+# Asteroid radius clamp used by the spawner
+MIN_ASTEROID_RADIUS = 8
+MAX_ASTEROID_RADIUS = 80
+
+# Asteroids farther than this from the ship are despawned
+ASTEROID_DESPAWN_DISTANCE = 1200
+SHIP_RADIUS = 14
+
+# Bullets
+BULLET_SPEED = 900.0
+BULLET_LIFE = 2.0
+BULLET_HIT_RADIUS = 6
+BULLET_POOL_CAPACITY = 4096
+
+# Auto Aim homing
+AUTO_AIM_RANGE = 400
+AUTO_AIM_RETARGET_INTERVAL = 0.1  # Seconds between nearest-target searches per bullet
+
+# Material colors for loot and carried items
+MATERIAL_COLORS = {
+    "Iron": (150, 150, 150),
+    "Copper": (184, 115, 51),
+    "Gold": (212, 175, 55),
+    "Titanium": (180, 180, 220),
+    "Platinum": (200, 200, 255),
+    "Uranium": (80, 255, 80),
+    "Diamond": (180, 255, 255),
+    "Power Core": (100, 255, 100),
+}
+
+# Loot drop tables (material, probability)
+LOOT_TABLE = [
+    ("Iron", 0.5), ("Copper", 0.2), ("Gold", 0.08), ("Titanium", 0.08),
+    ("Platinum", 0.06), ("Uranium", 0.05), ("Diamond", 0.03)
+]
+BOSS_LOOT_TABLE = [
+    ("Diamond", 0.25), ("Uranium", 0.2), ("Platinum", 0.2),
+    ("Titanium", 0.15), ("Gold", 0.1), ("Copper", 0.06), ("Iron", 0.04)
+]
+
 # Cosmetic unlocks from quests
 SHIP_COSMETICS = {
     "default": {"name": "Default", "points": [(0, -14), (8.4, 14), (-8.4, 14)]},
@@ -123,19 +237,19 @@ SHIP_COLORS = [
 
 # ==================== CLASSES ====================
 class Asteroid:
-    def __init__(self, x, y, dx=None, dy=None, health=None, boss=False, golden=None):
+    def __init__(self, x, y, dx=None, dy=None, health=None, boss=False, golden=None, rng=random):
         self.x = x
         self.y = y
-        self.dx = dx if dx is not None else random.uniform(5, 30)
-        self.dy = dy if dy is not None else random.uniform(5, 30)
+        self.dx = dx if dx is not None else rng.uniform(5, 30)
+        self.dy = dy if dy is not None else rng.uniform(5, 30)
         self.boss = boss
-        self.golden = golden if golden is not None else (random.random() < 0.08)  # 8% chance
+        self.golden = golden if golden is not None else (rng.random() < 0.08)  # 8% chance
         if boss:
-            self.health = health if health is not None else random.randint(40, 80)
+            self.health = health if health is not None else rng.randint(40, 80)
             self.max_health = self.health
             self.radius = 32
         else:
-            self.health = health if health is not None else random.randint(6, 18)
+            self.health = health if health is not None else rng.randint(6, 18)
             self.max_health = self.health
             self.radius = 8
         self.particle_timer = 0.0  # For golden particle effects
@@ -154,6 +268,433 @@ class Asteroid:
         a.radius = d["radius"]
         return a
 
+class AsteroidView:
+    """Asteroid-like view of one slot in an AsteroidField"""
+    __slots__ = ("field", "slot")
+
+    def __init__(self, field, slot):
+        self.field = field
+        self.slot = slot
+
+    def _column(name, cast=None):
+        if cast is None:
+            def get(self):
+                return getattr(self.field, name)[self.slot]
+        else:
+            def get(self):
+                return cast(getattr(self.field, name)[self.slot])
+
+        def set(self, value):
+            getattr(self.field, name)[self.slot] = value
+        return property(get, set)
+
+    x = _column("x", float)
+    y = _column("y", float)
+    dx = _column("dx", float)
+    dy = _column("dy", float)
+    health = _column("health")
+    max_health = _column("max_health", int)
+    radius = _column("radius", int)
+    boss = _column("boss", bool)
+    golden = _column("golden", bool)
+    particle_timer = _column("particle_timer", float)
+    del _column
+
+    to_dict = Asteroid.to_dict
+
+    def detach(self):
+        """Move this view's values into storage of its own, before its slot is reused"""
+        field = self.field
+        slot = self.slot
+        self.field = types.SimpleNamespace(**{
+            name: getattr(field, name)[slot:slot + 1].tolist() for name, _ in field.COLUMNS})
+        self.slot = 0
+
+class AsteroidField:
+    """Structure-of-arrays asteroid store backed by NumPy
+
+    Behaves like the plain asteroid list (iteration, indexing, len, append, remove) and
+    hands out AsteroidView objects, so the rest of the game and save files keep working.
+    Removed slots go on a free-list and are reused by later appends, but iteration keeps
+    the list's insertion order. Views of removed asteroids are detached so they never
+    alias whatever reuses their slot.
+    """
+    COLUMNS = (
+        ("x", "f8"), ("y", "f8"), ("dx", "f8"), ("dy", "f8"),
+        ("health", "O"), ("max_health", "i4"), ("radius", "i4"),
+        ("boss", "?"), ("golden", "?"), ("particle_timer", "f8"),
+    )
+
+    def __init__(self, asteroids=(), capacity=64):
+        if np is None:
+            raise RuntimeError("AsteroidField requires numpy")
+        for name, dtype in self.COLUMNS:
+            setattr(self, name, np.zeros(capacity, dtype))
+        self.alive = np.zeros(capacity, bool)
+        self.order = np.zeros(capacity, np.int64)  # Append sequence number of each slot
+        self.views = [None] * capacity
+        self.free = []  # Slots below size that can be reused
+        self.size = 0  # High-water mark of used slots
+        self.count = 0
+        self.appended = 0  # Appends so far, the next order number
+        self._live = None  # Cached indices of live slots, in iteration order
+        for asteroid in asteroids:
+            self.append(asteroid)
+
+    def _grow(self):
+        capacity = len(self.alive) * 2
+        for name, _ in self.COLUMNS:
+            setattr(self, name, np.resize(getattr(self, name), capacity))
+        alive = np.zeros(capacity, bool)
+        alive[:len(self.alive)] = self.alive
+        self.alive = alive
+        self.order = np.resize(self.order, capacity)
+        self.views.extend([None] * (capacity - len(self.views)))
+
+    def live_slots(self):
+        if self._live is None:
+            live = np.flatnonzero(self.alive[:self.size])
+            self._live = live[np.argsort(self.order[live])]
+        return self._live
+
+    def append(self, asteroid):
+        if self.free:
+            slot = self.free.pop()
+        else:
+            if self.size == len(self.alive):
+                self._grow()
+            slot = self.size
+            self.size += 1
+        for name, _ in self.COLUMNS:
+            getattr(self, name)[slot] = getattr(asteroid, name)
+        self.alive[slot] = True
+        self.order[slot] = self.appended
+        self.appended += 1
+        self.views[slot] = AsteroidView(self, slot)
+        self.count += 1
+        self._live = None
+
+    def remove(self, view):
+        slot = getattr(view, "slot", None)
+        if slot is None or slot >= self.size or not self.alive[slot] or self.views[slot] is not view:
+            raise ValueError("asteroid not in field")
+        self._release([slot])
+
+    def _release(self, slots):
+        for slot in slots:
+            self.views[slot].detach()
+            self.views[slot] = None
+        self.alive[slots] = False
+        self.free.extend(slots)
+        self.count -= len(slots)
+        self._live = None
+
+    def __len__(self):
+        return self.count
+
+    def __iter__(self):
+        views = self.views
+        return iter([views[slot] for slot in self.live_slots().tolist()])
+
+    def __getitem__(self, index):
+        live = self.live_slots()
+        if isinstance(index, slice):
+            return [self.views[slot] for slot in live[index].tolist()]
+        return self.views[int(live[index])]
+
+    def positions(self):
+        """Return (xs, ys) arrays of live asteroid centers, in iteration order"""
+        live = self.live_slots()
+        return self.x[live], self.y[live]
+
+    def drawable(self, left, top, right, bottom, pad=0, lag=0.0):
+        """Rows for the asteroids whose circle, grown by pad and moved lag seconds, overlaps the rectangle
+
+        Each row is (x, y, radius, golden, boss, health, max_health) with the position
+        already moved, so drawing needs no view lookups.
+        """
+        live = self.live_slots()
+        xs = self.x[live] + self.dx[live] * lag
+        ys = self.y[live] + self.dy[live] * lag
+        radii = self.radius[live]
+        reach = radii + pad
+        inside = (xs + reach >= left) & (xs - reach <= right) & (ys + reach >= top) & (ys - reach <= bottom)
+        slots = live[inside]
+        return list(zip(
+            xs[inside].tolist(), ys[inside].tolist(), radii[inside].tolist(), self.golden[slots].tolist(),
+            self.boss[slots].tolist(), self.health[slots].tolist(), self.max_health[slots].tolist()))
+
+    def max_radius(self):
+        live = self.live_slots()
+        return int(self.radius[live].max()) if len(live) else 0
+
+    def integrate(self, dt):
+        live = self.live_slots()
+        self.x[live] += self.dx[live] * dt
+        self.y[live] += self.dy[live] * dt
+
+    def _distances(self, slots, x, y, limits):
+        """Distances from (x, y) to slots, compared against limits the way math.hypot would
+
+        np.hypot can land an ulp away from math.hypot, so distances right at a limit
+        are measured again like the list backend does.
+        """
+        dist = np.hypot(self.x[slots] - x, self.y[slots] - y)
+        close = np.flatnonzero(np.abs(dist - limits) <= 1e-9 * (1.0 + dist))
+        for i in close.tolist():
+            slot = slots[i]
+            dist[i] = math.hypot(float(self.x[slot]) - x, float(self.y[slot]) - y)
+        return dist
+
+    def distances_to(self, x, y):
+        """Distances from (x, y) to every live asteroid, in iteration order"""
+        xs, ys = self.positions()
+        return np.hypot(xs - x, ys - y)
+
+    def cull(self, x, y, max_dist):
+        """Remove asteroids farther than max_dist from (x, y), returns how many went"""
+        live = self.live_slots()
+        far = live[self._distances(live, x, y, max_dist) > max_dist].tolist()
+        if far:
+            self._release(far)
+        return len(far)
+
+    def collide_with_ship(self, px, py, vx, vy, ship_radius):
+        """Reflect asteroids touching the ship, returns the ship's reflected velocity"""
+        live = self.live_slots()
+        reach = ship_radius + self.radius[live]
+        touching = live[self._distances(live, px, py, reach) < reach]
+        # Contacts are rare, so resolve them one at a time like the list backend does
+        for slot in touching.tolist():
+            x = float(self.x[slot])
+            y = float(self.y[slot])
+            dx = float(self.dx[slot])
+            dy = float(self.dy[slot])
+            radius = int(self.radius[slot])
+            pdx = x - px
+            pdy = y - py
+            dist = math.hypot(pdx, pdy)
+            nx = pdx / (dist + 1e-6)
+            ny = pdy / (dist + 1e-6)
+            dot = dx * nx + dy * ny
+            self.dx[slot] = dx - 2 * dot * nx
+            self.dy[slot] = dy - 2 * dot * ny
+            dot_player = vx * nx + vy * ny
+            vx -= 2 * dot_player * nx
+            vy -= 2 * dot_player * ny
+
+            # Push asteroid away to prevent sticking
+            overlap = (ship_radius + radius) - dist
+            if overlap > 0:
+                self.x[slot] = x + nx * overlap * 1.2
+                self.y[slot] = y + ny * overlap * 1.2
+        return vx, vy
+
+def make_asteroid_store(asteroids, backend="list"):
+    """Hold asteroids in the requested backend, falling back to a list without NumPy"""
+    if backend == "numpy" and np is not None:
+        return AsteroidField(asteroids)
+    return list(asteroids)
+
+class BulletPool:
+    """Fixed-capacity bullet store with preallocated columns and swap-remove
+
+    Live bullets occupy indices 0..count-1. Columns are NumPy arrays when available,
+    otherwise array.array, so spawning a bullet never allocates. Shots fired while
+    the pool is full are dropped.
+    """
+    COLUMNS = (
+        ("x", "d"), ("y", "d"), ("vx", "d"), ("vy", "d"), ("life", "d"),
+        ("pierce_count", "i"), ("retarget_timer", "d"),
+    )
+    OBJECT_COLUMNS = ("ignore_asteroid_id", "target")
+
+    def __init__(self, capacity=BULLET_POOL_CAPACITY):
+        self.capacity = capacity
+        for name, typecode in self.COLUMNS:
+            if np is not None:
+                column = np.zeros(capacity, "f8" if typecode == "d" else "i4")
+            else:
+                column = array(typecode, [0]) * capacity
+            setattr(self, name, column)
+        self.ignore_asteroid_id = [None] * capacity  # Source asteroid a split bullet must skip
+        self.target = [None] * capacity  # Asteroid an Auto Aim bullet is homing on
+        self.count = 0
+
+    def __len__(self):
+        return self.count
+
+    def clear(self):
+        self.count = 0
+
+    def spawn(self, x, y, vx, vy, life, ignore_asteroid_id=None):
+        """Add a bullet, returns its index or -1 if the pool is full"""
+        i = self.count
+        if i >= self.capacity:
+            return -1
+        self.x[i] = x
+        self.y[i] = y
+        self.vx[i] = vx
+        self.vy[i] = vy
+        self.life[i] = life
+        self.pierce_count[i] = 0
+        self.retarget_timer[i] = 0.0
+        self.ignore_asteroid_id[i] = ignore_asteroid_id
+        self.target[i] = None
+        self.count = i + 1
+        return i
+
+    def remove(self, i):
+        """Remove bullet i by moving the last bullet into its slot"""
+        last = self.count - 1
+        if i != last:
+            for name, _ in self.COLUMNS:
+                column = getattr(self, name)
+                column[i] = column[last]
+            for name in self.OBJECT_COLUMNS:
+                column = getattr(self, name)
+                column[i] = column[last]
+        for name in self.OBJECT_COLUMNS:
+            getattr(self, name)[last] = None
+        self.count = last
+
+    def remove_many(self, indices):
+        # Highest index first, so every bullet swapped down is one that stays
+        for i in sorted(set(indices), reverse=True):
+            self.remove(i)
+
+    def positions(self, lag=0.0):
+        """Lists of live bullet x and y, moved along their velocity by lag seconds"""
+        n = self.count
+        if np is not None:
+            return (self.x[:n] + self.vx[:n] * lag).tolist(), (self.y[:n] + self.vy[:n] * lag).tolist()
+        return ([self.x[i] + self.vx[i] * lag for i in range(n)],
+                [self.y[i] + self.vy[i] * lag for i in range(n)])
+
+    def integrate(self, dt):
+        """Move every bullet, age it and drop the expired ones"""
+        n = self.count
+        if np is not None:
+            self.x[:n] += self.vx[:n] * dt
+            self.y[:n] += self.vy[:n] * dt
+            self.life[:n] -= dt
+            expired = np.flatnonzero(self.life[:n] <= 0).tolist()
+        else:
+            x, y, vx, vy, life = self.x, self.y, self.vx, self.vy, self.life
+            expired = []
+            for i in range(n):
+                x[i] += vx[i] * dt
+                y[i] += vy[i] * dt
+                life[i] -= dt
+                if life[i] <= 0:
+                    expired.append(i)
+        if expired:
+            self.remove_many(expired)
+
+class SpatialHash:
+    """Uniform grid that buckets items by position for broad-phase collision checks"""
+
+    def __init__(self, cell_size=64.0):
+        self.cell_size = cell_size
+        self.cells = {}  # {(cell_x, cell_y): [item, ...]}
+        self.keys = {}  # {item: (cell_x, cell_y)}
+
+    def clear(self, cell_size=None):
+        if cell_size is not None:
+            self.cell_size = cell_size
+        self.cells = {}
+        self.keys = {}
+
+    def insert(self, item, x, y):
+        key = (int(x // self.cell_size), int(y // self.cell_size))
+        self.keys[item] = key
+        bucket = self.cells.get(key)
+        if bucket is None:
+            self.cells[key] = [item]
+        else:
+            bucket.append(item)
+
+    def discard(self, item):
+        """Remove an item from the grid if it is present"""
+        key = self.keys.pop(item, None)
+        if key is not None:
+            bucket = self.cells[key]
+            bucket.remove(item)
+            if not bucket:
+                del self.cells[key]
+
+    def around(self, x, y):
+        """Yield the items in the cell containing (x, y) and the 8 cells around it"""
+        cx = int(x // self.cell_size)
+        cy = int(y // self.cell_size)
+        cells = self.cells
+        for ox in (-1, 0, 1):
+            for oy in (-1, 0, 1):
+                bucket = cells.get((cx + ox, cy + oy))
+                if bucket:
+                    yield from bucket
+
+    def within(self, x, y, radius):
+        """Yield the items in every cell overlapping the square of half-size radius around (x, y)"""
+        cs = self.cell_size
+        x0 = int((x - radius) // cs)
+        x1 = int((x + radius) // cs)
+        y0 = int((y - radius) // cs)
+        y1 = int((y + radius) // cs)
+        cells = self.cells
+        if (x1 - x0 + 1) * (y1 - y0 + 1) > len(cells):
+            # Large radius over a sparse grid: walking the occupied cells is cheaper
+            for (cx, cy), bucket in cells.items():
+                if x0 <= cx <= x1 and y0 <= cy <= y1:
+                    yield from bucket
+            return
+        for cx in range(x0, x1 + 1):
+            for cy in range(y0, y1 + 1):
+                bucket = cells.get((cx, cy))
+                if bucket:
+                    yield from bucket
+
+    def nearest(self, x, y, max_dist):
+        """Return the item whose position is closest to (x, y) and under max_dist away, or None
+
+        Searches outwards ring by ring and stops once no unvisited cell can be closer.
+        Items must expose x and y attributes.
+        """
+        cs = self.cell_size
+        max_ring = int(max_dist // cs) + 1
+        cells = self.cells
+        best = None
+        best_dist = max_dist
+        if (2 * max_ring + 1) ** 2 > len(cells):
+            for item in self.within(x, y, max_dist):
+                dist = math.hypot(item.x - x, item.y - y)
+                if dist < best_dist:
+                    best = item
+                    best_dist = dist
+            return best
+        cx = int(x // cs)
+        cy = int(y // cs)
+        for ring in range(max_ring + 1):
+            # Every cell in this ring is more than (ring - 1) cells away from the point
+            if (ring - 1) * cs >= best_dist:
+                break
+            if ring == 0:
+                keys = ((cx, cy),)
+            else:
+                keys = [(cx + ox, cy - ring) for ox in range(-ring, ring + 1)]
+                keys += [(cx + ox, cy + ring) for ox in range(-ring, ring + 1)]
+                keys += [(cx - ring, cy + oy) for oy in range(-ring + 1, ring)]
+                keys += [(cx + ring, cy + oy) for oy in range(-ring + 1, ring)]
+            for key in keys:
+                bucket = cells.get(key)
+                if bucket:
+                    for item in bucket:
+                        dist = math.hypot(item.x - x, item.y - y)
+                        if dist < best_dist:
+                            best = item
+                            best_dist = dist
+        return best
+
 class Quest:
     QUEST_TYPES = [
         # 80% money quests
@@ -170,23 +711,23 @@ class Quest:
         ("collect_rare", "Collect {target} rare materials", 10, 20, "fire", 0, 0),
     ]
 
-    def __init__(self, quest_type=None, target=None, progress=0):
+    def __init__(self, quest_type=None, target=None, progress=0, rng=random):
         if quest_type is None:
             # 80% chance for money quest, 20% for cosmetic
-            if random.random() < 0.8:
+            if rng.random() < 0.8:
                 # Money quest
                 money_quests = [q for q in self.QUEST_TYPES if q[4] == "money"]
-                qtype, desc_template, min_t, max_t, reward_type, min_money, max_money = random.choice(money_quests)
+                qtype, desc_template, min_t, max_t, reward_type, min_money, max_money = rng.choice(money_quests)
             else:
                 # Cosmetic quest
                 cosmetic_quests = [q for q in self.QUEST_TYPES if q[4] in ["ship", "fire"]]
-                qtype, desc_template, min_t, max_t, reward_type, min_money, max_money = random.choice(cosmetic_quests)
-            
+                qtype, desc_template, min_t, max_t, reward_type, min_money, max_money = rng.choice(cosmetic_quests)
+
             self.quest_type = qtype
-            self.target = random.randint(min_t, max_t)
+            self.target = rng.randint(min_t, max_t)
             self.description = desc_template.format(target=self.target)
             self.reward_type = reward_type
-            self.money_reward = random.randint(min_money, max_money) if reward_type == "money" else 0
+            self.money_reward = rng.randint(min_money, max_money) if reward_type == "money" else 0
         else:
             self.quest_type = quest_type
             self.target = target
@@ -253,7 +794,7 @@ class Button:
         pygame.draw.rect(screen, color, self.rect, border_radius=8)
         pygame.draw.rect(screen, (200, 200, 255), self.rect, 2, border_radius=8)
         text_color = (100, 100, 100) if self.disabled else (255, 255, 255)
-        text_surf = font.render(self.text, True, text_color)
+        text_surf = text_cache.render(font, self.text, True, text_color)
         text_rect = text_surf.get_rect(center=self.rect.center)
         screen.blit(text_surf, text_rect)
 
@@ -270,6 +811,16 @@ class NetworkClient:
         self.receive_thread = None
         self.running = False
         self.lock = threading.Lock()
+        self.protocol = 0  # Negotiated at join, 0 is the JSON protocol
+        self.send_seq = protocol.NO_SEQ
+        self.state_seq = protocol.NO_SEQ  # Last binary state applied, acknowledged in every update
+        self.states = {}  # Recent binary state sequence -> roster, for deltas to build on
+        self.far_players = {}  # {id: (x, y)} from the server's summaries, for the minimap
+        self.summary_seq = protocol.NO_SEQ
+        self.fragments = {}  # Fragmented message sequence -> [parts, parts received]
+        # dropped: malformed, stale or incomplete messages, oversized: binary datagrams over
+        # protocol.MAX_DATAGRAM and datagrams that filled RECV_BUFFER, both thrown away
+        self.stats = {"received": 0, "dropped": 0, "oversized": 0, "fragmented": 0}
 
     def connect(self, host, port, player_name, color_index):
         try:
@@ -283,7 +834,8 @@ class NetworkClient:
                 "type": "join",
                 "name": player_name,
                 "x": 0, "y": 0, "rotation": 0,
-                "color_index": color_index
+                "color_index": color_index,
+                "protocol": protocol.PROTOCOL_VERSION
             }).encode()
             self.socket.sendto(join_msg, self.server_addr)
             self.connected = True
@@ -292,16 +844,21 @@ class NetworkClient:
             print(f"Connection error: {e}")
             return False
 
-    def send_update(self, x, y, rotation, color_index):
+    def send_update(self, x, y, rotation, color_index, ship="default"):
         if not self.connected:
             return
         try:
-            msg = json.dumps({
-                "type": "update",
-                "x": x, "y": y,
-                "rotation": rotation,
-                "color_index": color_index
-            }).encode()
+            if self.protocol >= 1:
+                self.send_seq = protocol.next_seq(self.send_seq)
+                msg = protocol.encode_update(self.send_seq, self.state_seq, x, y, rotation, color_index, ship)
+            else:
+                msg = json.dumps({
+                    "type": "update",
+                    "x": x, "y": y,
+                    "rotation": rotation,
+                    "color_index": color_index,
+                    "ship": ship
+                }).encode()
             self.socket.sendto(msg, self.server_addr)
         except:
             pass
@@ -309,28 +866,117 @@ class NetworkClient:
     def receive(self):
         if not self.connected:
             return
-        try:
-            while True:
-                data, _ = self.socket.recvfrom(4096)
+        while True:
+            try:
+                data, _ = self.socket.recvfrom(RECV_BUFFER)
+            except BlockingIOError:
+                break
+            except ConnectionResetError:
+                continue  # An ICMP error for an earlier send, not for this datagram
+            except OSError:
+                break
+            self.stats["received"] += 1
+            binary = protocol.is_binary(data)
+            if len(data) >= RECV_BUFFER or (binary and len(data) > protocol.MAX_DATAGRAM):
+                self.stats["oversized"] += 1  # JSON states up to the server's 4096 bytes are fine
+                continue
+            if binary:
+                self.apply_binary(data)
+                continue
+            try:
                 msg = json.loads(data.decode())
-                
-                if msg.get("type") == "joined":
-                    self.my_id = msg.get("id")
-                elif msg.get("type") == "state":
-                    with self.lock:
-                        self.other_players = {}
-                        for p in msg.get("players", []):
-                            if p.get("id") != self.my_id:
-                                self.other_players[p["id"]] = p
-        except BlockingIOError:
-            pass
-        except:
-            pass
+            except (ValueError, UnicodeDecodeError):
+                self.stats["dropped"] += 1
+                continue
+
+            if msg.get("type") == "joined":
+                # Servers without this binary protocol version answer with another or none
+                self.protocol = msg.get("protocol", 0) if msg.get("protocol") == protocol.PROTOCOL_VERSION else 0
+                self.my_id = msg.get("player_id") if self.protocol >= 1 else msg.get("id")
+            elif msg.get("type") == "state":
+                with self.lock:
+                    self.other_players = {}
+                    for p in msg.get("players", []):
+                        if p.get("id") != self.my_id:
+                            self.other_players[p["id"]] = p
+
+    def apply_binary(self, data):
+        """Apply a binary state on top of the state it was built against
+
+        Stale or malformed messages are skipped, as are deltas against a state
+        we no longer have, the next keyframe puts those right.
+        """
+        try:
+            msg_type, seq, state = protocol.decode(data)
+        except ValueError:
+            self.stats["dropped"] += 1
+            return
+        if msg_type == protocol.MSG_FRAGMENT:
+            data = self.join_fragment(seq, *state)
+            if data is not None:
+                self.apply_binary(data)
+            return
+        if msg_type == protocol.MSG_SUMMARY:
+            if protocol.seq_newer(seq, self.summary_seq):
+                self.summary_seq = seq
+                with self.lock:
+                    self.far_players = {pid: (x, y) for pid, x, y in state if pid != self.my_id}
+            return
+        if msg_type != protocol.MSG_STATE or not protocol.seq_newer(seq, self.state_seq):
+            self.stats["dropped"] += 1
+            return
+        if state["base"] is None:
+            roster = {}
+        elif state["base"] in self.states:
+            roster = dict(self.states[state["base"]])
+        else:
+            self.stats["dropped"] += 1
+            return
+        for pid in state["removed"]:
+            roster.pop(pid, None)
+        # Player dicts are shared with older states, so changes go into new ones
+        for pid, fields in state["players"].items():
+            roster[pid] = {**roster.get(pid, {"id": pid}), **fields}
+        self.states[seq] = roster
+        while len(self.states) > protocol.STATE_HISTORY:
+            del self.states[next(iter(self.states))]
+        self.state_seq = seq
+        with self.lock:
+            self.other_players = {pid: p for pid, p in roster.items() if pid != self.my_id}
+
+    def join_fragment(self, seq, index, count, payload):
+        """The whole message once every fragment of it has arrived, None until then
+
+        Only the latest protocol.FRAGMENT_SLOTS messages are kept, older ones
+        lost a fragment and are dropped.
+        """
+        entry = self.fragments.get(seq)
+        if entry is None or len(entry[0]) != count:
+            entry = self.fragments[seq] = [[None] * count, 0]
+            while len(self.fragments) > protocol.FRAGMENT_SLOTS:
+                del self.fragments[next(iter(self.fragments))]
+                self.stats["dropped"] += 1
+        parts = entry[0]
+        if parts[index] is None:
+            parts[index] = payload
+            entry[1] += 1
+        if entry[1] < count:
+            return None
+        del self.fragments[seq]
+        self.stats["fragmented"] += 1
+        return b"".join(parts)
 
     def get_other_players(self):
         with self.lock:
             return dict(self.other_players)
 
+    def get_minimap_positions(self):
+        """(x, y) of every other player, exact for nearby ones and from the last summary for the rest"""
+        with self.lock:
+            positions = [(p.get("x", 0), p.get("y", 0)) for p in self.other_players.values()]
+            positions.extend(pos for pid, pos in self.far_players.items() if pid not in self.other_players)
+        return positions
+
     def disconnect(self):
         if self.connected and self.socket:
             try:
@@ -345,10 +991,19 @@ class NetworkClient:
             self.socket = None
         self.other_players = {}
         self.my_id = None
+        self.protocol = 0
+        self.send_seq = protocol.NO_SEQ
+        self.state_seq = protocol.NO_SEQ
+        self.states = {}
+        self.far_players = {}
+        self.summary_seq = protocol.NO_SEQ
+        self.fragments = {}
+        self.stats = {"received": 0, "dropped": 0, "oversized": 0, "fragmented": 0}
 
 # ==================== SETTINGS ====================
 def load_settings():
-    default = {"player_name": "Player", "ship_color_index": 0}
+    default = {"player_name": "Player", "ship_color_index": 0, "asteroid_backend": "list",
+               "target_fps": DEFAULT_TARGET_FPS, "vsync": False, "render_scale": 1.0, "dynamic_resolution": False}
     if os.path.exists(SETTINGS_FILE):
         try:
             with open(SETTINGS_FILE, "r") as f:
@@ -410,7 +1065,7 @@ def delete_world(world_name):
     if os.path.exists(filepath):
         os.remove(filepath)
 
-def create_new_game_state():
+def create_new_game_state(asteroid_backend="list", rng=random):
     return {
         "worldxposition": 0.0,
         "worldyposition": 0.0,
@@ -421,15 +1076,15 @@ def create_new_game_state():
         "upgrades": {"speed": 0, "storage": 0, "shot_damage": 0, "shoot_speed": 0, "powers_unlocked": False},
         "carried_items": [],
         "floating_loot": [],  # Loot items floating in space that can be picked up
-        "asteroids": [Asteroid(random.randint(0, 1000), random.randint(0, 1000)) for _ in range(10)],
+        "asteroids": make_asteroid_store([Asteroid(rng.randint(0, 1000), rng.randint(0, 1000), rng=rng) for _ in range(10)], asteroid_backend),
         "player": Player(500, 500),
-        "bullets": [],
+        "bullets": BulletPool(),
         "floating_texts": [],
         "time_since_shot": 0.0,
         "spawn_timer": 0.0,
         "xp": 0,
         "level": 1,
-        "quests": [Quest(), Quest(), Quest()],  # Start with 3 random quests
+        "quests": [Quest(rng=rng), Quest(rng=rng), Quest(rng=rng)],  # Start with 3 random quests
         "quest_cooldown": 0.0,  # Cooldown timer for new quests
         "gold_particles": [],  # For golden asteroid particle effects
         "powers": {
@@ -451,8 +1106,8 @@ def create_new_game_state():
         "in_outer_space": False,  # Whether player is in outer space
     }
 
-def load_game_state_from_data(data):
-    state = create_new_game_state()
+def load_game_state_from_data(data, asteroid_backend="list", rng=random):
+    state = create_new_game_state(asteroid_backend, rng=rng)
     state["worldxposition"] = data["worldxposition"]
     state["worldyposition"] = data["worldyposition"]
     state["cam_vx"] = data["cam_vx"]
@@ -465,13 +1120,13 @@ def load_game_state_from_data(data):
         state["upgrades"]["powers_unlocked"] = False
     state["carried_items"] = data["carried_items"]
     state["floating_loot"] = data.get("floating_loot", [])  # Load floating loot if exists
-    state["asteroids"] = [Asteroid.from_dict(a) for a in data["asteroids"]]
+    state["asteroids"] = make_asteroid_store([Asteroid.from_dict(a) for a in data["asteroids"]], asteroid_backend)
     state["player"].rotation = data["player_rotation"]
     state["xp"] = data.get("xp", 0)
     state["level"] = data.get("level", 1)
     state["quests"] = [Quest.from_dict(q) for q in data.get("quests", [])]
     if not state["quests"]:
-        state["quests"] = [Quest(), Quest(), Quest()]
+        state["quests"] = [Quest(rng=rng), Quest(rng=rng), Quest(rng=rng)]
     state["quest_cooldown"] = data.get("quest_cooldown", 0.0)
     state["powers"] = data.get("powers", {"owned": [], "equipped": None, "levels": {}})
     state["cosmetics"] = data.get("cosmetics", {
@@ -487,7 +1142,7 @@ def get_screen_center(screen_w, screen_h):
     """Get center coordinates for current screen"""
     return screen_w // 2, screen_h // 2
 
-def update_power_effects(game_state, dt, CX, CY):
+def update_power_effects(game_state, dt, grid):
     """Update active power effects"""
     gs = game_state
     powers = gs["powers"]
@@ -523,9 +1178,8 @@ def update_power_effects(game_state, dt, CX, CY):
             orb_x = gs["worldxposition"] + math.cos(orb["angle"]) * orb["radius"]
             orb_y = gs["worldyposition"] + math.sin(orb["angle"]) * orb["radius"]
             
-            # Check asteroid collisions
-            for asteroid in gs["asteroids"][:]:
-                dist = math.hypot(asteroid.x - orb_x, asteroid.y - orb_y)
+            # Check asteroid collisions, the query reaches the largest indexed asteroid
+            for asteroid, dist in asteroids_in_radius(grid, orb_x, orb_y, grid.cell_size / 2 + 8):
                 if dist < asteroid.radius + 8:
                     damage = orb["damage"] * dt * 3  # Reduced from 10 to 3
                     asteroid.health -= damage
@@ -554,8 +1208,40 @@ def update_power_effects(game_state, dt, CX, CY):
     else:
         gs["power_effects"] = []
 
-def render_power_effects(screen, game_state, CX, CY, player_rotation):
-    """Render visual effects for active powers"""
+def steer_bullets(bullets, grid, aim_strength, dt):
+    """Auto Aim: bend each bullet towards the nearest asteroid within range
+
+    Each bullet keeps its target and only searches the grid again every
+    AUTO_AIM_RETARGET_INTERVAL seconds, or sooner when the target is destroyed,
+    despawned or leaves range.
+    """
+    targets = bullets.target
+    timers = bullets.retarget_timer
+    for i in range(len(bullets)):
+        bx = float(bullets.x[i])
+        by = float(bullets.y[i])
+        target = targets[i]
+        timers[i] -= dt
+        if target is not None and (target not in grid.keys or math.hypot(target.x - bx, target.y - by) >= AUTO_AIM_RANGE):
+            target = None
+        if target is None or timers[i] <= 0:
+            target = grid.nearest(bx, by, AUTO_AIM_RANGE)
+            targets[i] = target
+            timers[i] = AUTO_AIM_RETARGET_INTERVAL
+
+        if target is not None:
+            # Steer bullet towards asteroid
+            dx = target.x - bx
+            dy = target.y - by
+            dist = math.hypot(dx, dy)
+            if dist > 0:
+                target_vx = (dx / dist) * BULLET_SPEED
+                target_vy = (dy / dist) * BULLET_SPEED
+                bullets.vx[i] += (target_vx - bullets.vx[i]) * aim_strength * dt * 5
+                bullets.vy[i] += (target_vy - bullets.vy[i]) * aim_strength * dt * 5
+
+def render_power_effects(screen, game_state, CX, CY, player_rotation, zoom=1.0):
+    """Render visual effects for active powers, zoom is screen pixels per world unit"""
     gs = game_state
     powers = gs["powers"]
     equipped = powers.get("equipped")
@@ -569,38 +1255,2110 @@ def render_power_effects(screen, game_state, CX, CY, player_rotation):
             if orb["type"] == "orb":
                 orb_x = gs["worldxposition"] + math.cos(orb["angle"]) * orb["radius"]
                 orb_y = gs["worldyposition"] + math.sin(orb["angle"]) * orb["radius"]
-                screen_x = int(orb_x - gs["worldxposition"] + CX)
-                screen_y = int(orb_y - gs["worldyposition"] + CY)
+                screen_x = int((orb_x - gs["worldxposition"]) * zoom + CX)
+                screen_y = int((orb_y - gs["worldyposition"]) * zoom + CY)
                 
                 # Draw glowing orb
-                pygame.draw.circle(screen, (255, 150, 50), (screen_x, screen_y), 10)
-                pygame.draw.circle(screen, (255, 200, 100), (screen_x, screen_y), 6)
-                pygame.draw.circle(screen, (255, 255, 150), (screen_x, screen_y), 3)
+                pygame.draw.circle(screen, (255, 150, 50), (screen_x, screen_y), max(1, int(10 * zoom)))
+                pygame.draw.circle(screen, (255, 200, 100), (screen_x, screen_y), max(1, int(6 * zoom)))
+                pygame.draw.circle(screen, (255, 255, 150), (screen_x, screen_y), max(1, int(3 * zoom)))
     
     # Render magnet field - BIGGER AND MORE VISIBLE
     elif equipped == "magnet":
         if gs["power_effects"] and gs["power_effects"][0]["type"] == "magnet":
-            magnet_range = gs["power_effects"][0]["range"]
-            magnet_surf = pygame.Surface((magnet_range * 2, magnet_range * 2), pygame.SRCALPHA)
-            # Multiple rings for better visibility
-            pygame.draw.circle(magnet_surf, (255, 255, 100, 40), (magnet_range, magnet_range), magnet_range)
-            pygame.draw.circle(magnet_surf, (255, 255, 150, 80), (magnet_range, magnet_range), magnet_range, 3)
-            pygame.draw.circle(magnet_surf, (255, 255, 200, 60), (magnet_range, magnet_range), int(magnet_range * 0.7), 2)
+            magnet_range = int(gs["power_effects"][0]["range"] * zoom)
+            magnet_surf = glow_cache.magnet_field(magnet_range)
             screen.blit(magnet_surf, (CX - magnet_range, CY - magnet_range))
 
+# ==================== COLLISIONS ====================
+def move_asteroids(asteroids, dt, px, py):
+    """Integrate asteroid positions and despawn the ones that drifted too far from the ship"""
+    if isinstance(asteroids, AsteroidField):
+        asteroids.integrate(dt)
+        asteroids.cull(px, py, ASTEROID_DESPAWN_DISTANCE)
+        return
+    for asteroid in asteroids[:]:
+        asteroid.x += asteroid.dx * dt
+        asteroid.y += asteroid.dy * dt
+        dist = math.hypot(asteroid.x - px, asteroid.y - py)
+        if dist > ASTEROID_DESPAWN_DISTANCE:
+            asteroids.remove(asteroid)
+
+def tick_sparkle_timers(asteroids, dt, due):
+    """Count down golden asteroids' sparkle timers and append the ones that came due to due"""
+    if isinstance(asteroids, AsteroidField):
+        live = asteroids.live_slots()
+        golden = live[asteroids.golden[live]]
+        timers = asteroids.particle_timer
+        timers[golden] -= dt
+        ready = golden[timers[golden] <= 0]
+        if len(ready):
+            timers[ready] += SPARKLE_INTERVAL
+            timers[ready[timers[ready] <= 0]] = SPARKLE_INTERVAL  # Don't burst after a long gap
+            views = asteroids.views
+            due.extend(views[slot] for slot in ready.tolist())
+        return
+    for asteroid in asteroids:
+        if asteroid.golden:
+            asteroid.particle_timer -= dt
+            if asteroid.particle_timer <= 0:
+                asteroid.particle_timer += SPARKLE_INTERVAL
+                if asteroid.particle_timer <= 0:
+                    asteroid.particle_timer = SPARKLE_INTERVAL  # Don't burst after a long gap
+                due.append(asteroid)
+
+def collide_ship_with_asteroids(game_state, ship_radius=SHIP_RADIUS):
+    """Bounce asteroids off the ship and reflect the ship's velocity"""
+    gs = game_state
+    asteroids = gs["asteroids"]
+    if isinstance(asteroids, AsteroidField):
+        gs["cam_vx"], gs["cam_vy"] = asteroids.collide_with_ship(
+            gs["worldxposition"], gs["worldyposition"], gs["cam_vx"], gs["cam_vy"], ship_radius)
+        return
+    for asteroid in asteroids:
+        pdx = asteroid.x - gs["worldxposition"]
+        pdy = asteroid.y - gs["worldyposition"]
+        dist = math.hypot(pdx, pdy)
+        if dist < ship_radius + asteroid.radius:
+            nx = pdx / (dist + 1e-6)
+            ny = pdy / (dist + 1e-6)
+            dot = asteroid.dx * nx + asteroid.dy * ny
+            asteroid.dx -= 2 * dot * nx
+            asteroid.dy -= 2 * dot * ny
+            dot_player = gs["cam_vx"] * nx + gs["cam_vy"] * ny
+            gs["cam_vx"] -= 2 * dot_player * nx
+            gs["cam_vy"] -= 2 * dot_player * ny
+
+            # Push asteroid away to prevent sticking
+            overlap = (ship_radius + asteroid.radius) - dist
+            if overlap > 0:
+                asteroid.x += nx * overlap * 1.2
+                asteroid.y += ny * overlap * 1.2
+
+def asteroid_cell_size(asteroids):
+    """Grid cell size that keeps every touching pair of asteroids in neighbouring cells"""
+    if isinstance(asteroids, AsteroidField):
+        largest = asteroids.max_radius() or MIN_ASTEROID_RADIUS
+    else:
+        largest = max((a.radius for a in asteroids), default=MIN_ASTEROID_RADIUS)
+    return 2 * min(largest, MAX_ASTEROID_RADIUS)
+
+def index_asteroids(asteroids, grid):
+    """Rebuild the grid so it holds every asteroid at its current position"""
+    grid.clear(asteroid_cell_size(asteroids))
+    if isinstance(asteroids, AsteroidField):
+        xs, ys = asteroids.positions()
+        for asteroid, x, y in zip(asteroids, xs.tolist(), ys.tolist()):
+            grid.insert(asteroid, x, y)
+    else:
+        for asteroid in asteroids:
+            grid.insert(asteroid, asteroid.x, asteroid.y)
+
+def resolve_asteroid_collisions(asteroids, grid):
+    """Bounce overlapping asteroids apart, in the same (i, j) pair order as a full pairwise sweep
+
+    Works on plain lists of positions and velocities indexed in iteration order.
+    Cells are as wide as the largest pair of radii, so every touching pair sits in
+    one cell or two neighbouring ones. Walking each cell and its forward neighbours
+    once gives every asteroid the sorted list of later asteroids it may touch. A
+    push that carries an asteroid into another cell adds its new neighbours to
+    those lists. Leaves the grid indexing every asteroid at its resolved position,
+    ready for the queries made later in the tick.
+    """
+    ordered = list(asteroids)
+    n = len(ordered)
+    if isinstance(asteroids, AsteroidField):
+        live = asteroids.live_slots()
+        xs = asteroids.x[live].tolist()
+        ys = asteroids.y[live].tolist()
+        vxs = asteroids.dx[live].tolist()
+        vys = asteroids.dy[live].tolist()
+        radii = asteroids.radius[live].tolist()
+    else:
+        xs = [a.x for a in ordered]
+        ys = [a.y for a in ordered]
+        vxs = [a.dx for a in ordered]
+        vys = [a.dy for a in ordered]
+        radii = [a.radius for a in ordered]
+    cell_size = asteroid_cell_size(asteroids)
+    cells = {}  # {(cell_x, cell_y): [index, ...]}
+    keys = []
+    for x, y in zip(xs, ys):
+        key = (int(x // cell_size), int(y // cell_size))
+        bucket = cells.get(key)
+        if bucket is None:
+            cells[key] = [len(keys)]
+        else:
+            bucket.append(len(keys))
+        keys.append(key)
+
+    later = [None] * n  # later[i]: sorted indices j > i that may touch i, if any
+    get = cells.get
+    for (cx, cy), bucket in cells.items():
+        if len(bucket) > 1:
+            for at, i in enumerate(bucket, 1):
+                found = later[i]
+                if found is None:
+                    later[i] = bucket[at:]
+                else:
+                    found += bucket[at:]
+        for key in ((cx + 1, cy - 1), (cx + 1, cy), (cx + 1, cy + 1), (cx, cy + 1)):
+            other = get(key)
+            if other:
+                for i in bucket:
+                    for j in other:
+                        low, high = (i, j) if i < j else (j, i)
+                        found = later[low]
+                        if found is None:
+                            later[low] = [high]
+                        else:
+                            found.append(high)
+    for found in later:
+        if found is not None and len(found) > 1:
+            found.sort()
+
+    bisect_left = bisect.bisect_left
+    bisect_right = bisect.bisect_right
+    rebucketed = False
+
+    def rebucket(m, key, first):
+        """Move index m to the cell at key, pairing it with asteroids from first on"""
+        nonlocal rebucketed
+        rebucketed = True
+        old_key = keys[m]
+        old_x, old_y = old_key
+        bucket = cells[old_key]
+        bucket.remove(m)
+        if not bucket:
+            del cells[old_key]
+        keys[m] = key
+        bucket = cells.get(key)
+        if bucket is None:
+            cells[key] = [m]
+        else:
+            bucket.append(m)
+        for cx in range(key[0] - 1, key[0] + 2):
+            for cy in range(key[1] - 1, key[1] + 2):
+                if -1 <= cx - old_x <= 1 and -1 <= cy - old_y <= 1:
+                    # Already a neighbour of the old cell, so its pairs are listed
+                    continue
+                for k in get((cx, cy), ()):
+                    if k < first:
+                        continue
+                    low, high = (k, m) if k < m else (m, k)
+                    found = later[low]
+                    if found is None:
+                        later[low] = [high]
+                        continue
+                    at = bisect_left(found, high)
+                    if at == len(found) or found[at] != high:
+                        found.insert(at, high)
+
+    hypot = math.hypot
+    moved = set()
+    for i in range(n):
+        candidates = later[i]
+        if candidates is None:
+            continue
+        xi = xs[i]
+        yi = ys[i]
+        ri = radii[i]
+        at = 0
+        while at < len(candidates):
+            j = candidates[at]
+            at += 1
+            min_dist = ri + radii[j]
+            # Cheap box test first, hypot is never below either component
+            dx = xi - xs[j]
+            if not -min_dist < dx < min_dist:
+                continue
+            dy = yi - ys[j]
+            if not -min_dist < dy < min_dist:
+                continue
+            dist = hypot(dx, dy)
+            if dist < min_dist and dist > 0:
+                nx = dx / dist
+                ny = dy / dist
+                dot1 = vxs[i] * nx + vys[i] * ny
+                dot2 = vxs[j] * nx + vys[j] * ny
+                vxs[i] -= dot1 * nx
+                vys[i] -= dot1 * ny
+                vxs[j] -= dot2 * nx
+                vys[j] -= dot2 * ny
+                overlap = min_dist - dist
+                xi += nx * (overlap / 2)
+                yi += ny * (overlap / 2)
+                xs[i] = xi
+                ys[i] = yi
+                xs[j] -= nx * (overlap / 2)
+                ys[j] -= ny * (overlap / 2)
+                moved.add(i)
+                moved.add(j)
+                key = (int(xs[j] // cell_size), int(ys[j] // cell_size))
+                # Rows up to i are swept already, so only later asteroids gain pairs
+                if key != keys[j]:
+                    rebucket(j, key, i + 1)
+                key = (int(xi // cell_size), int(yi // cell_size))
+                if key != keys[i]:
+                    rebucket(i, key, i + 1)
+                    # Carry on after j, including newcomers past it
+                    at = bisect_right(candidates, j)
+
+    if isinstance(asteroids, AsteroidField):
+        if moved:
+            moved = list(moved)
+            slots = live[moved]
+            asteroids.x[slots] = [xs[i] for i in moved]
+            asteroids.y[slots] = [ys[i] for i in moved]
+            asteroids.dx[slots] = [vxs[i] for i in moved]
+            asteroids.dy[slots] = [vys[i] for i in moved]
+    else:
+        for i in moved:
+            a = ordered[i]
+            a.x = xs[i]
+            a.y = ys[i]
+            a.dx = vxs[i]
+            a.dy = vys[i]
+    if rebucketed:
+        index_asteroids(asteroids, grid)
+    else:
+        # Every asteroid is still in its starting cell, so the buckets are the index
+        grid.clear(cell_size)
+        grid.cells = {key: [ordered[i] for i in bucket] for key, bucket in cells.items()}
+        grid.keys = dict(zip(ordered, keys))
+
+def asteroids_in_radius(grid, x, y, radius):
+    """Return (asteroid, distance) for every indexed asteroid centered within radius of (x, y)"""
+    found = []
+    for asteroid in grid.within(x, y, radius):
+        dist = math.hypot(asteroid.x - x, asteroid.y - y)
+        if dist < radius:
+            found.append((asteroid, dist))
+    return found
+
+def apply_explosions(explosions, grid):
+    """Apply falloff damage for every (x, y, radius, damage) explosion that landed this tick
+
+    Damage is summed per asteroid across the whole batch before it is applied.
+    """
+    totals = {}
+    for ex, ey, explosion_radius, explosion_damage in explosions:
+        for asteroid, dist_to_explosion in asteroids_in_radius(grid, ex, ey, explosion_radius):
+            # More damage closer to center
+            damage_mult = 1.0 - (dist_to_explosion / explosion_radius) * 0.5
+            entry = totals.get(id(asteroid))
+            if entry is None:
+                totals[id(asteroid)] = [asteroid, explosion_damage * damage_mult]
+            else:
+                entry[1] += explosion_damage * damage_mult
+    for asteroid, damage in totals.values():
+        asteroid.health -= damage
+
+def find_bullet_hits(bullets, asteroids, grid):
+    """Return the (bullet index, asteroid) pairs in contact this tick, in asteroid then bullet order
+
+    Expects the grid to index the asteroids, as left by resolve_asteroid_collisions.
+    """
+    n = len(bullets)
+    hits = []
+    for b_idx, bx, by in zip(range(n), bullets.x[:n].tolist(), bullets.y[:n].tolist()):
+        ignore_id = bullets.ignore_asteroid_id[b_idx]
+        for asteroid in grid.around(bx, by):
+            # Skip if this bullet should ignore this asteroid
+            if ignore_id == id(asteroid):
+                continue
+            if math.hypot(asteroid.x - bx, asteroid.y - by) < asteroid.radius + BULLET_HIT_RADIUS:
+                hits.append((asteroid, b_idx))
+    if hits:
+        order = {id(asteroid): i for i, asteroid in enumerate(asteroids)}
+        hits.sort(key=lambda hit: (order[id(hit[0])], hit[1]))
+    return [(b_idx, asteroid) for asteroid, b_idx in hits]
+
+def apply_bullet_hits(game_state, hits, grid, rng=random):
+    """Apply damage, power effects and destruction for the bullet hits found this tick"""
+    gs = game_state
+    bullets = gs["bullets"]
+    floating_texts = gs["floating_texts"]
+    upgrades = gs["upgrades"]
+    equipped_power = gs["powers"].get("equipped")
+    power_level = gs["powers"]["levels"].get(equipped_power, 0)
+
+    # Check if piercing is active via power_effects
+    max_pierce = 0
+    for effect in gs["power_effects"]:
+        if effect.get("type") == "piercing":
+            max_pierce = effect.get("pierce_count", 0)
+            break
+
+    spent_bullets = set()
+    destroyed = set()
+    struck = []
+    explosions = []
+    for b, asteroid in hits:
+        if b in spent_bullets or id(asteroid) in destroyed:
+            continue
+        bx = float(bullets.x[b])
+        by = float(bullets.y[b])
+
+        damage = 1 + upgrades.get("shot_damage", 0)
+        asteroid.health -= damage
+        struck.append(asteroid)
+
+        # Bullet Split
+        if equipped_power == "bullet_split":
+            num_splits = 1 + power_level
+            for _ in range(num_splits):
+                angle = rng.uniform(0, 2 * math.pi)
+                split_speed = BULLET_SPEED * 0.7
+                # Spawn bullets outside the asteroid radius to prevent instant re-hit
+                spawn_distance = asteroid.radius + 15
+                bullets.spawn(
+                    asteroid.x + math.cos(angle) * spawn_distance,
+                    asteroid.y + math.sin(angle) * spawn_distance,
+                    math.cos(angle) * split_speed,
+                    math.sin(angle) * split_speed,
+                    BULLET_LIFE * 0.5,
+                    ignore_asteroid_id=id(asteroid)  # Don't hit the source asteroid
+                )
+
+        # Explosive Shots - MUCH MORE POWERFUL
+        if equipped_power == "explosive_shots":
+            explosion_radius = 100 + power_level * 50  # Increased from 50 + 20
+            explosion_damage = 5 + power_level * 3  # Increased from 2 + 1
+            # Damage all asteroids in explosion radius from the hit point, once all hits are in
+            explosions.append((bx, by, explosion_radius, explosion_damage))
+
+            # Visual explosion effect - bigger and more visible
+            for _ in range(15):
+                angle = rng.uniform(0, 2 * math.pi)
+                dist = rng.uniform(0, explosion_radius)
+                floating_texts.append({
+                    "text": "💥",
+                    "x": bx + math.cos(angle) * dist,
+                    "y": by + math.sin(angle) * dist,
+                    "dx": math.cos(angle) * 50,
+                    "dy": math.sin(angle) * 50,
+                    "alpha": 255,
+                    "timer": 0.0,
+                    "color": (255, 150, 0)
+                })
+
+        # Piercing - only remove bullet if it's out of pierces
+        if max_pierce > 0 and bullets.pierce_count[b] < max_pierce:
+            bullets.pierce_count[b] += 1
+        else:
+            spent_bullets.add(b)
+
+        if asteroid.health <= 0:
+            destroyed.add(id(asteroid))
+            destroy_asteroid(gs, asteroid, rng)
+            grid.discard(asteroid)
+
+    if explosions:
+        apply_explosions(explosions, grid)
+        # Asteroids shot this tick die from their explosion damage right away, others
+        # pushed to zero health go on the next hit, as before
+        for asteroid in struck:
+            if asteroid.health <= 0 and id(asteroid) not in destroyed:
+                destroyed.add(id(asteroid))
+                destroy_asteroid(gs, asteroid, rng)
+                grid.discard(asteroid)
+
+    if spent_bullets:
+        bullets.remove_many(spent_bullets)
+
+def destroy_asteroid(game_state, asteroid, rng=random):
+    """Remove a destroyed asteroid, update quests and scatter its loot"""
+    gs = game_state
+    # Update quests
+    for quest in gs["quests"]:
+        if quest.quest_type == "destroy_asteroids":
+            quest.update_progress(1)
+        elif quest.quest_type == "destroy_boss" and asteroid.boss:
+            quest.update_progress(1)
+        elif quest.quest_type == "destroy_golden" and asteroid.golden:
+            quest.update_progress(1)
+        elif quest.quest_type == "destroy_many":
+            quest.update_progress(1)
+
+    try:
+        gs["asteroids"].remove(asteroid)
+    except ValueError:
+        pass
+
+    loot_counter = {}
+    loot_table = BOSS_LOOT_TABLE if asteroid.boss else LOOT_TABLE
+    loot_count = max(1, int(asteroid.max_health/6 + asteroid.radius/8))
+    for _ in range(loot_count):
+        r = rng.random()
+        bias = min(1.0, (asteroid.max_health + asteroid.radius) / 120.0)
+        loot_table_biased = []
+        for idx, (mat, prob) in enumerate(loot_table):
+            if idx >= len(loot_table) - 3:
+                prob = prob + prob * bias * 2.5
+            loot_table_biased.append((mat, prob))
+        total_prob = sum(p for _, p in loot_table_biased)
+        loot_table_biased = [(mat, p/total_prob) for mat, p in loot_table_biased]
+        acc = 0.0
+        for mat, prob in loot_table_biased:
+            acc += prob
+            if r <= acc:
+                # Create floating loot instead of directly adding to inventory
+                angle = rng.uniform(0, 2*math.pi)
+                speed = rng.uniform(40, 80)
+                gs["floating_loot"].append({
+                    "mat": mat,
+                    "x": asteroid.x,
+                    "y": asteroid.y,
+                    "vx": math.cos(angle) * speed,
+                    "vy": math.sin(angle) * speed,
+                    "color": list(MATERIAL_COLORS.get(mat, (255, 255, 255))),
+                    "lifetime": -1  # Never despawn
+                })
+                loot_counter[mat] = loot_counter.get(mat, 0) + 1
+                break
+
+    # Power cores from golden asteroids
+    if asteroid.golden and rng.random() < 0.3:  # 30% chance from golden
+        angle = rng.uniform(0, 2*math.pi)
+        speed = rng.uniform(40, 80)
+        gs["floating_loot"].append({
+            "mat": "Power Core",
+            "x": asteroid.x,
+            "y": asteroid.y,
+            "vx": math.cos(angle) * speed,
+            "vy": math.sin(angle) * speed,
+            "color": [100, 255, 100],  # Green
+            "lifetime": -1  # Never despawn
+        })
+        loot_counter["Power Core"] = loot_counter.get("Power Core", 0) + 1
+
+    for mat, count in loot_counter.items():
+        for _ in range(count):
+            angle = rng.uniform(0, 2*math.pi)
+            speed = rng.uniform(30, 70)
+            # Green text for power cores
+            text_color = (100, 255, 100) if mat == "Power Core" else (255, 255, 80)
+            gs["floating_texts"].append({
+                "text": f"+1 {mat}",
+                "x": asteroid.x,
+                "y": asteroid.y,
+                "dx": math.cos(angle)*speed,
+                "dy": math.sin(angle)*speed,
+                "alpha": 255,
+                "timer": 0.0,
+                "color": text_color
+            })
+
+# ==================== SIMULATION ====================
+class PhaseTimer:
+    """Sums wall time per named phase between lap() calls, a no-op until enabled"""
+
+    def __init__(self):
+        self.enabled = False
+        self.totals = {}
+        self.events = None  # List of (phase, start, end) while a trace is being captured
+        self.counters = {}  # Per-frame counts such as "asteroids.culled", summed like totals
+        self._last = 0.0
+
+    def reset(self):
+        self.totals = {}
+        self.counters = {}
+
+    def count(self, name, n):
+        if self.enabled:
+            self.counters[name] = self.counters.get(name, 0) + n
+
+    def start(self):
+        if self.enabled:
+            self._last = time.perf_counter()
+
+    def lap(self, phase):
+        """Charge the time since the previous lap (or start) to phase"""
+        if self.enabled:
+            now = time.perf_counter()
+            self.totals[phase] = self.totals.get(phase, 0.0) + now - self._last
+            if self.events is not None:
+                self.events.append((phase, self._last, now))
+            self._last = now
+
+class Simulation:
+    """Playing-state game logic stepped at a fixed rate, independent of rendering
+
+    advance() feeds real frame time into an accumulator and runs as many
+    step(dt_fixed) calls as it covers. All game randomness comes from one
+    seeded random.Random so a seed plus an input sequence replays exactly.
+    """
+
+    def __init__(self, game_state, seed=None, dt_fixed=SIM_DT, view_size=(1280, 720)):
+        self.gs = game_state
+        self.seed = seed if seed is not None else random.randrange(2 ** 32)
+        self.rng = random.Random(self.seed)
+        self.dt_fixed = dt_fixed
+        self.view_size = view_size  # Asteroids spawn just outside this view
+        self.max_asteroids = MAX_ASTEROIDS
+        self.spawn_interval = ASTEROID_SPAWN_INTERVAL
+        self.grid = SpatialHash()  # Asteroid index, rebuilt every step
+        # Golden asteroids due a sparkle, drained by WorldRenderer.draw
+        self.sparkle_emitters = deque(maxlen=SPARKLE_POOL_CAPACITY)
+        self.timer = PhaseTimer()  # Per-phase step timings, for benchmarks and profiling
+        self.accumulator = 0.0
+        self.ticks = 0
+        self.inputs = {"rotate": 0, "thrust": False, "fire": False}
+        # Camera and ship rotation before the latest step, for interpolation
+        self.prev_x = game_state["worldxposition"]
+        self.prev_y = game_state["worldyposition"]
+        self.prev_rotation = game_state["player"].rotation
+
+    def advance(self, frame_dt, inputs=None):
+        """Run the fixed steps covered by frame_dt and return the interpolation alpha in [0, 1)"""
+        if inputs is not None:
+            self.inputs = inputs
+        self.accumulator += min(frame_dt, MAX_FRAME_TIME)
+        while self.accumulator >= self.dt_fixed:
+            self.step(self.dt_fixed)
+            self.accumulator -= self.dt_fixed
+        return self.accumulator / self.dt_fixed
+
+    def view(self, alpha):
+        """Camera position and ship rotation blended between the last two steps"""
+        gs = self.gs
+        x = self.prev_x + (gs["worldxposition"] - self.prev_x) * alpha
+        y = self.prev_y + (gs["worldyposition"] - self.prev_y) * alpha
+        rotation = self.prev_rotation + (gs["player"].rotation - self.prev_rotation) * alpha
+        return x, y, rotation
+
+    def lag(self, alpha):
+        """Time offset from the latest step back to the rendered moment, to scale velocities by"""
+        return (alpha - 1.0) * self.dt_fixed
+
+    def step(self, dt):
+        """Advance the world by exactly dt seconds using the current inputs"""
+        gs = self.gs
+        rng = self.rng
+        grid = self.grid
+        inputs = self.inputs
+        player = gs["player"]
+        asteroids = gs["asteroids"]
+        bullets = gs["bullets"]
+        carried_items = gs["carried_items"]
+        floating_texts = gs["floating_texts"]
+        upgrades = gs["upgrades"]
+        timer = self.timer
+        timer.start()
+
+        self.prev_x = gs["worldxposition"]
+        self.prev_y = gs["worldyposition"]
+        self.prev_rotation = player.rotation
+        self.ticks += 1
+
+        move_asteroids(asteroids, dt, gs["worldxposition"], gs["worldyposition"])
+        tick_sparkle_timers(asteroids, dt, self.sparkle_emitters)
+
+        cam_accel = 1200.0 + 40 * upgrades.get("speed", 0)
+        cam_max_speed = 800.0 + 20 * upgrades.get("speed", 0)
+        cam_friction = 6.0
+        rot_speed = math.radians(180)
+
+        # Apply rotation
+        player.rotation += inputs.get("rotate", 0) * rot_speed * dt
+
+        # Forward thrust
+        fx = math.sin(player.rotation)
+        fy = -math.cos(player.rotation)
+
+        if inputs.get("thrust"):
+            gs["cam_vx"] += fx * cam_accel * dt
+            gs["cam_vy"] += fy * cam_accel * dt
+
+        gs["cam_vx"] = max(-cam_max_speed, min(cam_max_speed, gs["cam_vx"]))
+        gs["cam_vy"] = max(-cam_max_speed, min(cam_max_speed, gs["cam_vy"]))
+
+        gs["cam_vx"] -= gs["cam_vx"] * min(1.0, cam_friction * dt)
+        gs["cam_vy"] -= gs["cam_vy"] * min(1.0, cam_friction * dt)
+
+        gs["worldxposition"] += gs["cam_vx"] * dt
+        gs["worldyposition"] += gs["cam_vy"] * dt
+
+        gs["time_since_shot"] += dt
+
+        fire_cooldown = max(0.08, 0.8 - 0.08 * upgrades.get("shoot_speed", 0))
+
+        # Ultra Fire power
+        equipped_power = gs["powers"].get("equipped")
+        if equipped_power == "ultra_fire":
+            power_level = gs["powers"]["levels"].get(equipped_power, 0)
+            fire_cooldown = fire_cooldown / (2 + power_level * 1.5)
+
+        if inputs.get("fire") and gs["time_since_shot"] >= fire_cooldown:
+            gs["time_since_shot"] = 0.0
+            nose_offset = 18.0
+            bx = gs["worldxposition"] + fx * nose_offset
+            by = gs["worldyposition"] + fy * nose_offset
+            bvx = fx * BULLET_SPEED + gs["cam_vx"]
+            bvy = fy * BULLET_SPEED + gs["cam_vy"]
+            bullets.spawn(bx, by, bvx, bvy, BULLET_LIFE)
+        timer.lap("movement")
+
+        collide_ship_with_asteroids(gs)
+
+        # Also leaves the grid indexing every asteroid for the queries below
+        resolve_asteroid_collisions(asteroids, grid)
+        timer.lap("collisions")
+
+        # Auto-aim
+        if equipped_power == "auto_aim" and gs["power_effects"]:
+            steer_bullets(bullets, grid, gs["power_effects"][0].get("strength", 0), dt)
+        bullets.integrate(dt)
+        timer.lap("bullets")
+
+        update_power_effects(gs, dt, grid)
+        timer.lap("powers")
+
+        hits = find_bullet_hits(bullets, asteroids, grid)
+        apply_bullet_hits(gs, hits, grid, rng)
+        timer.lap("hits")
+
+        right_x = math.cos(player.rotation)
+        right_y = math.sin(player.rotation)
+        k_spring = 6.0
+        damping = 2.0
+        for item in carried_items:
+            a_lat = gs["cam_vx"] * right_x + gs["cam_vy"] * right_y
+            ang_acc = -k_spring * (item["rel_angle"] - math.pi) - damping * item["ang_vel"] - (a_lat) * 0.09
+            item["ang_vel"] += ang_acc * dt
+            item["rel_angle"] += item["ang_vel"] * dt
+
+        # Collision between carried items
+        item_radius = 8
+        for i, item1 in enumerate(carried_items):
+            for j, item2 in enumerate(carried_items):
+                if i >= j:
+                    continue
+                # Calculate positions
+                ang1 = player.rotation + item1["rel_angle"]
+                ang2 = player.rotation + item2["rel_angle"]
+                x1 = math.sin(ang1) * item1["length"]
+                y1 = -math.cos(ang1) * item1["length"]
+                x2 = math.sin(ang2) * item2["length"]
+                y2 = -math.cos(ang2) * item2["length"]
+                # Check collision
+                dx = x2 - x1
+                dy = y2 - y1
+                dist = math.hypot(dx, dy)
+                min_dist = item_radius * 2
+                if dist < min_dist and dist > 0:
+                    # Push items apart by adjusting angles
+                    push = 0.15 * (min_dist - dist) / dist * dt * 60  # Tuned per 60 fps frame
+                    item1["ang_vel"] -= push
+                    item2["ang_vel"] += push
+
+        for ft in floating_texts[:]:
+            ft["x"] += ft["dx"] * dt
+            ft["y"] += ft["dy"] * dt
+            ft["timer"] += dt
+            ft["alpha"] -= 120 * dt
+            if ft["alpha"] <= 0 or ft["timer"] > 2.0:
+                floating_texts.remove(ft)
+        timer.lap("cargo")
+
+        self.update_loot(dt)
+        timer.lap("loot")
+
+        # Update outer space detection and animation
+        dist_from_base = math.hypot(gs["worldxposition"] - BASE_X, gs["worldyposition"] - BASE_Y)
+        gs["in_outer_space"] = dist_from_base > OUTER_SPACE_DISTANCE
+
+        # Track travel distance quest
+        for quest in gs["quests"]:
+            if quest.quest_type == "travel_distance":
+                # Update if current distance is greater than progress
+                if dist_from_base > quest.progress:
+                    quest.progress = int(dist_from_base)
+                    if quest.progress >= quest.target:
+                        quest.progress = quest.target
+                        quest.completed = True
+
+        # Animate outer space text
+        if gs["in_outer_space"]:
+            gs["outer_space_anim"] = min(1.0, gs["outer_space_anim"] + dt * 2.0)
+        else:
+            gs["outer_space_anim"] = max(0.0, gs["outer_space_anim"] - dt * 2.0)
+
+        # Update coin animations
+        for coin in gs["coin_animations"][:]:
+            coin["progress"] += dt * 2.5  # Animation speed
+            if coin["progress"] >= 1.0:
+                gs["coin_animations"].remove(coin)
+                gs["currency_display"] += coin["value"]
+
+        # Smooth currency display animation
+        if gs["currency_display"] < gs["currency"]:
+            diff = gs["currency"] - gs["currency_display"]
+            gs["currency_display"] += min(diff, diff * 5 * dt)
+        elif gs["currency_display"] > gs["currency"]:
+            gs["currency_display"] = gs["currency"]
+
+        # Update quest cooldown and generate new quests ONE AT A TIME
+        if gs["quest_cooldown"] > 0:
+            gs["quest_cooldown"] -= dt
+            if gs["quest_cooldown"] <= 0:
+                gs["quest_cooldown"] = 0
+                # Generate ONE new quest if we have less than 3
+                if len(gs["quests"]) < 3:
+                    gs["quests"].append(Quest(rng=rng))
+                    # If still less than 3, set cooldown for next quest
+                    if len(gs["quests"]) < 3:
+                        gs["quest_cooldown"] = 120.0
+        timer.lap("quests")
+
+        self.spawn_asteroids(dt)
+        timer.lap("spawning")
+
+    def collect_loot(self, loot):
+        """Move a floating loot item onto the ship's tether and count it for quests"""
+        gs = self.gs
+        rng = self.rng
+        # Update collection quests
+        for quest in gs["quests"]:
+            if quest.quest_type == "collect_iron" and loot["mat"] == "Iron":
+                quest.update_progress(1)
+            elif quest.quest_type == "collect_gold" and loot["mat"] == "Gold":
+                quest.update_progress(1)
+            elif quest.quest_type == "collect_diamond" and loot["mat"] == "Diamond":
+                quest.update_progress(1)
+            elif quest.quest_type == "collect_rare" and loot["mat"] in ["Titanium", "Platinum", "Uranium", "Diamond", "Power Core"]:
+                quest.update_progress(1)
+
+        gs["carried_items"].append({
+            "mat": loot["mat"],
+            "rel_angle": math.pi + rng.uniform(-0.8, 0.8),
+            "ang_vel": rng.uniform(-1.0, 1.0),
+            "length": 55 + rng.uniform(-10, 15),
+            "color": loot["color"],
+        })
+        gs["floating_loot"].remove(loot)
+
+    def update_loot(self, dt):
+        """Drift floating loot and handle magnet, drop zone and pickup"""
+        gs = self.gs
+        upgrades = gs["upgrades"]
+        carried_items = gs["carried_items"]
+        storage_capacity = 5 + 5 * upgrades.get("storage", 0)
+        equipped_power = gs["powers"].get("equipped")
+        magnet_active = equipped_power == "magnet" and len(gs["power_effects"]) > 0
+        magnet_range = gs["power_effects"][0].get("range", 0) if magnet_active else 0
+
+        # Update drop cooldown
+        if gs["drop_cooldown"] > 0:
+            gs["drop_cooldown"] -= dt
+
+        for loot in gs["floating_loot"][:]:
+            # Magnet - INSTANT COLLECTION within range
+            if magnet_active and magnet_range > 0:
+                dist = math.hypot(gs["worldxposition"] - loot["x"], gs["worldyposition"] - loot["y"])
+                if dist < magnet_range and len(carried_items) < storage_capacity:
+                    self.collect_loot(loot)
+                    continue
+
+            # Apply friction
+            friction = 0.95 ** (dt * 60)  # Tuned per 60 fps frame
+            loot["vx"] *= friction
+            loot["vy"] *= friction
+
+            # Check if loot is in drop zone (only if power shop not unlocked)
+            if not upgrades.get("powers_unlocked", False):
+                dist_to_zone = math.hypot(loot["x"] - DROP_ZONE_X, loot["y"] - DROP_ZONE_Y)
+                if dist_to_zone < DROP_ZONE_RADIUS:
+                    # Check if this material is needed
+                    if loot["mat"] in POWER_SHOP_MATERIALS:
+                        current = gs["power_shop_materials"].get(loot["mat"], 0)
+                        needed = POWER_SHOP_MATERIALS[loot["mat"]]
+                        if current < needed:
+                            gs["power_shop_materials"][loot["mat"]] = current + 1
+                            gs["floating_loot"].remove(loot)
+                            # Add floating text
+                            gs["floating_texts"].append({
+                                "text": f"+1 {loot['mat']} (Build)",
+                                "x": DROP_ZONE_X,
+                                "y": DROP_ZONE_Y,
+                                "dx": 0,
+                                "dy": -50,
+                                "alpha": 255,
+                                "timer": 0.0,
+                                "color": (100, 255, 100)
+                            })
+                            continue
+
+            # Update position
+            loot["x"] += loot["vx"] * dt
+            loot["y"] += loot["vy"] * dt
+            if loot["lifetime"] > 0:  # Only decrease if not permanent
+                loot["lifetime"] -= dt
+
+            # Check if player picks it up (only if cooldown expired)
+            if gs["drop_cooldown"] <= 0:
+                dist_to_player = math.hypot(loot["x"] - gs["worldxposition"], loot["y"] - gs["worldyposition"])
+                if dist_to_player < 30 and len(carried_items) < storage_capacity:  # Pickup radius
+                    self.collect_loot(loot)
+                    continue
+
+    def spawn_asteroids(self, dt):
+        """Spawn asteroids just outside the view, bigger and tougher farther from base"""
+        gs = self.gs
+        rng = self.rng
+        asteroids = gs["asteroids"]
+        gs["spawn_timer"] += dt
+        if gs["spawn_timer"] < self.spawn_interval:
+            return
+        gs["spawn_timer"] = 0.0
+        if len(asteroids) >= self.max_asteroids:
+            return
+
+        # Spawn at edge of screen + some distance
+        ang = rng.random() * 2 * math.pi
+        spawn_distance = max(self.view_size) // 2 + rng.randint(100, 300)
+        rx = gs["worldxposition"] + math.cos(ang) * spawn_distance
+        ry = gs["worldyposition"] + math.sin(ang) * spawn_distance
+        base_dist = math.hypot(rx - BASE_X, ry - BASE_Y)
+        # Increased spawn chance at far distances
+        spawn_chance = max(0.15, 1.0 * math.exp(-base_dist / 4500))
+        if base_dist > 3000:
+            spawn_chance = min(0.95, spawn_chance * 1.5)  # Much higher chance far away
+        if rng.random() > spawn_chance:
+            return
+
+        # Incremental scaling based on distance
+        # Size scales from 1.0 at base to higher values far away
+        size_scale = 1.0 + (base_dist / 2000.0)  # Gradual increase
+        size_scale = min(size_scale, 10.0)  # Cap at 10x
+
+        # Boss probability increases with distance
+        boss_prob = min(0.15, 0.02 + (base_dist / 20000.0))
+        is_boss = rng.random() < boss_prob and base_dist > 2000
+
+        # Calculate health based on size scale
+        if is_boss:
+            base_health = 40
+            health = int(base_health * size_scale * rng.uniform(0.8, 1.2))
+        else:
+            base_health = rng.randint(6, 18)
+            health = int(base_health * size_scale * rng.uniform(0.9, 1.1))
+
+        # Calculate radius based on size scale
+        if is_boss:
+            radius = int((32 + base_dist / 200) * rng.uniform(0.9, 1.1))
+        else:
+            radius = int((8 + base_dist / 400) * rng.uniform(0.9, 1.1))
+
+        radius = max(MIN_ASTEROID_RADIUS, min(radius, MAX_ASTEROID_RADIUS))  # Clamp between 8 and 80
+
+        asteroids.append(Asteroid(rx, ry, rng.uniform(-30, 30), rng.uniform(-30, 30), health=health, boss=is_boss, rng=rng))
+        asteroids[-1].radius = radius
+        asteroids[-1].max_health = health
+
+# ==================== HEADLESS ====================
+def scripted_inputs(sim):
+    """Default headless pilot, deciding from the simulation's current state
+
+    Flies to the nearest floating loot while there is cargo room, otherwise turns
+    towards the nearest asteroid and fires once lined up. With nothing in reach it
+    thrusts in bursts and sweeps left and right.
+    """
+    gs = sim.gs
+    x, y = gs["worldxposition"], gs["worldyposition"]
+    storage_capacity = 5 + 5 * gs["upgrades"].get("storage", 0)
+    target = None
+    if len(gs["carried_items"]) < storage_capacity:
+        loot = min(gs["floating_loot"], key=lambda l: math.hypot(l["x"] - x, l["y"] - y), default=None)
+        if loot is not None and math.hypot(loot["x"] - x, loot["y"] - y) < 600:
+            target = (loot["x"], loot["y"], True)
+    if target is None:
+        asteroid = sim.grid.nearest(x, y, 900)
+        if asteroid is not None:
+            target = (asteroid.x, asteroid.y, False)
+    if target is None:
+        tick = sim.ticks
+        return {
+            "rotate": 1 if (tick // 240) % 2 else -1,
+            "thrust": (tick // 60) % 3 != 0,
+            "fire": True,
+        }
+
+    tx, ty, is_loot = target
+    # The ship faces (sin r, -cos r), wrap the heading error into [-pi, pi)
+    error = (math.atan2(tx - x, y - ty) - gs["player"].rotation + math.pi) % (2 * math.pi) - math.pi
+    aligned = abs(error) < 0.15
+    dist = math.hypot(tx - x, ty - y)
+    return {
+        "rotate": 0 if abs(error) < 0.03 else (1 if error > 0 else -1),
+        "thrust": aligned and (is_loot or dist > 250),
+        "fire": aligned and not is_loot,
+    }
+
+def run_headless(ticks, seed=None, inputs=None, record=None, world=None,
+                 asteroid_backend="list", max_asteroids=MAX_ASTEROIDS,
+                 spawn_interval=ASTEROID_SPAWN_INTERVAL, dt=SIM_DT):
+    """Step a Simulation with no display or rendering and return throughput stats
+
+    inputs is a list of per-tick input dicts (replayed in order, then held at the
+    last one) or None for scripted_inputs. If record is a file path the inputs
+    used are written there with the seed, so the run can be replayed. Without a
+    seed one is drawn up front, so the world and the simulation share it.
+    """
+    if seed is None:
+        seed = random.randrange(2 ** 32)
+    rng = random.Random(seed)
+    if world:
+        data = load_world(world)
+        if data is None:
+            raise FileNotFoundError(f"No saved world named {world!r}")
+        gs = load_game_state_from_data(data, asteroid_backend, rng=rng)
+    else:
+        gs = create_new_game_state(asteroid_backend, rng=rng)
+    sim = Simulation(gs, seed=seed, dt_fixed=dt)
+    sim.max_asteroids = max_asteroids
+    sim.spawn_interval = spawn_interval
+
+    used = []
+    start = time.perf_counter()
+    for tick in range(ticks):
+        if inputs is None:
+            tick_inputs = scripted_inputs(sim)
+        elif inputs:
+            tick_inputs = inputs[min(tick, len(inputs) - 1)]
+        else:
+            tick_inputs = {}
+        sim.inputs = tick_inputs
+        sim.step(dt)
+        if record:
+            used.append([tick_inputs.get("rotate", 0), int(bool(tick_inputs.get("thrust"))), int(bool(tick_inputs.get("fire")))])
+    elapsed = time.perf_counter() - start
+
+    if record:
+        with open(record, "w") as f:
+            json.dump({"seed": sim.seed, "dt": dt, "inputs": used}, f)
+
+    return {
+        "seed": sim.seed,
+        "ticks": ticks,
+        "sim_seconds": round(ticks * dt, 3),
+        "wall_seconds": round(elapsed, 3),
+        "ticks_per_second": round(ticks / elapsed, 1) if elapsed > 0 else None,
+        "asteroids": len(gs["asteroids"]),
+        "bullets": len(gs["bullets"]),
+        "floating_loot": len(gs["floating_loot"]),
+        "carried_items": len(gs["carried_items"]),
+        "currency": gs["currency"],
+    }
+
+def load_recorded_inputs(path):
+    """Read a file written by run_headless(record=...), returns (seed, dt, inputs)"""
+    with open(path, "r") as f:
+        data = json.load(f)
+    inputs = [{"rotate": r, "thrust": bool(t), "fire": bool(fi)} for r, t, fi in data["inputs"]]
+    return data.get("seed"), data.get("dt", SIM_DT), inputs
+
+def headless_main(argv):
+    """Command line for headless runs, see --help"""
+    usage = ("usage: python main.py --headless [--ticks N] [--seed N] [--inputs FILE] [--record FILE]\n"
+             "                      [--world NAME] [--asteroids N] [--spawn-interval SECONDS]\n"
+             "                      [--backend list|numpy]")
+    options = {"--ticks": None, "--seed": None, "--inputs": None, "--record": None,
+               "--world": None, "--asteroids": str(MAX_ASTEROIDS),
+               "--spawn-interval": str(ASTEROID_SPAWN_INTERVAL), "--backend": "list"}
+    args = [a for a in argv if a != "--headless"]
+    i = 0
+    while i < len(args):
+        if args[i] in ("-h", "--help"):
+            print(usage)
+            return 0
+        if args[i] not in options or i + 1 >= len(args):
+            print(usage)
+            return 2
+        options[args[i]] = args[i + 1]
+        i += 2
+
+    seed = int(options["--seed"]) if options["--seed"] is not None else None
+    inputs = None
+    dt = SIM_DT
+    if options["--inputs"]:
+        recorded_seed, dt, inputs = load_recorded_inputs(options["--inputs"])
+        if seed is None:
+            seed = recorded_seed
+    if options["--ticks"] is not None:
+        ticks = int(options["--ticks"])
+    elif inputs:
+        ticks = len(inputs)  # Replay the whole recording unless told otherwise
+    else:
+        ticks = 7200
+
+    stats = run_headless(ticks, seed=seed, inputs=inputs, record=options["--record"],
+                         world=options["--world"], asteroid_backend=options["--backend"],
+                         max_asteroids=int(options["--asteroids"]),
+                         spawn_interval=float(options["--spawn-interval"]), dt=dt)
+    print(json.dumps(stats))
+    return 0
+
+# ==================== PROFILING ====================
+class FrameProfiler:
+    """Opt-in per-frame phase timings: a rolling stacked-bar overlay and Chrome trace export
+
+    Phases come from PhaseTimers: the main loop's own timer plus any attached with
+    attach(), such as the Simulation's and WorldRenderer's. All of them stay disabled,
+    and cost a flag check per phase, unless the overlay is shown or a trace is running.
+    """
+    PALETTE = [
+        (230, 80, 80), (240, 160, 60), (240, 220, 80), (140, 220, 80), (60, 200, 140),
+        (60, 190, 230), (90, 120, 240), (170, 100, 240), (230, 100, 200), (200, 200, 200),
+    ]
+
+    def __init__(self):
+        self.show = False
+        self.main = PhaseTimer()  # Main loop phases: input, network, hud, flip...
+        self.timers = {"main": self.main}
+        self.history = deque(maxlen=PROFILER_HISTORY)  # One {phase: ms} dict per frame
+        self.counters = {}  # Last frame's timer counters, such as "render.asteroids.culled"
+        self.colors = {}
+        self.trace_frames_left = 0
+        self.trace_events = []
+        self.message = ""
+        self.message_timer = 0.0
+        self.startup = {}  # {phase: ms} of one-off setup work, from record_startup()
+        self._frame_start = 0.0
+
+    @property
+    def active(self):
+        return self.show or self.trace_frames_left > 0
+
+    def attach(self, name, timer):
+        """Collect timer's phases as "name.phase", replacing any timer attached under name"""
+        self.timers[name] = timer
+        self._sync()
+
+    def _sync(self):
+        tracing = self.trace_frames_left > 0
+        for timer in self.timers.values():
+            timer.enabled = self.active
+            timer.events = [] if tracing else None
+            timer.start()  # Switched on mid-frame, so time from here rather than from a stale lap
+
+    def record_startup(self, timer):
+        """Keep and print a finished timer's phases as the startup profile"""
+        self.startup = {phase: secs * 1000.0 for phase, secs in timer.totals.items()}
+        phases = ", ".join(f"{phase} {ms:.1f}" for phase, ms in self.startup.items())
+        print(f"Startup {sum(self.startup.values()):.1f} ms ({phases})")
+
+    def toggle(self):
+        self.show = not self.show
+        self.history.clear()
+        self._frame_start = time.perf_counter()
+        self._sync()
+
+    def start_trace(self, frames=PROFILER_TRACE_FRAMES):
+        self.trace_frames_left = frames
+        self.trace_events = []
+        self._frame_start = time.perf_counter()
+        self._sync()
+
+    def begin_frame(self):
+        if not self.active:
+            return
+        for timer in self.timers.values():
+            timer.reset()
+        self._frame_start = time.perf_counter()
+        self.main.start()
+
+    def lap(self, phase):
+        self.main.lap(phase)
+
+    def skip(self):
+        """Don't charge the time since the last lap to any main phase, it was timed elsewhere"""
+        self.main.start()
+
+    def end_frame(self, dt):
+        if self.message_timer > 0:
+            self.message_timer -= dt
+        if not self.active:
+            return
+        frame = {}
+        counters = {}
+        for name, timer in self.timers.items():
+            for phase, secs in timer.totals.items():
+                frame[f"{name}.{phase}"] = secs * 1000.0
+            for counter, n in timer.counters.items():
+                counters[f"{name}.{counter}"] = n
+        self.history.append(frame)
+        self.counters = counters
+
+        if self.trace_frames_left > 0:
+            end = time.perf_counter()
+            events = self.trace_events
+            events.append(self._trace_event("frame", "frame", 0, self._frame_start, end))
+            for tid, (name, timer) in enumerate(self.timers.items(), 1):
+                for phase, start, stop in timer.events:
+                    events.append(self._trace_event(phase, name, tid, start, stop))
+                timer.events = []
+            # Counter tracks, one per "timer.pass" with a series per count
+            tracks = {}
+            for counter, n in counters.items():
+                track, _, series = counter.rpartition(".")
+                tracks.setdefault(track, {})[series] = n
+            for track, args in tracks.items():
+                events.append({"name": track, "ph": "C", "pid": 1, "ts": round(end * 1e6, 1), "args": args})
+            self.trace_frames_left -= 1
+            if self.trace_frames_left == 0:
+                self._write_trace()
+                self._sync()
+
+    def _trace_event(self, name, category, tid, start, stop):
+        return {"name": name, "cat": category, "ph": "X", "pid": 1, "tid": tid,
+                "ts": round(start * 1e6, 1), "dur": round((stop - start) * 1e6, 1)}
+
+    def _write_trace(self):
+        """Write the captured frames as Chrome trace-event JSON (chrome://tracing, Perfetto)"""
+        os.makedirs(PROFILES_DIR, exist_ok=True)
+        path = os.path.join(PROFILES_DIR, time.strftime("trace-%Y%m%d-%H%M%S.json"))
+        thread_names = [{"name": "thread_name", "ph": "M", "pid": 1, "tid": tid, "args": {"name": name}}
+                        for tid, name in enumerate(["frame"] + list(self.timers))]
+        with open(path, "w") as f:
+            json.dump({"traceEvents": thread_names + self.trace_events, "displayTimeUnit": "ms",
+                       "otherData": {"startup_ms": self.startup}}, f)
+        self.trace_events = []
+        self.message = f"Trace saved to {path}"
+        self.message_timer = 4.0
+        print(self.message)
+
+    def color(self, phase):
+        if phase not in self.colors:
+            self.colors[phase] = self.PALETTE[len(self.colors) % len(self.PALETTE)]
+        return self.colors[phase]
+
+    def draw(self, screen, font):
+        """Stacked bar per frame, 1 px per 0.25 ms, with the 60 fps budget marked"""
+        if self.message_timer > 0:
+            msg = font.render(self.message, True, (255, 255, 255))
+            screen.blit(msg, (screen.get_width() - msg.get_width() - 20, screen.get_height() - 60))
+        if not self.show:
+            return
+        bar_w = 2
+        graph_w = PROFILER_HISTORY * bar_w
+        graph_h = 160
+        px_per_ms = 4.0
+        x0 = screen.get_width() - graph_w - 20
+        y0 = 120
+        panel = pygame.Surface((graph_w + 240, graph_h + 80), pygame.SRCALPHA)  # Counters sit under the graph
+        panel.fill((0, 0, 0, 170))
+        screen.blit(panel, (x0 - 230, y0 - 10))
+
+        averages = {}
+        for i, frame in enumerate(self.history):
+            x = x0 + i * bar_w
+            y = y0 + graph_h
+            for phase, ms in frame.items():
+                averages[phase] = averages.get(phase, 0.0) + ms
+                h = ms * px_per_ms
+                if h < 0.5:
+                    continue
+                y -= h
+                if y < y0:
+                    pygame.draw.rect(screen, self.color(phase), (x, y0, bar_w, y + h - y0))
+                    break
+                pygame.draw.rect(screen, self.color(phase), (x, int(y), bar_w, max(1, int(h))))
+        budget_y = y0 + graph_h - int(1000.0 / 60 * px_per_ms)
+        pygame.draw.line(screen, (255, 255, 255), (x0, budget_y), (x0 + graph_w, budget_y), 1)
+
+        # Legend: slowest phases on average
+        count = max(1, len(self.history))
+        ranked = sorted(averages.items(), key=lambda item: -item[1])[:8]
+        total = sum(averages.values()) / count
+        label = font.render(f"frame {total:.2f} ms", True, (255, 255, 255))
+        screen.blit(label, (x0 - 220, y0))
+        for row, (phase, ms) in enumerate(ranked):
+            pygame.draw.rect(screen, self.color(phase), (x0 - 220, y0 + 24 + row * 18, 10, 10))
+            text = font.render(f"{phase} {ms / count:.2f}", True, (220, 220, 220))
+            screen.blit(text, (x0 - 205, y0 + 20 + row * 18))
+        # Culling: drawn/total per pass, last frame
+        row = 0
+        for counter, n in sorted(self.counters.items()):
+            if not counter.endswith(".drawn"):
+                continue
+            track = counter[:-len(".drawn")]
+            total = n + self.counters.get(track + ".culled", 0)
+            text = font.render(f"{track.split('.', 1)[-1]} {n}/{total}", True, (180, 220, 180))
+            screen.blit(text, (x0 + (row % 2) * 180, y0 + graph_h + 14 + (row // 2) * 18))
+            row += 1
+        if self.startup:
+            slowest = max(self.startup, key=self.startup.get)
+            text = text_cache.render(font, f"startup {sum(self.startup.values()):.0f} ms, {slowest} "
+                                           f"{self.startup[slowest]:.0f} ms", True, (180, 180, 180))
+            screen.blit(text, (x0 - 220, y0 + graph_h + 14))
+
+# ==================== RENDERING ====================
+class SurfaceCache:
+    """LRU cache of built Surfaces, evicting the least recently used past max_bytes"""
+
+    def __init__(self, max_bytes, max_items=None):
+        self.max_bytes = max_bytes
+        self.max_items = max_items
+        self.entries = OrderedDict()  # key -> Surface, least recently used first
+        self.bytes = 0
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self):
+        return len(self.entries)
+
+    @staticmethod
+    def surface_bytes(surf):
+        return surf.get_width() * surf.get_height() * surf.get_bytesize()
+
+    def get(self, key, build):
+        """Return the Surface cached under key, calling build() to make it on a miss"""
+        surf = self.entries.get(key)
+        if surf is not None:
+            self.entries.move_to_end(key)
+            self.hits += 1
+            return surf
+        self.misses += 1
+        surf = build()
+        self.entries[key] = surf
+        self.bytes += self.surface_bytes(surf)
+        while len(self.entries) > 1 and (self.bytes > self.max_bytes or
+                                         (self.max_items is not None and len(self.entries) > self.max_items)):
+            _, old = self.entries.popitem(last=False)
+            self.bytes -= self.surface_bytes(old)
+        return surf
+
+    def clear(self):
+        self.entries.clear()
+        self.bytes = 0
+
+class Viewport:
+    """The screen's rectangle in world space around a camera, for culling draw passes
+
+    visible() takes an entity's extent beyond its center, so big sprites and the
+    labels above them count as on screen while any part of them could be.
+    """
+
+    def __init__(self, view_x, view_y, width, height, margin=VIEW_CULL_MARGIN, zoom=1.0):
+        # width, height and margin are in screen pixels, zoom is pixels per world unit
+        width, height, margin = width / zoom, height / zoom, margin / zoom
+        self.offset_x = width // 2 - view_x  # Add to a world x, then multiply by zoom, to get a screen x
+        self.offset_y = height // 2 - view_y
+        self.left = -self.offset_x - margin
+        self.top = -self.offset_y - margin
+        self.right = -self.offset_x + width + margin
+        self.bottom = -self.offset_y + height + margin
+
+    def visible(self, x, y, extent=0):
+        return (self.left - extent <= x <= self.right + extent and
+                self.top - extent <= y <= self.bottom + extent)
+
+    def asteroids(self, asteroids, lag=0.0):
+        """Asteroids that may reach the screen at their lag-extrapolated positions
+
+        Returns (x, y, radius, golden, boss, health, max_health) rows, see
+        AsteroidField.drawable.
+        """
+        if isinstance(asteroids, AsteroidField):
+            return asteroids.drawable(self.left, self.top, self.right, self.bottom, ASTEROID_LABEL_PAD, lag)
+        left, top, right, bottom = self.left, self.top, self.right, self.bottom
+        rows = []
+        for a in asteroids:
+            x = a.x + a.dx * lag
+            y = a.y + a.dy * lag
+            reach = a.radius + ASTEROID_LABEL_PAD
+            if left - reach <= x <= right + reach and top - reach <= y <= bottom + reach:
+                rows.append((x, y, a.radius, a.golden, a.boss, a.health, a.max_health))
+        return rows
+
+class TextCache(SurfaceCache):
+    """SurfaceCache of rendered text keyed by (font, text, color, antialias)
+
+    The returned Surfaces are shared, so callers must not set_alpha or draw on them.
+    """
+
+    def render(self, font, text, antialias, color):
+        """Drop-in for font.render(text, antialias, color)"""
+        color = tuple(color)
+        return self.get((font, text, color, antialias), lambda: font.render(text, antialias, color))
+
+text_cache = TextCache(TEXT_CACHE_BYTES, TEXT_CACHE_ITEMS)
+
+class GlowCache(SurfaceCache):
+    """SurfaceCache of translucent decorative layers: glows, halos, rings and coins
+
+    Keys are built from color, size and alpha, so animated callers quantize
+    (pulse radius to whole pixels, fades with quantize_alpha) to stay on a
+    bounded set of entries.
+    """
+
+    @staticmethod
+    def quantize_alpha(alpha):
+        return max(0, min(255, int(alpha + GLOW_ALPHA_STEP / 2) // GLOW_ALPHA_STEP * GLOW_ALPHA_STEP))
+
+    def circle(self, color, radius, alpha, width=0):
+        """Translucent circle, or ring if width, centered in a radius*2 square"""
+        color = tuple(color[:3])
+
+        def build():
+            surf = pygame.Surface((radius * 2, radius * 2), pygame.SRCALPHA)
+            pygame.draw.circle(surf, (*color, alpha), (radius, radius), radius, width)
+            return surf
+        return self.get(("circle", color, radius, alpha, width), build)
+
+    def dot(self, color, radius):
+        """Opaque filled circle to stamp in place of pygame.draw.circle, batched through blits()"""
+        return self.circle(color, radius, 255)
+
+    def loot_core(self, color, radius):
+        """Floating loot: core with a white rim under its own glow, in a radius*4 square"""
+        color = tuple(color[:3])
+
+        def build():
+            surf = pygame.Surface((radius * 4, radius * 4), pygame.SRCALPHA)
+            center = (radius * 2, radius * 2)
+            pygame.draw.circle(surf, (*color, 60), center, radius * 2)
+            # The glow is the core's own color, so it only tints the white rim
+            pygame.draw.circle(surf, color, center, radius)
+            rim = tuple(int(255 + (c - 255) * 60 / 255) for c in color)
+            pygame.draw.circle(surf, rim, center, radius, 2)
+            return surf
+        return self.get(("loot_core", color, radius), build)
+
+    def rounded_rect(self, color, size, alpha, border_radius):
+        color = tuple(color[:3])
+
+        def build():
+            surf = pygame.Surface((size, size), pygame.SRCALPHA)
+            pygame.draw.rect(surf, (*color, alpha), (0, 0, size, size), border_radius=border_radius)
+            return surf
+        return self.get(("rounded_rect", color, size, alpha, border_radius), build)
+
+    def coin(self, alpha, radius=10):
+        """Coin for the sell animation, radius*2 square"""
+        alpha = self.quantize_alpha(alpha)
+
+        def build():
+            surf = pygame.Surface((radius * 2, radius * 2), pygame.SRCALPHA)
+            pygame.draw.circle(surf, (255, 220, 100, alpha), (radius, radius), radius)
+            pygame.draw.circle(surf, (255, 255, 150, alpha), (radius, radius), int(radius * 0.7))
+            return surf
+        return self.get(("coin", alpha, radius), build)
+
+    def magnet_field(self, radius):
+        def build():
+            surf = pygame.Surface((radius * 2, radius * 2), pygame.SRCALPHA)
+            # Multiple rings for better visibility
+            pygame.draw.circle(surf, (255, 255, 100, 40), (radius, radius), radius)
+            pygame.draw.circle(surf, (255, 255, 150, 80), (radius, radius), radius, 3)
+            pygame.draw.circle(surf, (255, 255, 200, 60), (radius, radius), int(radius * 0.7), 2)
+            return surf
+        return self.get(("magnet_field", radius), build)
+
+glow_cache = GlowCache(GLOW_CACHE_BYTES)
+
+class ShipSprites(SurfaceCache):
+    """SHIP_COSMETICS designs pre-rendered per color at SHIP_SPRITE_ANGLES rotations
+
+    Sprites are square and centered on the ship's origin, filled in its color
+    with the white outline.
+    """
+
+    def sprite(self, design, color, rotation, scale=1.0):
+        """Sprite for design turned rotation radians, unknown designs fall back to the default"""
+        if design not in SHIP_COSMETICS:
+            design = "default"
+        index = round(rotation * SHIP_SPRITE_ANGLES / (2 * math.pi)) % SHIP_SPRITE_ANGLES
+        color = tuple(color)
+        return self.get((design, color, index, scale), lambda: self._build(design, color, index, scale))
+
+    @staticmethod
+    def _build(design, color, index, scale):
+        points = [(x * scale, y * scale) for x, y in SHIP_COSMETICS[design]["points"]]
+        half = int(math.ceil(max(math.hypot(x, y) for x, y in points))) + 2  # Room for the outline
+        angle = index * 2 * math.pi / SHIP_SPRITE_ANGLES
+        cosr = math.cos(angle)
+        sinr = math.sin(angle)
+        rot_pts = [(x * cosr - y * sinr + half, x * sinr + y * cosr + half) for x, y in points]
+        surf = pygame.Surface((half * 2, half * 2), pygame.SRCALPHA)
+        pygame.draw.polygon(surf, color, rot_pts)
+        pygame.draw.polygon(surf, (255, 255, 255), rot_pts, 2)  # White outline
+        return surf
+
+class SparklePool:
+    """Fixed-capacity pool of short-lived golden asteroid sparkles with swap-remove
+
+    Sparkles keep their offset from the asteroid that emitted them so they drift
+    with it. They are purely visual, so they use their own RNG rather than the
+    simulation's.
+    """
+
+    def __init__(self, capacity=SPARKLE_POOL_CAPACITY, rng=None):
+        self.capacity = capacity
+        self.rng = rng if rng is not None else random.Random()
+        self.owner = [None] * capacity
+        self.ox = [0.0] * capacity
+        self.oy = [0.0] * capacity
+        self.life = [0.0] * capacity
+        self.size = [0] * capacity
+        self.color = [SPARKLE_COLORS[0]] * capacity
+        self.count = 0
+
+    def __len__(self):
+        return self.count
+
+    def emit(self, asteroid):
+        """Add a sparkle somewhere on asteroid, dropped if the pool is full"""
+        i = self.count
+        if i >= self.capacity:
+            return
+        rng = self.rng
+        spark_angle = rng.uniform(0, 2 * math.pi)
+        spark_dist = rng.uniform(0, asteroid.radius * 0.9)
+        self.owner[i] = asteroid
+        self.ox[i] = math.cos(spark_angle) * spark_dist
+        self.oy[i] = math.sin(spark_angle) * spark_dist
+        self.life[i] = SPARKLE_LIFE
+        self.size[i] = rng.randint(2, 4)
+        self.color[i] = rng.choice(SPARKLE_COLORS)
+        self.count = i + 1
+
+    def update(self, dt):
+        """Age every sparkle and swap-remove the expired ones"""
+        i = 0
+        while i < self.count:
+            self.life[i] -= dt
+            if self.life[i] > 0:
+                i += 1
+                continue
+            last = self.count - 1
+            self.owner[i] = self.owner[last]
+            self.ox[i] = self.ox[last]
+            self.oy[i] = self.oy[last]
+            self.life[i] = self.life[last]
+            self.size[i] = self.size[last]
+            self.color[i] = self.color[last]
+            self.owner[last] = None
+            self.count = last
+
+    def draw(self, screen, offset_x, offset_y, lag=0.0, zoom=1.0):
+        """Draw every sparkle in one blits() call, shrinking as it ages
+
+        A world point maps to the screen at (x + offset_x) * zoom.
+        """
+        batch = []
+        for i in range(self.count):
+            asteroid = self.owner[i]
+            x = (asteroid.x + asteroid.dx * lag + self.ox[i] + offset_x) * zoom
+            y = (asteroid.y + asteroid.dy * lag + self.oy[i] + offset_y) * zoom
+            size = max(1, int(self.size[i] * zoom * self.life[i] / SPARKLE_LIFE + 0.5))
+            batch.append((glow_cache.dot(self.color[i], size), (int(x) - size, int(y) - size)))
+        screen.blits(batch, doreturn=False)
+
+    def clear(self):
+        for i in range(self.count):
+            self.owner[i] = None
+        self.count = 0
+
+class WorldRenderer:
+    """Draws the playing-state world: background, structures, ships, asteroids, bullets and loot
+
+    The HUD and menus are drawn by main(). Pass timings are collected in
+    self.timer when it is enabled.
+    """
+
+    def __init__(self, screen, asteroid_img, font):
+        self.screen = screen
+        self.asteroid_img = asteroid_img
+        self.font = font
+        self.timer = PhaseTimer()
+        self.asteroid_sprites = SurfaceCache(ASTEROID_SPRITE_CACHE_BYTES)  # (radius, golden) -> Surface
+        self.gold_overlays = SurfaceCache(GOLD_OVERLAY_CACHE_BYTES)  # radius -> Surface
+        self.ship_sprites = ShipSprites(SHIP_SPRITE_CACHE_BYTES)
+        self.sparkles = SparklePool()
+        self.vignettes = SurfaceCache(VIGNETTE_CACHE_BYTES)  # ((width, height), radius) -> Surface
+        self.zoom = 1.0  # Screen pixels per world unit, below 1 when drawing to a reduced-resolution target
+        self.fonts = {1.0: font}  # zoom -> label font sized to match
+
+    def set_target(self, screen, zoom=1.0):
+        """Draw into screen from now on, at zoom pixels per world unit"""
+        self.screen = screen
+        self.zoom = zoom
+        if zoom not in self.fonts:
+            self.fonts[zoom] = pygame.font.SysFont(None, max(8, round(WORLD_FONT_SIZE * zoom)))
+
+    def vignette(self, size, zoom=1.0):
+        """Outer space darkening around the ship for a (width, height) view, built once per size"""
+        dark_radius = int(OUTER_SPACE_VIGNETTE_RADIUS * zoom)
+        return self.vignettes.get((tuple(size), dark_radius), lambda: self._build_vignette(size, dark_radius))
+
+    @staticmethod
+    def _build_vignette(size, dark_radius):
+        # Only the circle is ever dark, so the surface stops at its bounding box
+        w = min(size[0], dark_radius * 2)
+        h = min(size[1], dark_radius * 2)
+        dark_surf = pygame.Surface((w, h), pygame.SRCALPHA)
+        # Create gradient from center, 40 rings whatever the radius
+        step = max(1, dark_radius // 40)
+        for r in range(dark_radius, 0, -step):
+            alpha = int(150 * (1 - r / dark_radius))
+            pygame.draw.circle(dark_surf, (0, 0, 5, alpha), (w // 2, h // 2), r)
+        return dark_surf
+
+    def asteroid_sprite(self, radius, golden):
+        """Asteroid texture scaled to radius, gold tinted if golden, built once and cached"""
+        return self.asteroid_sprites.get((radius, golden), lambda: self._build_asteroid_sprite(radius, golden))
+
+    def _build_asteroid_sprite(self, radius, golden):
+        size = radius * 2
+        img = pygame.transform.smoothscale(self.asteroid_img, (size, size))
+
+        # Golden asteroid tint - better visual
+        if golden:
+            img.blit(self.gold_overlay(radius), (0, 0), special_flags=pygame.BLEND_RGBA_ADD)
+        return img
+
+    def gold_overlay(self, radius):
+        """Circular gold gradient for a golden asteroid of this radius, built once and cached"""
+        return self.gold_overlays.get(radius, lambda: self._build_gold_overlay(radius))
+
+    @staticmethod
+    def _build_gold_overlay(radius):
+        # Create a circular gold overlay instead of square
+        size = radius * 2
+        gold_overlay = pygame.Surface((size, size), pygame.SRCALPHA)
+        center = size // 2
+        for r in range(radius, 0, -2):
+            alpha = int(80 * (r / radius))
+            pygame.draw.circle(gold_overlay, (255, 215, 0, alpha), (center, center), r)
+        return gold_overlay
+
+    def draw(self, gs, view_x, view_y, view_rotation, lag=0.0, ship_color=SHIP_COLORS[0][1],
+             player_name="", other_players=None, thrusting=False, dt=0.0, sparkle_emitters=None):
+        """Draw the world around the camera at (view_x, view_y), lag as from Simulation.lag
+
+        dt is the frame time, which ages the purely visual effects. sparkle_emitters
+        is Simulation.sparkle_emitters, emptied here as the on-screen ones sparkle.
+        Everything is drawn at self.zoom screen pixels per world unit, see set_target().
+        """
+        screen = self.screen
+        z = self.zoom
+        font = self.fonts[z]
+        timer = self.timer
+        SCREEN_W, SCREEN_H = screen.get_size()
+        CX, CY = SCREEN_W // 2, SCREEN_H // 2
+        upgrades = gs["upgrades"]
+        viewport = Viewport(view_x, view_y, SCREEN_W, SCREEN_H, zoom=z)
+        visible = viewport.visible
+
+        # Background color - lighter normally, dark in outer space
+        timer.start()
+        if gs["in_outer_space"]:
+            # Dark background in outer space
+            screen.fill((5, 5, 15))
+        else:
+            # Lighter background near base
+            screen.fill((15, 15, 35))
+        if gs["outer_space_anim"] > 0:
+            # Dark circle around player, fading in and out with the outer space banner
+            dark_surf = self.vignette((SCREEN_W, SCREEN_H), z)
+            dark_surf.set_alpha(int(255 * gs["outer_space_anim"]))
+            screen.blit(dark_surf, (CX - dark_surf.get_width() // 2, CY - dark_surf.get_height() // 2))
+
+        timer.lap("background")
+
+        # Render power effects (behind everything)
+        render_power_effects(screen, gs, CX, CY, view_rotation, z)
+        timer.lap("power_effects")
+        
+        # Draw material drop zone (only if power shop not unlocked) - BEHIND player
+        if not upgrades.get("powers_unlocked", False):
+            dz_scr_x = int((DROP_ZONE_X - view_x) * z + CX)
+            dz_scr_y = int((DROP_ZONE_Y - view_y) * z + CY)
+            # Draw hollow layered circles
+            for i in range(3):
+                radius = int((DROP_ZONE_RADIUS - i * 15) * z)
+                alpha = 80 - i * 20
+                circle_surf = glow_cache.circle((100, 255, 100), radius, alpha, max(1, int(3 * z)))
+                screen.blit(circle_surf, (dz_scr_x - radius, dz_scr_y - radius))
+            dz_label = text_cache.render(font, "DROP MATERIALS", True, (100, 255, 100))
+            screen.blit(dz_label, (dz_scr_x - dz_label.get_width()//2, dz_scr_y - int(10 * z)))
+
+        timer.lap("structures")
+
+        floating_texts = gs["floating_texts"]
+        drawn = 0
+        for ft in floating_texts:
+            # Texts are drawn from their top left, about 100 px wide at most
+            if not visible(ft["x"] + 50, ft["y"], 60):
+                continue
+            drawn += 1
+            sx = int((ft["x"] - view_x) * z + CX)
+            sy = int((ft["y"] - view_y) * z + CY)
+            # Rendered once on first sight and kept on the text, only the alpha changes after
+            surf = ft.get("surf")
+            if surf is None or ft.get("surf_zoom") != z:
+                surf = ft["surf"] = font.render(ft["text"], True, ft.get("color", (255, 255, 80)))
+                ft["surf_zoom"] = z
+            surf.set_alpha(max(0, min(255, int(ft["alpha"]))))
+            screen.blit(surf, (sx, sy))
+        timer.count("floating_texts.drawn", drawn)
+        timer.count("floating_texts.culled", len(floating_texts) - drawn)
+        
+        timer.lap("floating_texts")
+
+        # Render coin animations, these fly in display space to the money counter
+        coins = gs["coin_animations"]
+        coin_radius = max(1, round(10 * z))
+        drawn = 0
+        for coin in coins:
+            t = coin["progress"]
+            # Ease out cubic
+            t_eased = 1 - pow(1 - t, 3)
+            x = (coin["x"] + (coin["target_x"] - coin["x"]) * t_eased) * z
+            y = (coin["y"] + (coin["target_y"] - coin["y"]) * t_eased) * z
+            if not (-coin_radius <= x <= SCREEN_W + coin_radius and -coin_radius <= y <= SCREEN_H + coin_radius):
+                continue
+            drawn += 1
+            # Draw coin
+            alpha = int(255 * (1 - t))
+            coin_surf = glow_cache.coin(alpha, coin_radius)
+            screen.blit(coin_surf, (int(x) - coin_radius, int(y) - coin_radius))
+        timer.count("coins.drawn", drawn)
+        timer.count("coins.culled", len(coins) - drawn)
+
+        timer.lap("coins")
+
+        cx, cy = CX, CY
+        size = 14
+
+        # Draw fire particles behind ship when thrusting
+        if thrusting:
+            fx_dir = math.sin(view_rotation)
+            fy_dir = -math.cos(view_rotation)
+            # Fire base position (behind ship)
+            fire_base_x = cx - fx_dir * (size + 2) * z
+            fire_base_y = cy - fy_dir * (size + 2) * z
+            # Random offset perpendicular to thrust direction, scaled with everything else
+            perp_x = -fy_dir * z
+            perp_y = fx_dir * z
+            fx_dir *= z
+            fy_dir *= z
+            batch = []
+            # Draw multiple fire particles with randomness for flickering effect
+            for _ in range(8):
+                spread = random.uniform(-6, 6)
+                length = random.randint(12, 28)  # Whole pixels, so the stamps stay a small set
+                px = fire_base_x + perp_x * spread - fx_dir * length
+                py = fire_base_y + perp_y * spread - fy_dir * length
+                # Color gradient: yellow core, orange mid, red outer
+                t = length / 28.0
+                if t < 0.4:
+                    color = (255, 255, int(200 * (1 - t/0.4)))  # Yellow to orange
+                elif t < 0.7:
+                    color = (255, int(165 * (1 - (t-0.4)/0.3)), 0)  # Orange to red-orange
+                else:
+                    color = (255, int(80 * (1 - (t-0.7)/0.3)), 0)  # Red-orange to red
+                particle_size = max(1, int(max(2, int(4 * (1 - t * 0.5))) * z))
+                batch.append((glow_cache.dot(color, particle_size),
+                              (int(px) - particle_size, int(py) - particle_size)))
+            # Draw bright core
+            core_size = max(1, int(3 * z))
+            core = glow_cache.dot((255, 255, 200), core_size)
+            for _ in range(3):
+                spread = random.uniform(-3, 3)
+                core_x = fire_base_x + perp_x * spread - fx_dir * random.uniform(2, 8)
+                core_y = fire_base_y + perp_y * spread - fy_dir * random.uniform(2, 8)
+                batch.append((core, (int(core_x) - core_size, int(core_y) - core_size)))
+            screen.blits(batch, doreturn=False)
+
+        # Draw ship with outline, in the equipped design
+        ship_design = gs["cosmetics"]["equipped_ship"]
+        ship_surf = self.ship_sprites.sprite(ship_design, ship_color, view_rotation, z)
+        screen.blit(ship_surf, ship_surf.get_rect(center=(cx, cy)))
+
+        # Draw player nametag above own ship
+        own_name_surf = text_cache.render(font, player_name, True, (200, 255, 200))
+        screen.blit(own_name_surf, (cx - own_name_surf.get_width() // 2, cy - int(35 * z)))
+        timer.lap("ship")
+
+        # Draw other players (multiplayer)
+        if other_players:
+            for pid, pdata in other_players.items():
+                # Calculate screen position relative to our position
+                other_x = pdata.get("x", 0)
+                other_y = pdata.get("y", 0)
+                other_rot = pdata.get("rotation", 0)
+                other_color_idx = pdata.get("color_index", 0)
+                other_name = pdata.get("name", "Player")
+
+                # Screen position
+                scr_x = int((other_x - view_x) * z + CX)
+                scr_y = int((other_y - view_y) * z + CY)
+
+                # Only draw if on screen (with margin)
+                if visible(other_x, other_y, 100 - VIEW_CULL_MARGIN):
+                    # Get ship color
+                    other_color = SHIP_COLORS[other_color_idx % len(SHIP_COLORS)][1]
+
+                    # Draw other player's ship
+                    other_surf = self.ship_sprites.sprite(pdata.get("ship", "default"), other_color, other_rot, z)
+                    screen.blit(other_surf, other_surf.get_rect(center=(scr_x, scr_y)))
+
+                    # Draw nametag above other player
+                    name_surf = text_cache.render(font, other_name, True, (255, 255, 255))
+                    name_bg = pygame.Rect(
+                        scr_x - name_surf.get_width() // 2 - 4,
+                        scr_y - int(38 * z),
+                        name_surf.get_width() + 8,
+                        name_surf.get_height() + 4
+                    )
+                    pygame.draw.rect(screen, (0, 0, 0, 150), name_bg, border_radius=3)
+                    screen.blit(name_surf, (scr_x - name_surf.get_width() // 2, scr_y - int(35 * z)))
+
+        timer.lap("other_players")
+
+        bx_scr = int((BASE_X - view_x) * z + CX)
+        by_scr = int((BASE_Y - view_y) * z + CY)
+        base_size = int(28 * z)
+        glow_pad = int(10 * z)
+        corner = max(1, int(5 * z))
+        border = max(1, int(3 * z))
+        label_y = int(45 * z)
+        # Draw base with same style as power shop
+        pygame.draw.rect(screen, (80, 100, 255), (bx_scr - base_size//2, by_scr - base_size//2, base_size, base_size), 0, border_radius=corner)
+        pygame.draw.rect(screen, (150, 180, 255), (bx_scr - base_size//2, by_scr - base_size//2, base_size, base_size), border, border_radius=corner)
+        # Add glow effect
+        glow_surf = glow_cache.rounded_rect((150, 180, 255), base_size + glow_pad * 2, 50, glow_pad)
+        screen.blit(glow_surf, (bx_scr - base_size//2 - glow_pad, by_scr - base_size//2 - glow_pad))
+        base_label = text_cache.render(font, "BASE", True, (150, 180, 255))
+        screen.blit(base_label, (bx_scr - base_label.get_width()//2, by_scr - label_y))
+        
+        # Draw power shop structure
+        if upgrades.get("powers_unlocked", False):
+            psx_scr = int((POWER_SHOP_X - view_x) * z + CX)
+            psy_scr = int((POWER_SHOP_Y - view_y) * z + CY)
+            ps_size = base_size
+            # Draw purple/pink structure
+            pygame.draw.rect(screen, (180, 80, 255), (psx_scr - ps_size//2, psy_scr - ps_size//2, ps_size, ps_size), 0, border_radius=corner)
+            pygame.draw.rect(screen, (255, 150, 255), (psx_scr - ps_size//2, psy_scr - ps_size//2, ps_size, ps_size), border, border_radius=corner)
+            # Add glow effect
+            glow_surf = glow_cache.rounded_rect((255, 150, 255), ps_size + glow_pad * 2, 50, glow_pad)
+            screen.blit(glow_surf, (psx_scr - ps_size//2 - glow_pad, psy_scr - ps_size//2 - glow_pad))
+            ps_label = text_cache.render(font, "POWER SHOP", True, (255, 150, 255))
+            screen.blit(ps_label, (psx_scr - ps_label.get_width()//2, psy_scr - label_y))
+
+        if not (0 <= bx_scr <= SCREEN_W and 0 <= by_scr <= SCREEN_H):
+            dir_x = bx_scr - CX
+            dir_y = by_scr - CY
+            ang = math.atan2(dir_y, dir_x)
+            margin = 40 * z
+            t_vals = []
+            if math.cos(ang) != 0:
+                t_vals.extend([(margin - CX) / math.cos(ang), (SCREEN_W - margin - CX) / math.cos(ang)])
+            if math.sin(ang) != 0:
+                t_vals.extend([(margin - CY) / math.sin(ang), (SCREEN_H - margin - CY) / math.sin(ang)])
+            t_edge = min([t for t in t_vals if t > 0], default=1)
+            arrow_x = int(CX + math.cos(ang) * t_edge)
+            arrow_y = int(CY + math.sin(ang) * t_edge)
+            arrow_size = 14 * z
+            p1 = (int(arrow_x + math.cos(ang) * arrow_size), int(arrow_y + math.sin(ang) * arrow_size))
+            p2 = (int(arrow_x + math.cos(ang + 2.5) * arrow_size), int(arrow_y + math.sin(ang + 2.5) * arrow_size))
+            p3 = (int(arrow_x + math.cos(ang - 2.5) * arrow_size), int(arrow_y + math.sin(ang - 2.5) * arrow_size))
+            pygame.draw.polygon(screen, (255, 140, 0), [p1, p2, p3])
+
+        timer.lap("structures")
+
+        sparkles = self.sparkles
+        sparkles.update(dt)
+        while sparkle_emitters:
+            asteroid = sparkle_emitters.popleft()
+            if visible(asteroid.x + asteroid.dx * lag, asteroid.y + asteroid.dy * lag, asteroid.radius):
+                sparkles.emit(asteroid)
+        on_screen = viewport.asteroids(gs["asteroids"], lag)
+        timer.count("asteroids.drawn", len(on_screen))
+        timer.count("asteroids.culled", len(gs["asteroids"]) - len(on_screen))
+        for x, y, radius, golden, boss, health, max_health in on_screen:
+            ax = int((x - view_x) * z + CX)
+            ay = int((y - view_y) * z + CY)
+            radius = max(1, int(radius * z))
+            img = self.asteroid_sprite(radius, golden)
+            screen.blit(img, (ax - radius, ay - radius))
+
+            barw = int((40 if boss else 28) * z)
+            barh = max(1, int((7 if boss else 5) * z))
+            health_frac = health / max_health
+            bar_x = ax - barw // 2
+            bar_y = ay - radius - int((18 if boss else 12) * z)
+            pygame.draw.rect(screen, (60, 60, 60), (bar_x, bar_y, barw, barh))
+            pygame.draw.rect(screen, (80, 255, 80), (bar_x, bar_y, int(barw * health_frac), barh))
+            health_text = text_cache.render(font, f"{max(0, int(health))}", True, (255, 255, 255))
+            text_rect = health_text.get_rect(center=(ax, bar_y + barh // 2))
+            screen.blit(health_text, text_rect)
+        sparkles.draw(screen, CX / z - view_x, CY / z - view_y, lag, z)
+
+        timer.lap("asteroids")
+
+        sx = int(gs["cam_vx"] * 0.05 * z)
+        sy = int(gs["cam_vy"] * 0.05 * z)
+        cx, cy = CX, CY
+        pygame.draw.line(screen, (0, 255, 0), (cx, cy), (cx + sx, cy + sy), max(1, int(3 * z)))
+
+        bullet_xs, bullet_ys = gs["bullets"].positions(lag)
+        # Piercing bullets are blue, normal bullets are yellow
+        is_piercing = any(e.get("type") == "piercing" for e in gs["power_effects"])
+        bullet_color = (100, 200, 255) if is_piercing else (255, 220, 0)
+        bullet_radius = max(1, int(3 * z))
+        dot = glow_cache.dot(bullet_color, bullet_radius)
+        ox = CX - view_x * z - bullet_radius
+        oy = CY - view_y * z - bullet_radius
+        left, top = viewport.left - 3, viewport.top - 3
+        right, bottom = viewport.right + 3, viewport.bottom + 3
+        batch = [(dot, (int(bx * z + ox), int(by * z + oy))) for bx, by in zip(bullet_xs, bullet_ys)
+                 if left <= bx <= right and top <= by <= bottom]
+        screen.blits(batch, doreturn=False)
+        timer.count("bullets.drawn", len(batch))
+        timer.count("bullets.culled", len(bullet_xs) - len(batch))
+        
+        timer.lap("bullets")
+
+        # Draw floating loot
+        # Loot pulses together, so the radius is the same for every item this frame
+        pulse = 1.0 + 0.2 * math.sin(pygame.time.get_ticks() / 200.0)
+        radius = max(1, int(8 * pulse * z))
+        floating_loot = gs["floating_loot"]
+        ox = CX - view_x * z - radius * 2
+        oy = CY - view_y * z - radius * 2
+        reach = radius * 2 / z
+        left, top = viewport.left - reach, viewport.top - reach
+        right, bottom = viewport.right + reach, viewport.bottom + reach
+        batch = []
+        for loot in floating_loot:
+            x = loot["x"]
+            y = loot["y"]
+            if left <= x <= right and top <= y <= bottom:
+                # Core, rim and glow come as one stamp per color
+                batch.append((glow_cache.loot_core(loot["color"], radius), (int(x * z + ox), int(y * z + oy))))
+        screen.blits(batch, doreturn=False)
+        timer.count("loot.drawn", len(batch))
+        timer.count("loot.culled", len(floating_loot) - len(batch))
+        timer.lap("loot")
+
+        cx, cy = CX, CY
+        for item in gs["carried_items"]:
+            world_angle = view_rotation + item["rel_angle"]
+            ix = cx + int(math.sin(world_angle) * item["length"] * z)
+            iy = cy + int(-math.cos(world_angle) * item["length"] * z)
+            pygame.draw.line(screen, (120, 120, 120), (cx, cy), (ix, iy), max(1, int(2 * z)))
+            pygame.draw.circle(screen, tuple(item["color"]), (ix, iy), max(1, int(6 * z)))
+        timer.lap("cargo")
+
+
+class ResolutionScaler:
+    """Renders the world at a fraction of the display resolution and scales it up once per frame
+
+    scale is the fraction of the display's width and height drawn, at most the
+    configured render_scale. With dynamic set, adjust() lowers it while frames
+    run over budget for target_fps and raises it again once they have room.
+    """
+
+    def __init__(self, display, scale=1.0, dynamic=False, target_fps=DEFAULT_TARGET_FPS):
+        self.display = display
+        self.max_scale = max(RENDER_SCALE_MIN, min(1.0, scale))
+        self.scale = self.max_scale
+        self.dynamic = dynamic
+        self.budget_ms = 1000.0 / (target_fps if target_fps > 0 else DEFAULT_TARGET_FPS)
+        self.frame_ms = 0.0  # Smoothed work time per frame
+        self.since_adjust = 0.0
+        self.surface = None
+
+    @property
+    def zoom(self):
+        return self.scale
+
+    def target(self):
+        """Surface to draw the world into this frame, the display itself at full scale"""
+        if self.scale >= 1.0:
+            return self.display
+        w, h = self.display.get_size()
+        size = (max(1, int(w * self.scale)), max(1, int(h * self.scale)))
+        if self.surface is None or self.surface.get_size() != size:
+            self.surface = pygame.Surface(size).convert(self.display)
+        return self.surface
+
+    def present(self):
+        """Stretch this frame's world onto the display, the HUD is drawn over it at full resolution"""
+        if self.scale < 1.0:
+            pygame.transform.scale(self.surface, self.display.get_size(), self.display)
+
+    def adjust(self, work_ms, dt):
+        """Feed one frame's work time, stepping the scale toward the frame budget"""
+        self.frame_ms += (work_ms - self.frame_ms) * RENDER_SCALE_SMOOTHING
+        if not self.dynamic:
+            return
+        self.since_adjust += dt
+        if self.since_adjust < RENDER_SCALE_INTERVAL:
+            return
+        self.since_adjust = 0.0
+        if self.frame_ms > self.budget_ms * RENDER_SCALE_DOWN_AT:
+            self.scale = max(RENDER_SCALE_MIN, round(self.scale - RENDER_SCALE_STEP, 2))
+        elif self.frame_ms < self.budget_ms * RENDER_SCALE_UP_AT:
+            self.scale = min(self.max_scale, round(self.scale + RENDER_SCALE_STEP, 2))
+
+def draw_minimap(screen, left, top, view_x, view_y, positions):
+    """Multiplayer minimap centered on the view, players past its range sit on the edge"""
+    size = MINIMAP_SIZE
+    half = size / 2
+    scale = half / MINIMAP_RANGE
+    panel = pygame.Rect(left, top, size, size)
+    screen.blit(glow_cache.rounded_rect((20, 25, 45), size, 180, 8), panel)
+    pygame.draw.rect(screen, (100, 130, 200), panel, 2, border_radius=8)
+    center = (left + half, top + half)
+
+    def to_map(x, y):
+        dx = (x - view_x) * scale
+        dy = (y - view_y) * scale
+        edge = max(abs(dx), abs(dy))
+        if edge > half - 4:
+            dx *= (half - 4) / edge
+            dy *= (half - 4) / edge
+        return int(center[0] + dx), int(center[1] + dy)
+
+    pygame.draw.circle(screen, (150, 180, 255), to_map(BASE_X, BASE_Y), 4)
+    for x, y in positions:
+        pygame.draw.circle(screen, (255, 255, 255), to_map(x, y), 2)
+    pygame.draw.circle(screen, (100, 255, 100), (int(center[0]), int(center[1])), 3)
+
+
+# ==================== MENUS ====================
+MENU_BACKGROUND_STATES = [STATE_MENU, STATE_NEW_WORLD, STATE_LOAD_WORLD, STATE_SETTINGS, STATE_MULTIPLAYER_MENU,
+                          STATE_JOIN_GAME, STATE_HOST_WORLD_SELECT, STATE_LAN_BROWSER, STATE_PUBLIC_SERVERS]
+
+class MenuBackground:
+    """Slowly drifting, spinning asteroids behind the menus, drawn from pre-rotated frames
+
+    draw() returns the screen rectangles it touched this frame and last frame,
+    so an otherwise unchanged menu only needs those pushed to the display.
+    """
+
+    def __init__(self, asteroid_img, size, count=MENU_BG_ASTEROIDS):
+        self.asteroid_img = asteroid_img
+        self.size = size
+        self.frames = SurfaceCache(16 * 1024 * 1024)  # (size, frame) -> Surface
+        self.asteroids = []
+        for _ in range(count):
+            self.asteroids.append({
+                "x": random.randint(0, size[0]),
+                "y": random.randint(0, size[1]),
+                "vx": random.uniform(-50, 50),
+                "vy": random.uniform(-50, 50),
+                "size": random.randint(20, 60),
+                "rotation": random.uniform(0, 360),
+                "rot_speed": random.uniform(-30, 30)
+            })
+        self.last_rects = []
+
+    def frame(self, size, rotation):
+        index = int(rotation % 360 * MENU_BG_ASTEROID_FRAMES / 360) % MENU_BG_ASTEROID_FRAMES
+        return self.frames.get((size, index), lambda: self._build_frame(size, index))
+
+    def _build_frame(self, size, index):
+        img = pygame.transform.scale(self.asteroid_img, (size, size))
+        img = pygame.transform.rotate(img, index * 360 / MENU_BG_ASTEROID_FRAMES)
+        # Semi-transparent, baked into the pixels as set_alpha(80) would blend but blits faster
+        img.fill((255, 255, 255, 80), special_flags=pygame.BLEND_RGBA_MULT)
+        return img
+
+    def update(self, dt):
+        screen_w, screen_h = self.size
+        for bg_ast in self.asteroids:
+            bg_ast["x"] += bg_ast["vx"] * dt
+            bg_ast["y"] += bg_ast["vy"] * dt
+            bg_ast["rotation"] += bg_ast["rot_speed"] * dt
+
+            # Wrap around screen
+            if bg_ast["x"] < -bg_ast["size"]:
+                bg_ast["x"] = screen_w + bg_ast["size"]
+            elif bg_ast["x"] > screen_w + bg_ast["size"]:
+                bg_ast["x"] = -bg_ast["size"]
+            if bg_ast["y"] < -bg_ast["size"]:
+                bg_ast["y"] = screen_h + bg_ast["size"]
+            elif bg_ast["y"] > screen_h + bg_ast["size"]:
+                bg_ast["y"] = -bg_ast["size"]
+
+    def draw(self, screen):
+        """Blit every asteroid, returns the rectangles to refresh for this frame"""
+        batch = []
+        rects = []
+        for bg_ast in self.asteroids:
+            img = self.frame(bg_ast["size"], bg_ast["rotation"])
+            rect = img.get_rect(center=(int(bg_ast["x"]), int(bg_ast["y"])))
+            batch.append((img, rect))
+            rects.append(rect)
+        screen.blits(batch, doreturn=False)
+        dirty = self.last_rects + rects
+        self.last_rects = rects
+        return dirty
+
+class MenuLayer:
+    """Retained full-screen surface holding a menu's titles, buttons and labels
+
+    Menus are drawn into it only when needed() says something may have changed;
+    other frames reuse it. Untouched pixels are MENU_BG_COLOR, used as the color key,
+    so anything drawn under the layer shows through exactly as it would without it.
+    """
+
+    def __init__(self, size):
+        self.surface = pygame.Surface(size)
+        self.surface.set_colorkey(MENU_BG_COLOR)
+        self.key = None
+
+    def needed(self, state, had_events):
+        """True when the menu must be redrawn: a new state, any input, or MENU_REFRESH_MS elapsed"""
+        key = (state, pygame.time.get_ticks() // MENU_REFRESH_MS)
+        if had_events or key != self.key:
+            self.key = key
+            return True
+        return False
+
+    def invalidate(self):
+        self.key = None
+
+    def begin(self):
+        self.surface.fill(MENU_BG_COLOR)
+        return self.surface
+
 # ==================== MAIN GAME ====================
 def main():
+    startup = PhaseTimer()  # One-off setup costs, reported by the profiler
+    startup.enabled = True
+    startup.start()
     pygame.init()
+    settings = load_settings()
+    startup.lap("settings")
     
     # Get display info for fullscreen
     display_info = pygame.display.Info()
     SCREEN_W = display_info.current_w
     SCREEN_H = display_info.current_h
     
-    # Create fullscreen display at native resolution
-    screen = pygame.display.set_mode((SCREEN_W, SCREEN_H), pygame.FULLSCREEN)
+    # Create fullscreen display at native resolution, vsync needs SDL's renderer behind SCALED
+    display_surface = None
+    if settings["vsync"]:
+        try:
+            display_surface = pygame.display.set_mode((SCREEN_W, SCREEN_H), pygame.FULLSCREEN | pygame.SCALED, vsync=1)
+        except pygame.error:
+            print("Vsync is not available, running without it")
+    if display_surface is None:
+        display_surface = pygame.display.set_mode((SCREEN_W, SCREEN_H), pygame.FULLSCREEN)
+    screen = display_surface  # Where this frame draws, the retained menu layer for menus
     pygame.display.set_caption("Asteroid Miner")
     clock = pygame.time.Clock()
+    resolution = ResolutionScaler(display_surface, settings["render_scale"], settings["dynamic_resolution"],
+                                  settings["target_fps"])
+    startup.lap("display")
     
     # Center coordinates
     CX, CY = SCREEN_W // 2, SCREEN_H // 2
@@ -610,12 +3368,16 @@ def main():
     font = pygame.font.SysFont(None, 24)
     title_font = pygame.font.SysFont(None, 64)
     medium_font = pygame.font.SysFont(None, 36)
+    money_font = pygame.font.SysFont(None, 48)
+    outer_space_font = pygame.font.SysFont(None, 72)
+    # Fixed banner, rendered once. It is ours alone, so its alpha can be set per frame
+    outer_space_text = outer_space_font.render("< OUTER SPACE >", True, (150, 200, 255))
+    startup.lap("assets")
 
     # Game state
     current_state = STATE_MENU
     game_state = None
     current_world_name = None
-    settings = load_settings()
 
     # Input state for text fields
     text_input = ""
@@ -623,36 +3385,20 @@ def main():
     selected_world_index = 0
     world_list = []
 
-    # Color constants
-    color_map = {
-        "Iron": (150, 150, 150),
-        "Copper": (184, 115, 51),
-        "Gold": (212, 175, 55),
-        "Titanium": (180, 180, 220),
-        "Platinum": (200, 200, 255),
-        "Uranium": (80, 255, 80),
-        "Diamond": (180, 255, 255),
-        "Power Core": (100, 255, 100),
-    }
-
     # Game constants
-    bullet_speed = 900.0
-    bullet_life = 2.0
-    base_x = 200.0
-    base_y = 200.0
-    base_sell_radius = 120.0
-    
-    # Power shop material drop zone (next to base)
-    drop_zone_x = 350.0
-    drop_zone_y = 200.0
-    drop_zone_radius = 80.0
-    
-    # Power shop location (near base)
-    power_shop_x = 400.0
-    power_shop_y = 200.0
-    power_shop_radius = 100.0
-    max_asteroids = 28
-    spawn_interval = 0.18
+    base_x, base_y = BASE_X, BASE_Y
+    base_sell_radius = BASE_SELL_RADIUS
+    drop_zone_x, drop_zone_y = DROP_ZONE_X, DROP_ZONE_Y
+    drop_zone_radius = DROP_ZONE_RADIUS
+    power_shop_x, power_shop_y = POWER_SHOP_X, POWER_SHOP_Y
+    power_shop_radius = POWER_SHOP_RADIUS
+    simulation = None  # Fixed-timestep update of the current game_state
+    world_renderer = WorldRenderer(screen, asteroid_img, font)
+    world_renderer.vignette(resolution.target().get_size(), resolution.zoom)  # Built now rather than on the first trip out
+    startup.lap("vignette")
+    profiler = FrameProfiler()
+    profiler.attach("render", world_renderer.timer)
+    profiler.record_startup(startup)
 
     # Multiplayer
     network_client = NetworkClient()
@@ -663,18 +3409,9 @@ def main():
     mp_status = ""
     network_update_timer = 0.0
     
-    # Background asteroids for menu
-    bg_asteroids = []
-    for _ in range(15):
-        bg_asteroids.append({
-            "x": random.randint(0, SCREEN_W),
-            "y": random.randint(0, SCREEN_H),
-            "vx": random.uniform(-50, 50),
-            "vy": random.uniform(-50, 50),
-            "size": random.randint(20, 60),
-            "rotation": random.uniform(0, 360),
-            "rot_speed": random.uniform(-30, 30)
-        })
+    # Background asteroids for menu, under a retained layer of menu text and buttons
+    menu_background = MenuBackground(asteroid_img, (SCREEN_W, SCREEN_H))
+    menu_layer = MenuLayer((SCREEN_W, SCREEN_H))
 
     running = True
 
@@ -682,11 +3419,15 @@ def main():
 
 
     while running:
-        dt = clock.tick(60) / 1000.0
+        dt = clock.tick(settings["target_fps"]) / 1000.0
+        frame_start = time.perf_counter()
+        profiler.begin_frame()
         mouse_pos = pygame.mouse.get_pos()
         mouse_clicked = False
+        had_events = False
 
         for event in pygame.event.get():
+            had_events = True
             if event.type == pygame.QUIT:
                 running = False
             elif event.type == pygame.MOUSEBUTTONDOWN:
@@ -726,6 +3467,10 @@ def main():
                     current_state = STATE_CONFIRM_EXIT
                 elif current_state == STATE_CONFIRM_EXIT and event.key == pygame.K_ESCAPE:
                     current_state = STATE_PLAYING
+                elif current_state == STATE_PLAYING and event.key == pygame.K_F3:
+                    profiler.toggle()
+                elif current_state == STATE_PLAYING and event.key == pygame.K_F4:
+                    profiler.start_trace()
                 elif current_state == STATE_PLAYING and event.key == pygame.K_F11:
                     # Toggle fullscreen (exit to windowed mode)
                     running = False
@@ -749,38 +3494,29 @@ def main():
                     elif event.key == pygame.K_ESCAPE:
                         current_state = STATE_MENU
 
+        profiler.lap("input")
 
-        screen.fill((10, 10, 30))
-        
-        # Update and draw background asteroids for menu states
-        if current_state in [STATE_MENU, STATE_NEW_WORLD, STATE_LOAD_WORLD, STATE_SETTINGS, STATE_MULTIPLAYER_MENU, STATE_JOIN_GAME, STATE_HOST_WORLD_SELECT, STATE_LAN_BROWSER, STATE_PUBLIC_SERVERS]:
-            for bg_ast in bg_asteroids:
-                bg_ast["x"] += bg_ast["vx"] * dt
-                bg_ast["y"] += bg_ast["vy"] * dt
-                bg_ast["rotation"] += bg_ast["rot_speed"] * dt
-                
-                # Wrap around screen
-                if bg_ast["x"] < -bg_ast["size"]:
-                    bg_ast["x"] = SCREEN_W + bg_ast["size"]
-                elif bg_ast["x"] > SCREEN_W + bg_ast["size"]:
-                    bg_ast["x"] = -bg_ast["size"]
-                if bg_ast["y"] < -bg_ast["size"]:
-                    bg_ast["y"] = SCREEN_H + bg_ast["size"]
-                elif bg_ast["y"] > SCREEN_H + bg_ast["size"]:
-                    bg_ast["y"] = -bg_ast["size"]
-                
-                # Draw asteroid
-                img = pygame.transform.scale(asteroid_img, (bg_ast["size"], bg_ast["size"]))
-                img = pygame.transform.rotate(img, bg_ast["rotation"])
-                img.set_alpha(80)  # Semi-transparent
-                screen.blit(img, (int(bg_ast["x"] - bg_ast["size"]//2), int(bg_ast["y"] - bg_ast["size"]//2)))
+        # Everything but the playing state is a menu drawn into the retained layer,
+        # and only on frames where it may have changed
+        frame_state = current_state
+        in_menu = frame_state != STATE_PLAYING
+        draw_ui = True
+        if in_menu:
+            draw_ui = menu_layer.needed(frame_state, had_events)
+            screen = menu_layer.begin() if draw_ui else display_surface
+        else:
+            screen = display_surface
+            screen.fill(MENU_BG_COLOR)
+            menu_layer.invalidate()
 
+        if not draw_ui:
+            pass  # Nothing changed, the retained menu layer is reused
         # ==================== MENU STATE ====================
-        if current_state == STATE_MENU:
-            title = title_font.render("ASTEROID MINER", True, (255, 220, 100))
+        elif current_state == STATE_MENU:
+            title = text_cache.render(title_font, "ASTEROID MINER", True, (255, 220, 100))
             screen.blit(title, (CX - title.get_width() // 2, 150))
 
-            name_text = medium_font.render(f"Welcome, {settings['player_name']}!", True, (200, 200, 255))
+            name_text = text_cache.render(medium_font, f"Welcome, {settings['player_name']}!", True, (200, 200, 255))
             screen.blit(name_text, (CX - name_text.get_width() // 2, 230))
 
             btn_w, btn_h = 250, 50
@@ -815,17 +3551,17 @@ def main():
 
         # ==================== NEW WORLD STATE ====================
         elif current_state == STATE_NEW_WORLD:
-            title = title_font.render("NEW WORLD", True, (255, 220, 100))
+            title = text_cache.render(title_font, "NEW WORLD", True, (255, 220, 100))
             screen.blit(title, (CX - title.get_width() // 2, 150))
 
-            prompt = medium_font.render("Enter world name:", True, (200, 200, 255))
+            prompt = text_cache.render(medium_font, "Enter world name:", True, (200, 200, 255))
             screen.blit(prompt, (CX - prompt.get_width() // 2, 300))
 
             input_rect = pygame.Rect(CX - 150, 360, 300, 40)
             pygame.draw.rect(screen, (40, 40, 80), input_rect, border_radius=5)
             pygame.draw.rect(screen, (100, 100, 200) if text_input_active else (80, 80, 120), input_rect, 2, border_radius=5)
             cursor = "|" if text_input_active and int(pygame.time.get_ticks() / 500) % 2 == 0 else ""
-            text_surf = medium_font.render(text_input + cursor, True, (255, 255, 255))
+            text_surf = text_cache.render(medium_font, text_input + cursor, True, (255, 255, 255))
             screen.blit(text_surf, (input_rect.x + 10, input_rect.y + 8))
 
             if input_rect.collidepoint(mouse_pos) and mouse_clicked:
@@ -839,7 +3575,7 @@ def main():
             if mouse_clicked:
                 if create_btn.is_clicked(mouse_pos, True) and text_input.strip():
                     current_world_name = text_input.strip()
-                    game_state = create_new_game_state()
+                    game_state = create_new_game_state(settings["asteroid_backend"])
                     save_world(current_world_name, game_state)
                     
                     # Check if we're creating for hosting
@@ -852,7 +3588,6 @@ def main():
                                 stdout=subprocess.DEVNULL,
                                 stderr=subprocess.DEVNULL
                             )
-                            import time
                             time.sleep(0.5)
                             if network_client.connect("localhost", DEFAULT_PORT, settings["player_name"], settings["ship_color_index"]):
                                 current_state = STATE_PLAYING
@@ -879,11 +3614,11 @@ def main():
 
         # ==================== LOAD WORLD STATE ====================
         elif current_state == STATE_LOAD_WORLD:
-            title = title_font.render("LOAD WORLD", True, (255, 220, 100))
+            title = text_cache.render(title_font, "LOAD WORLD", True, (255, 220, 100))
             screen.blit(title, (CX - title.get_width() // 2, 100))
 
             if not world_list:
-                no_worlds = medium_font.render("No saved worlds found.", True, (180, 180, 180))
+                no_worlds = text_cache.render(medium_font, "No saved worlds found.", True, (180, 180, 180))
                 screen.blit(no_worlds, (CX - no_worlds.get_width() // 2, 300))
             else:
                 list_y = 200
@@ -895,13 +3630,13 @@ def main():
                     if i == selected_world_index:
                         pygame.draw.rect(screen, (60, 60, 120), rect, border_radius=5)
                     pygame.draw.rect(screen, (100, 100, 200), rect, 2, border_radius=5)
-                    text = medium_font.render(world_name, True, (255, 255, 255))
+                    text = text_cache.render(medium_font, world_name, True, (255, 255, 255))
                     screen.blit(text, (rect.x + 15, rect.y + 8))
 
                     if rect.collidepoint(mouse_pos) and mouse_clicked:
                         selected_world_index = i
 
-                hint = font.render("UP/DOWN to select, DELETE to remove, click Load to play", True, (150, 150, 150))
+                hint = text_cache.render(font, "UP/DOWN to select, DELETE to remove, click Load to play", True, (150, 150, 150))
                 screen.blit(hint, (CX - hint.get_width() // 2, 550))
 
             load_btn = Button(CX - 130, 600, 120, 45, "Load", disabled=len(world_list) == 0)
@@ -913,18 +3648,18 @@ def main():
                 if load_btn.is_clicked(mouse_pos, True) and world_list:
                     current_world_name = world_list[selected_world_index]
                     data = load_world(current_world_name)
-                    game_state = load_game_state_from_data(data)
+                    game_state = load_game_state_from_data(data, settings["asteroid_backend"])
                     current_state = STATE_PLAYING
                 elif back_btn.is_clicked(mouse_pos, True):
                     current_state = STATE_MENU
 
         # ==================== SETTINGS STATE ====================
         elif current_state == STATE_SETTINGS:
-            title = title_font.render("SETTINGS", True, (255, 220, 100))
+            title = text_cache.render(title_font, "SETTINGS", True, (255, 220, 100))
             screen.blit(title, (CX - title.get_width() // 2, 50))
 
             # Player Name Section
-            name_label = medium_font.render("Player Name:", True, (200, 200, 255))
+            name_label = text_cache.render(medium_font, "Player Name:", True, (200, 200, 255))
             screen.blit(name_label, (CX - 400, 120))
 
             name_rect = pygame.Rect(CX - 400, 160, 300, 40)
@@ -933,7 +3668,7 @@ def main():
 
             display_text = text_input if text_input_active else settings["player_name"]
             cursor = "|" if text_input_active and int(pygame.time.get_ticks() / 500) % 2 == 0 else ""
-            text_surf = medium_font.render(display_text + cursor, True, (255, 255, 255))
+            text_surf = text_cache.render(medium_font, display_text + cursor, True, (255, 255, 255))
             screen.blit(text_surf, (name_rect.x + 10, name_rect.y + 8))
 
             if name_rect.collidepoint(mouse_pos) and mouse_clicked:
@@ -950,7 +3685,7 @@ def main():
                 text_input = ""
 
             # Ship Color Section
-            color_label = medium_font.render("Ship Color:", True, (200, 200, 255))
+            color_label = text_cache.render(medium_font, "Ship Color:", True, (200, 200, 255))
             screen.blit(color_label, (CX - 400, 230))
 
             color_idx = settings["ship_color_index"]
@@ -960,7 +3695,7 @@ def main():
             pygame.draw.rect(screen, color_rgb, preview_rect, border_radius=5)
             pygame.draw.rect(screen, (200, 200, 255), preview_rect, 2, border_radius=5)
 
-            color_text = medium_font.render(color_name, True, (255, 255, 255))
+            color_text = text_cache.render(medium_font, color_name, True, (255, 255, 255))
             screen.blit(color_text, (CX - 320, 290))
 
             prev_color_btn = Button(CX - 180, 275, 50, 50, "<")
@@ -981,7 +3716,7 @@ def main():
                 cosmetics = game_state["cosmetics"]
                 
                 # Ship Design Section
-                ship_label = medium_font.render("Ship Design:", True, (200, 200, 255))
+                ship_label = text_cache.render(medium_font, "Ship Design:", True, (200, 200, 255))
                 screen.blit(ship_label, (CX + 50, 120))
                 
                 unlocked_ships = cosmetics["unlocked_ships"]
@@ -992,7 +3727,7 @@ def main():
                 ship_id = unlocked_ships[ship_index]
                 ship_name = SHIP_COSMETICS[ship_id]["name"]
                 
-                ship_display = medium_font.render(ship_name, True, (255, 255, 255))
+                ship_display = text_cache.render(medium_font, ship_name, True, (255, 255, 255))
                 screen.blit(ship_display, (CX + 50, 160))
                 
                 prev_ship_btn = Button(CX + 50, 200, 50, 50, "<", disabled=len(unlocked_ships) <= 1)
@@ -1008,11 +3743,11 @@ def main():
                         ship_index = (ship_index + 1) % len(unlocked_ships)
                         cosmetics["equipped_ship"] = unlocked_ships[ship_index]
                 
-                unlock_text = font.render(f"Unlocked: {len(unlocked_ships)}/{len(SHIP_COSMETICS)}", True, (180, 180, 180))
+                unlock_text = text_cache.render(font, f"Unlocked: {len(unlocked_ships)}/{len(SHIP_COSMETICS)}", True, (180, 180, 180))
                 screen.blit(unlock_text, (CX + 180, 215))
                 
                 # Fire Trail Section
-                fire_label = medium_font.render("Fire Trail:", True, (255, 180, 100))
+                fire_label = text_cache.render(medium_font, "Fire Trail:", True, (255, 180, 100))
                 screen.blit(fire_label, (CX + 50, 280))
                 
                 unlocked_fires = cosmetics["unlocked_fires"]
@@ -1023,7 +3758,7 @@ def main():
                 fire_id = unlocked_fires[fire_index]
                 fire_name = FIRE_COSMETICS[fire_id]["name"]
                 
-                fire_display = medium_font.render(fire_name, True, (255, 255, 255))
+                fire_display = text_cache.render(medium_font, fire_name, True, (255, 255, 255))
                 screen.blit(fire_display, (CX + 50, 320))
                 
                 prev_fire_btn = Button(CX + 50, 360, 50, 50, "<", disabled=len(unlocked_fires) <= 1)
@@ -1039,10 +3774,10 @@ def main():
                         fire_index = (fire_index + 1) % len(unlocked_fires)
                         cosmetics["equipped_fire"] = unlocked_fires[fire_index]
                 
-                unlock_fire_text = font.render(f"Unlocked: {len(unlocked_fires)}/{len(FIRE_COSMETICS)}", True, (180, 180, 180))
+                unlock_fire_text = text_cache.render(font, f"Unlocked: {len(unlocked_fires)}/{len(FIRE_COSMETICS)}", True, (180, 180, 180))
                 screen.blit(unlock_fire_text, (CX + 180, 375))
                 
-                cosmetic_hint = font.render("Complete quests to unlock more cosmetics!", True, (150, 150, 150))
+                cosmetic_hint = text_cache.render(font, "Complete quests to unlock more cosmetics!", True, (150, 150, 150))
                 screen.blit(cosmetic_hint, (CX - cosmetic_hint.get_width()//2, SCREEN_H - 120))
 
             back_btn = Button(CX - 60, SCREEN_H - 80, 120, 45, "Back", color=(80, 80, 120), hover_color=(120, 120, 180))
@@ -1062,7 +3797,7 @@ def main():
 
         # ==================== MULTIPLAYER MENU STATE ====================
         elif current_state == STATE_MULTIPLAYER_MENU:
-            title = title_font.render("MULTIPLAYER", True, (255, 220, 100))
+            title = text_cache.render(title_font, "MULTIPLAYER", True, (255, 220, 100))
             screen.blit(title, (CX - title.get_width() // 2, 150))
 
             btn_w, btn_h = 250, 50
@@ -1080,10 +3815,10 @@ def main():
             back_btn.draw(screen, font, mouse_pos)
 
             if mp_status:
-                status_surf = font.render(mp_status, True, (255, 200, 100))
+                status_surf = text_cache.render(font, mp_status, True, (255, 200, 100))
                 screen.blit(status_surf, (CX - status_surf.get_width() // 2, 600))
 
-            hint = font.render("ESC to go back", True, (150, 150, 150))
+            hint = text_cache.render(font, "ESC to go back", True, (150, 150, 150))
             screen.blit(hint, (CX - hint.get_width() // 2, SCREEN_H - 50))
 
             if mouse_clicked:
@@ -1109,11 +3844,11 @@ def main():
 
         # ==================== HOST WORLD SELECT STATE ====================
         elif current_state == STATE_HOST_WORLD_SELECT:
-            title = title_font.render("SELECT WORLD TO HOST", True, (255, 220, 100))
+            title = text_cache.render(title_font, "SELECT WORLD TO HOST", True, (255, 220, 100))
             screen.blit(title, (CX - title.get_width() // 2, 100))
 
             if not world_list:
-                no_worlds = medium_font.render("No saved worlds found.", True, (180, 180, 180))
+                no_worlds = text_cache.render(medium_font, "No saved worlds found.", True, (180, 180, 180))
                 screen.blit(no_worlds, (CX - no_worlds.get_width() // 2, 300))
             else:
                 list_y = 200
@@ -1125,13 +3860,13 @@ def main():
                     if i == selected_world_index:
                         pygame.draw.rect(screen, (60, 60, 120), rect, border_radius=5)
                     pygame.draw.rect(screen, (100, 100, 200), rect, 2, border_radius=5)
-                    text = medium_font.render(world_name, True, (255, 255, 255))
+                    text = text_cache.render(medium_font, world_name, True, (255, 255, 255))
                     screen.blit(text, (rect.x + 15, rect.y + 8))
 
                     if rect.collidepoint(mouse_pos) and mouse_clicked:
                         selected_world_index = i
 
-                hint = font.render("UP/DOWN to select, click Host to start server", True, (150, 150, 150))
+                hint = text_cache.render(font, "UP/DOWN to select, click Host to start server", True, (150, 150, 150))
                 screen.blit(hint, (CX - hint.get_width() // 2, 520))
 
             # Buttons
@@ -1144,7 +3879,7 @@ def main():
             back_btn.draw(screen, font, mouse_pos)
 
             if mp_status:
-                status_surf = font.render(mp_status, True, (255, 200, 100))
+                status_surf = text_cache.render(font, mp_status, True, (255, 200, 100))
                 screen.blit(status_surf, (CX - status_surf.get_width() // 2, 650))
 
             if mouse_clicked:
@@ -1158,12 +3893,11 @@ def main():
                             stdout=subprocess.DEVNULL,
                             stderr=subprocess.DEVNULL
                         )
-                        import time
                         time.sleep(0.5)
                         if network_client.connect("localhost", DEFAULT_PORT, settings["player_name"], settings["ship_color_index"]):
                             current_world_name = world_list[selected_world_index]
                             data = load_world(current_world_name)
-                            game_state = load_game_state_from_data(data)
+                            game_state = load_game_state_from_data(data, settings["asteroid_backend"])
                             current_state = STATE_PLAYING
                             mp_status = ""
                         else:
@@ -1186,27 +3920,27 @@ def main():
 
         # ==================== JOIN GAME STATE ====================
         elif current_state == STATE_JOIN_GAME:
-            title = title_font.render("JOIN GAME", True, (255, 220, 100))
+            title = text_cache.render(title_font, "JOIN GAME", True, (255, 220, 100))
             screen.blit(title, (CX - title.get_width() // 2, 150))
 
             # IP Address input
-            ip_label = medium_font.render("Server IP:", True, (200, 200, 255))
+            ip_label = text_cache.render(medium_font, "Server IP:", True, (200, 200, 255))
             screen.blit(ip_label, (CX - 200, 260))
             ip_rect = pygame.Rect(CX - 200, 300, 250, 40)
             pygame.draw.rect(screen, (40, 40, 80), ip_rect, border_radius=5)
             pygame.draw.rect(screen, (100, 100, 200) if mp_input_field == 0 else (80, 80, 120), ip_rect, 2, border_radius=5)
             cursor_ip = "|" if mp_input_field == 0 and int(pygame.time.get_ticks() / 500) % 2 == 0 else ""
-            ip_surf = medium_font.render(server_ip + cursor_ip, True, (255, 255, 255))
+            ip_surf = text_cache.render(medium_font, server_ip + cursor_ip, True, (255, 255, 255))
             screen.blit(ip_surf, (ip_rect.x + 10, ip_rect.y + 8))
 
             # Port input
-            port_label = medium_font.render("Port:", True, (200, 200, 255))
+            port_label = text_cache.render(medium_font, "Port:", True, (200, 200, 255))
             screen.blit(port_label, (CX + 70, 260))
             port_rect = pygame.Rect(CX + 70, 300, 100, 40)
             pygame.draw.rect(screen, (40, 40, 80), port_rect, border_radius=5)
             pygame.draw.rect(screen, (100, 100, 200) if mp_input_field == 1 else (80, 80, 120), port_rect, 2, border_radius=5)
             cursor_port = "|" if mp_input_field == 1 and int(pygame.time.get_ticks() / 500) % 2 == 0 else ""
-            port_surf = medium_font.render(server_port + cursor_port, True, (255, 255, 255))
+            port_surf = text_cache.render(medium_font, server_port + cursor_port, True, (255, 255, 255))
             screen.blit(port_surf, (port_rect.x + 10, port_rect.y + 8))
 
             # Handle text input for IP/Port (handled in main event loop, not here)
@@ -1222,10 +3956,10 @@ def main():
             back_btn.draw(screen, font, mouse_pos)
 
             if mp_status:
-                status_surf = font.render(mp_status, True, (255, 200, 100))
+                status_surf = text_cache.render(font, mp_status, True, (255, 200, 100))
                 screen.blit(status_surf, (CX - status_surf.get_width() // 2, 480))
 
-            hint = font.render("TAB to switch fields, ESC to go back", True, (150, 150, 150))
+            hint = text_cache.render(font, "TAB to switch fields, ESC to go back", True, (150, 150, 150))
             screen.blit(hint, (CX - hint.get_width() // 2, SCREEN_H - 50))
 
             if mouse_clicked:
@@ -1234,7 +3968,7 @@ def main():
                         port = int(server_port) if server_port else DEFAULT_PORT
                         mp_status = "Connecting..."
                         if network_client.connect(server_ip, port, settings["player_name"], settings["ship_color_index"]):
-                            game_state = create_new_game_state()
+                            game_state = create_new_game_state(settings["asteroid_backend"])
                             current_world_name = "Multiplayer"
                             current_state = STATE_PLAYING
                             mp_status = ""
@@ -1250,361 +3984,30 @@ def main():
         elif current_state == STATE_PLAYING and game_state:
             gs = game_state
             player = gs["player"]
-            asteroids = gs["asteroids"]
-            bullets = gs["bullets"]
             carried_items = gs["carried_items"]
             floating_texts = gs["floating_texts"]
             upgrades = gs["upgrades"]
 
-            for asteroid in asteroids[:]:
-                asteroid.x += asteroid.dx * dt
-                asteroid.y += asteroid.dy * dt
-                dist = math.hypot(asteroid.x - gs["worldxposition"], asteroid.y - gs["worldyposition"])
-                if dist > 1200:
-                    asteroids.remove(asteroid)
-
-            cam_accel = 1200.0 + 40 * upgrades.get("speed", 0)
-            cam_max_speed = 800.0 + 20 * upgrades.get("speed", 0)
-            cam_friction = 6.0
-            rot_speed = math.radians(180)
+            if simulation is None or simulation.gs is not gs:
+                simulation = Simulation(gs, view_size=(SCREEN_W, SCREEN_H))
+                profiler.attach("sim", simulation.timer)
 
             KEY = pygame.key.get_pressed()
 
-            move_x = 0
-            move_y = 0
-
             # ----- KEYBOARD CONTROLS -----
-            if KEY[pygame.K_a]:
-                move_x -= 1
-            if KEY[pygame.K_d]:
-                move_x += 1
-            if KEY[pygame.K_w]:
-                move_y -= 1
-
-            # Apply rotation
-            player.rotation += move_x * rot_speed * dt
-
-            # Forward thrust
-            fx = math.sin(player.rotation)
-            fy = -math.cos(player.rotation)
-
-            if move_y < -0.2:
-                gs["cam_vx"] += fx * cam_accel * dt
-                gs["cam_vy"] += fy * cam_accel * dt
-
-
-            gs["cam_vx"] = max(-cam_max_speed, min(cam_max_speed, gs["cam_vx"]))
-            gs["cam_vy"] = max(-cam_max_speed, min(cam_max_speed, gs["cam_vy"]))
-
-            gs["cam_vx"] -= gs["cam_vx"] * min(1.0, cam_friction * dt)
-            gs["cam_vy"] -= gs["cam_vy"] * min(1.0, cam_friction * dt)
-
-            gs["worldxposition"] += gs["cam_vx"] * dt
-            gs["worldyposition"] += gs["cam_vy"] * dt
-
-            gs["time_since_shot"] += dt
-
-            fire_cooldown = max(0.08, 0.8 - 0.08 * upgrades.get("shoot_speed", 0))
-            
-            # Ultra Fire power
-            equipped_power = gs["powers"].get("equipped")
-            if equipped_power == "ultra_fire":
-                power_level = gs["powers"]["levels"].get(equipped_power, 0)
-                fire_cooldown = fire_cooldown / (2 + power_level * 1.5)
-            
-            # Check for shooting (keyboard only)
-            should_fire = KEY[pygame.K_SPACE]
-                
-            if should_fire and gs["time_since_shot"] >= fire_cooldown:
-                gs["time_since_shot"] = 0.0
-                nose_offset = 18.0
-                bx = gs["worldxposition"] + fx * nose_offset
-                by = gs["worldyposition"] + fy * nose_offset
-                bvx = fx * bullet_speed + gs["cam_vx"]
-                bvy = fy * bullet_speed + gs["cam_vy"]
-                bullets.append({"x": bx, "y": by, "vx": bvx, "vy": bvy, "life": bullet_life, "pierce_count": 0, "ignore_asteroid_id": None})
-
-            for b in bullets[:]:
-                # Auto-aim
-                if equipped_power == "auto_aim" and gs["power_effects"]:
-                    aim_strength = gs["power_effects"][0].get("strength", 0)
-                    # Find nearest asteroid
-                    nearest_dist = float('inf')
-                    nearest_asteroid = None
-                    for asteroid in asteroids:
-                        dist = math.hypot(asteroid.x - b["x"], asteroid.y - b["y"])
-                        if dist < nearest_dist and dist < 400:  # Only track within range
-                            nearest_dist = dist
-                            nearest_asteroid = asteroid
-                    
-                    if nearest_asteroid:
-                        # Steer bullet towards asteroid
-                        dx = nearest_asteroid.x - b["x"]
-                        dy = nearest_asteroid.y - b["y"]
-                        dist = math.hypot(dx, dy)
-                        if dist > 0:
-                            target_vx = (dx / dist) * bullet_speed
-                            target_vy = (dy / dist) * bullet_speed
-                            b["vx"] += (target_vx - b["vx"]) * aim_strength * dt * 5
-                            b["vy"] += (target_vy - b["vy"]) * aim_strength * dt * 5
-                
-                b["x"] += b["vx"] * dt
-                b["y"] += b["vy"] * dt
-                b["life"] -= dt
-                if b["life"] <= 0:
-                    bullets.remove(b)
-
-            # Update power effects
-            update_power_effects(gs, dt, CX, CY)
-
-            ship_radius = 14
-            for asteroid in asteroids:
-                pdx = asteroid.x - gs["worldxposition"]
-                pdy = asteroid.y - gs["worldyposition"]
-                dist = math.hypot(pdx, pdy)
-                if dist < ship_radius + asteroid.radius:
-                    nx = pdx / (dist + 1e-6)
-                    ny = pdy / (dist + 1e-6)
-                    dot = asteroid.dx * nx + asteroid.dy * ny
-                    asteroid.dx -= 2 * dot * nx
-                    asteroid.dy -= 2 * dot * ny
-                    dot_player = gs["cam_vx"] * nx + gs["cam_vy"] * ny
-                    gs["cam_vx"] -= 2 * dot_player * nx
-                    gs["cam_vy"] -= 2 * dot_player * ny
-                    
-                    # Push asteroid away to prevent sticking
-                    overlap = (ship_radius + asteroid.radius) - dist
-                    if overlap > 0:
-                        asteroid.x += nx * overlap * 1.2
-                        asteroid.y += ny * overlap * 1.2
-
-            for i, a1 in enumerate(asteroids):
-                for j, a2 in enumerate(asteroids):
-                    if i >= j:
-                        continue
-                    dx = a1.x - a2.x
-                    dy = a1.y - a2.y
-                    dist = math.hypot(dx, dy)
-                    min_dist = a1.radius + a2.radius
-                    if dist < min_dist and dist > 0:
-                        nx = dx / dist
-                        ny = dy / dist
-                        dot1 = a1.dx * nx + a1.dy * ny
-                        dot2 = a2.dx * nx + a2.dy * ny
-                        a1.dx -= dot1 * nx
-                        a1.dy -= dot1 * ny
-                        a2.dx -= dot2 * nx
-                        a2.dy -= dot2 * ny
-                        overlap = min_dist - dist
-                        a1.x += nx * (overlap / 2)
-                        a1.y += ny * (overlap / 2)
-                        a2.x -= nx * (overlap / 2)
-                        a2.y -= ny * (overlap / 2)
-
-            right_x = math.cos(player.rotation)
-            right_y = math.sin(player.rotation)
-            k_spring = 6.0
-            damping = 2.0
-            for item in carried_items:
-                a_lat = gs["cam_vx"] * right_x + gs["cam_vy"] * right_y
-                ang_acc = -k_spring * (item["rel_angle"] - math.pi) - damping * item["ang_vel"] - (a_lat) * 0.09
-                item["ang_vel"] += ang_acc * dt
-                item["rel_angle"] += item["ang_vel"] * dt
-
-            # Collision between carried items
-            item_radius = 8
-            for i, item1 in enumerate(carried_items):
-                for j, item2 in enumerate(carried_items):
-                    if i >= j:
-                        continue
-                    # Calculate positions
-                    ang1 = player.rotation + item1["rel_angle"]
-                    ang2 = player.rotation + item2["rel_angle"]
-                    x1 = math.sin(ang1) * item1["length"]
-                    y1 = -math.cos(ang1) * item1["length"]
-                    x2 = math.sin(ang2) * item2["length"]
-                    y2 = -math.cos(ang2) * item2["length"]
-                    # Check collision
-                    dx = x2 - x1
-                    dy = y2 - y1
-                    dist = math.hypot(dx, dy)
-                    min_dist = item_radius * 2
-                    if dist < min_dist and dist > 0:
-                        # Push items apart by adjusting angles
-                        push = 0.15 * (min_dist - dist) / dist
-                        item1["ang_vel"] -= push
-                        item2["ang_vel"] += push
-
-            for ft in floating_texts[:]:
-                ft["x"] += ft["dx"] * dt
-                ft["y"] += ft["dy"] * dt
-                ft["timer"] += dt
-                ft["alpha"] -= 120 * dt
-                if ft["alpha"] <= 0 or ft["timer"] > 2.0:
-                    floating_texts.remove(ft)
-            
-            # Update floating loot
-            storage_capacity = 5 + 5 * upgrades.get("storage", 0)
-            equipped_power = gs["powers"].get("equipped")
-            magnet_active = equipped_power == "magnet" and len(gs["power_effects"]) > 0
-            magnet_range = gs["power_effects"][0].get("range", 0) if magnet_active else 0
-            magnet_strength = gs["power_effects"][0].get("strength", 0) if magnet_active else 0
-            
-            # Update drop cooldown
-            if gs["drop_cooldown"] > 0:
-                gs["drop_cooldown"] -= dt
-            
-            # Required materials for power shop
-            required_mats = {"Iron": 10, "Copper": 5, "Titanium": 3, "Uranium": 2, "Power Core": 1}
-            
-            for loot in gs["floating_loot"][:]:
-                # Magnet - INSTANT COLLECTION within range
-                if magnet_active and magnet_range > 0:
-                    dx = gs["worldxposition"] - loot["x"]
-                    dy = gs["worldyposition"] - loot["y"]
-                    dist = math.hypot(dx, dy)
-                    if dist < magnet_range:
-                        # Instantly collect the loot
-                        space = max(0, storage_capacity - len(carried_items))
-                        if space > 0:
-                            # Update collection quests
-                            for quest in gs["quests"]:
-                                if quest.quest_type == "collect_iron" and loot["mat"] == "Iron":
-                                    quest.update_progress(1)
-                                elif quest.quest_type == "collect_gold" and loot["mat"] == "Gold":
-                                    quest.update_progress(1)
-                                elif quest.quest_type == "collect_diamond" and loot["mat"] == "Diamond":
-                                    quest.update_progress(1)
-                                elif quest.quest_type == "collect_rare" and loot["mat"] in ["Titanium", "Platinum", "Uranium", "Diamond", "Power Core"]:
-                                    quest.update_progress(1)
-                            
-                            carried_items.append({
-                                "mat": loot["mat"],
-                                "rel_angle": math.pi + random.uniform(-0.8, 0.8),
-                                "ang_vel": random.uniform(-1.0, 1.0),
-                                "length": 55 + random.uniform(-10, 15),
-                                "color": loot["color"],
-                            })
-                            gs["floating_loot"].remove(loot)
-                            continue
-                
-                # Apply friction
-                friction = 0.95
-                loot["vx"] *= friction
-                loot["vy"] *= friction
-                
-                # Check if loot is in drop zone (only if power shop not unlocked)
-                if not upgrades.get("powers_unlocked", False):
-                    dist_to_zone = math.hypot(loot["x"] - drop_zone_x, loot["y"] - drop_zone_y)
-                    if dist_to_zone < drop_zone_radius:
-                        # Check if this material is needed
-                        if loot["mat"] in required_mats:
-                            current = gs["power_shop_materials"].get(loot["mat"], 0)
-                            needed = required_mats[loot["mat"]]
-                            if current < needed:
-                                gs["power_shop_materials"][loot["mat"]] = current + 1
-                                gs["floating_loot"].remove(loot)
-                                # Add floating text
-                                floating_texts.append({
-                                    "text": f"+1 {loot['mat']} (Build)",
-                                    "x": drop_zone_x,
-                                    "y": drop_zone_y,
-                                    "dx": 0,
-                                    "dy": -50,
-                                    "alpha": 255,
-                                    "timer": 0.0,
-                                    "color": (100, 255, 100)
-                                })
-                                continue
-                
-                # Update position
-                loot["x"] += loot["vx"] * dt
-                loot["y"] += loot["vy"] * dt
-                if loot["lifetime"] > 0:  # Only decrease if not permanent
-                    loot["lifetime"] -= dt
-                
-                # Check if player picks it up (only if cooldown expired)
-                if gs["drop_cooldown"] <= 0:
-                    dist_to_player = math.hypot(loot["x"] - gs["worldxposition"], loot["y"] - gs["worldyposition"])
-                    if dist_to_player < 30:  # Pickup radius
-                        space = max(0, storage_capacity - len(carried_items))
-                        if space > 0:
-                            # Update collection quests
-                            for quest in gs["quests"]:
-                                if quest.quest_type == "collect_iron" and loot["mat"] == "Iron":
-                                    quest.update_progress(1)
-                                elif quest.quest_type == "collect_gold" and loot["mat"] == "Gold":
-                                    quest.update_progress(1)
-                                elif quest.quest_type == "collect_diamond" and loot["mat"] == "Diamond":
-                                    quest.update_progress(1)
-                                elif quest.quest_type == "collect_rare" and loot["mat"] in ["Titanium", "Platinum", "Uranium", "Diamond", "Power Core"]:
-                                    quest.update_progress(1)
-                            
-                            carried_items.append({
-                                "mat": loot["mat"],
-                                "rel_angle": math.pi + random.uniform(-0.8, 0.8),
-                                "ang_vel": random.uniform(-1.0, 1.0),
-                                "length": 55 + random.uniform(-10, 15),
-                                "color": loot["color"],
-                            })
-                            gs["floating_loot"].remove(loot)
-                            continue
-                
-                # Remove if expired (only if lifetime is positive and expired)
-                if loot["lifetime"] > 0 and loot["lifetime"] <= 0:
-                    gs["floating_loot"].remove(loot)
+            sim_inputs = {
+                "rotate": (1 if KEY[pygame.K_d] else 0) - (1 if KEY[pygame.K_a] else 0),
+                "thrust": bool(KEY[pygame.K_w]),
+                "fire": bool(KEY[pygame.K_SPACE]),  # Keyboard only
+            }
+            profiler.lap("controls")
+            sim_alpha = simulation.advance(dt, sim_inputs)
+            profiler.skip()
+
+            # Render between the last two simulation steps
+            view_x, view_y, view_rotation = simulation.view(sim_alpha)
+            lag = simulation.lag(sim_alpha)
 
-            # Update outer space detection and animation
-            dist_from_base = math.hypot(gs["worldxposition"] - base_x, gs["worldyposition"] - base_y)
-            target_outer_space = dist_from_base > OUTER_SPACE_DISTANCE
-            
-            # Track travel distance quest
-            for quest in gs["quests"]:
-                if quest.quest_type == "travel_distance":
-                    # Update if current distance is greater than progress
-                    if dist_from_base > quest.progress:
-                        quest.progress = int(dist_from_base)
-                        if quest.progress >= quest.target:
-                            quest.progress = quest.target
-                            quest.completed = True
-            
-            if target_outer_space and not gs["in_outer_space"]:
-                gs["in_outer_space"] = True
-            elif not target_outer_space and gs["in_outer_space"]:
-                gs["in_outer_space"] = False
-            
-            # Animate outer space text
-            if gs["in_outer_space"]:
-                gs["outer_space_anim"] = min(1.0, gs["outer_space_anim"] + dt * 2.0)
-            else:
-                gs["outer_space_anim"] = max(0.0, gs["outer_space_anim"] - dt * 2.0)
-            
-            # Update coin animations
-            for coin in gs["coin_animations"][:]:
-                coin["progress"] += dt * 2.5  # Animation speed
-                if coin["progress"] >= 1.0:
-                    gs["coin_animations"].remove(coin)
-                    gs["currency_display"] += coin["value"]
-            
-            # Smooth currency display animation
-            if gs["currency_display"] < gs["currency"]:
-                diff = gs["currency"] - gs["currency_display"]
-                gs["currency_display"] += min(diff, diff * 5 * dt)
-            elif gs["currency_display"] > gs["currency"]:
-                gs["currency_display"] = gs["currency"]
-            
-            # Update quest cooldown and generate new quests ONE AT A TIME
-            if gs["quest_cooldown"] > 0:
-                gs["quest_cooldown"] -= dt
-                if gs["quest_cooldown"] <= 0:
-                    gs["quest_cooldown"] = 0
-                    # Generate ONE new quest if we have less than 3
-                    if len(gs["quests"]) < 3:
-                        gs["quests"].append(Quest())
-                        # If still less than 3, set cooldown for next quest
-                        if len(gs["quests"]) < 3:
-                            gs["quest_cooldown"] = 120.0
-            
             # Multiplayer network updates
             if network_client.connected:
                 network_client.receive()
@@ -1615,506 +4018,35 @@ def main():
                         gs["worldxposition"],
                         gs["worldyposition"],
                         player.rotation,
-                        settings["ship_color_index"]
+                        settings["ship_color_index"],
+                        gs["cosmetics"]["equipped_ship"]
                     )
-
-            # Background color - lighter normally, dark in outer space
-            if gs["in_outer_space"]:
-                # Dark background in outer space
-                screen.fill((5, 5, 15))
-                # Draw dark circle around player
-                dark_radius = 800
-                dark_surf = pygame.Surface((SCREEN_W, SCREEN_H), pygame.SRCALPHA)
-                # Create gradient from center
-                for r in range(dark_radius, 0, -20):
-                    alpha = int(150 * (1 - r / dark_radius))
-                    pygame.draw.circle(dark_surf, (0, 0, 5, alpha), (CX, CY), r)
-                screen.blit(dark_surf, (0, 0))
-            else:
-                # Lighter background near base
-                screen.fill((15, 15, 35))
-
-            # Render power effects (behind everything)
-            render_power_effects(screen, gs, CX, CY, player.rotation)
-            
-            # Draw material drop zone (only if power shop not unlocked) - BEHIND player
-            if not upgrades.get("powers_unlocked", False):
-                dz_scr_x = int(drop_zone_x - gs["worldxposition"] + CX)
-                dz_scr_y = int(drop_zone_y - gs["worldyposition"] + CY)
-                # Draw hollow layered circles
-                for i in range(3):
-                    radius = int(drop_zone_radius - i * 15)
-                    alpha = 80 - i * 20
-                    circle_surf = pygame.Surface((radius * 2, radius * 2), pygame.SRCALPHA)
-                    pygame.draw.circle(circle_surf, (100, 255, 100, alpha), (radius, radius), radius, 3)
-                    screen.blit(circle_surf, (dz_scr_x - radius, dz_scr_y - radius))
-                dz_label = font.render("DROP MATERIALS", True, (100, 255, 100))
-                screen.blit(dz_label, (dz_scr_x - dz_label.get_width()//2, dz_scr_y - 10))
-
-            for ft in floating_texts:
-                sx = int(ft["x"] - gs["worldxposition"] + CX)
-                sy = int(ft["y"] - gs["worldyposition"] + CY)
-                text_color = ft.get("color", (255, 255, 80))
-                surf = font.render(ft["text"], True, text_color)
-                surf.set_alpha(max(0, min(255, int(ft["alpha"]))))
-                screen.blit(surf, (sx, sy))
-            
-            # Render coin animations
-            for coin in gs["coin_animations"]:
-                t = coin["progress"]
-                # Ease out cubic
-                t_eased = 1 - pow(1 - t, 3)
-                x = coin["x"] + (coin["target_x"] - coin["x"]) * t_eased
-                y = coin["y"] + (coin["target_y"] - coin["y"]) * t_eased
-                # Draw coin
-                alpha = int(255 * (1 - t))
-                coin_surf = pygame.Surface((20, 20), pygame.SRCALPHA)
-                pygame.draw.circle(coin_surf, (255, 220, 100, alpha), (10, 10), 10)
-                pygame.draw.circle(coin_surf, (255, 255, 150, alpha), (10, 10), 7)
-                screen.blit(coin_surf, (int(x) - 10, int(y) - 10))
-
-            ship_color = SHIP_COLORS[settings["ship_color_index"]][1]
-            cx, cy = CX, CY
-            size = 14
-            pts = [(0, -size), (size * 0.6, size), (-size * 0.6, size)]
-            cosr = math.cos(player.rotation)
-            sinr = math.sin(player.rotation)
-            rot_pts = []
-            for x, y in pts:
-                rx = x * cosr - y * sinr + cx
-                ry = x * sinr + y * cosr + cy
-                rot_pts.append((int(rx), int(ry)))
-
-            # Draw fire particles behind ship when thrusting
-            KEY = pygame.key.get_pressed()
-            if KEY[pygame.K_w]:
-                fx_dir = math.sin(player.rotation)
-                fy_dir = -math.cos(player.rotation)
-                # Fire base position (behind ship)
-                fire_base_x = cx - fx_dir * (size + 2)
-                fire_base_y = cy - fy_dir * (size + 2)
-                # Draw multiple fire particles with randomness for flickering effect
-                for _ in range(8):
-                    # Random offset perpendicular to thrust direction
-                    perp_x = -fy_dir
-                    perp_y = fx_dir
-                    spread = random.uniform(-6, 6)
-                    length = random.uniform(12, 28)
-                    px = fire_base_x + perp_x * spread - fx_dir * length
-                    py = fire_base_y + perp_y * spread - fy_dir * length
-                    # Color gradient: yellow core, orange mid, red outer
-                    t = length / 28.0
-                    if t < 0.4:
-                        color = (255, 255, int(200 * (1 - t/0.4)))  # Yellow to orange
-                    elif t < 0.7:
-                        color = (255, int(165 * (1 - (t-0.4)/0.3)), 0)  # Orange to red-orange
-                    else:
-                        color = (255, int(80 * (1 - (t-0.7)/0.3)), 0)  # Red-orange to red
-                    particle_size = int(4 * (1 - t * 0.5))
-                    pygame.draw.circle(screen, color, (int(px), int(py)), max(2, particle_size))
-                # Draw bright core
-                for _ in range(3):
-                    spread = random.uniform(-3, 3)
-                    core_x = fire_base_x + perp_x * spread - fx_dir * random.uniform(2, 8)
-                    core_y = fire_base_y + perp_y * spread - fy_dir * random.uniform(2, 8)
-                    pygame.draw.circle(screen, (255, 255, 200), (int(core_x), int(core_y)), 3)
-
-            # Draw ship with outline
-            pygame.draw.polygon(screen, ship_color, rot_pts)
-            pygame.draw.polygon(screen, (255, 255, 255), rot_pts, 2)  # White outline
-
-            # Draw player nametag above own ship
-            own_name_surf = font.render(settings["player_name"], True, (200, 255, 200))
-            screen.blit(own_name_surf, (cx - own_name_surf.get_width() // 2, cy - 35))
-
-            # Draw other players (multiplayer)
-            if network_client.connected:
-                other_players = network_client.get_other_players()
-                for pid, pdata in other_players.items():
-                    # Calculate screen position relative to our position
-                    other_x = pdata.get("x", 0)
-                    other_y = pdata.get("y", 0)
-                    other_rot = pdata.get("rotation", 0)
-                    other_color_idx = pdata.get("color_index", 0)
-                    other_name = pdata.get("name", "Player")
-
-                    # Screen position
-                    scr_x = int(other_x - gs["worldxposition"] + CX)
-                    scr_y = int(other_y - gs["worldyposition"] + CY)
-
-                    # Only draw if on screen (with margin)
-                    if -100 < scr_x < SCREEN_W + 100 and -100 < scr_y < SCREEN_H + 100:
-                        # Get ship color
-                        other_color = SHIP_COLORS[other_color_idx % len(SHIP_COLORS)][1]
-
-                        # Draw other player's ship
-                        other_size = 14
-                        other_pts = [(0, -other_size), (other_size * 0.6, other_size), (-other_size * 0.6, other_size)]
-                        other_cosr = math.cos(other_rot)
-                        other_sinr = math.sin(other_rot)
-                        other_rot_pts = []
-                        for ox, oy in other_pts:
-                            orx = ox * other_cosr - oy * other_sinr + scr_x
-                            ory = ox * other_sinr + oy * other_cosr + scr_y
-                            other_rot_pts.append((int(orx), int(ory)))
-
-                        pygame.draw.polygon(screen, other_color, other_rot_pts)
-                        pygame.draw.polygon(screen, (255, 255, 255), other_rot_pts, 2)
-
-                        # Draw nametag above other player
-                        name_surf = font.render(other_name, True, (255, 255, 255))
-                        name_bg = pygame.Rect(
-                            scr_x - name_surf.get_width() // 2 - 4,
-                            scr_y - 38,
-                            name_surf.get_width() + 8,
-                            name_surf.get_height() + 4
-                        )
-                        pygame.draw.rect(screen, (0, 0, 0, 150), name_bg, border_radius=3)
-                        screen.blit(name_surf, (scr_x - name_surf.get_width() // 2, scr_y - 35))
-
-            bx_scr = int(base_x - gs["worldxposition"] + CX)
-            by_scr = int(base_y - gs["worldyposition"] + CY)
-            base_size = 28
-            # Draw base with same style as power shop
-            pygame.draw.rect(screen, (80, 100, 255), (bx_scr - base_size//2, by_scr - base_size//2, base_size, base_size), 0, border_radius=5)
-            pygame.draw.rect(screen, (150, 180, 255), (bx_scr - base_size//2, by_scr - base_size//2, base_size, base_size), 3, border_radius=5)
-            # Add glow effect
-            glow_surf = pygame.Surface((base_size + 20, base_size + 20), pygame.SRCALPHA)
-            pygame.draw.rect(glow_surf, (150, 180, 255, 50), (0, 0, base_size + 20, base_size + 20), border_radius=10)
-            screen.blit(glow_surf, (bx_scr - base_size//2 - 10, by_scr - base_size//2 - 10))
-            base_label = font.render("BASE", True, (150, 180, 255))
-            screen.blit(base_label, (bx_scr - base_label.get_width()//2, by_scr - 45))
-            
-            # Draw power shop structure
-            if upgrades.get("powers_unlocked", False):
-                psx_scr = int(power_shop_x - gs["worldxposition"] + CX)
-                psy_scr = int(power_shop_y - gs["worldyposition"] + CY)
-                ps_size = 28
-                # Draw purple/pink structure
-                pygame.draw.rect(screen, (180, 80, 255), (psx_scr - ps_size//2, psy_scr - ps_size//2, ps_size, ps_size), 0, border_radius=5)
-                pygame.draw.rect(screen, (255, 150, 255), (psx_scr - ps_size//2, psy_scr - ps_size//2, ps_size, ps_size), 3, border_radius=5)
-                # Add glow effect
-                glow_surf = pygame.Surface((ps_size + 20, ps_size + 20), pygame.SRCALPHA)
-                pygame.draw.rect(glow_surf, (255, 150, 255, 50), (0, 0, ps_size + 20, ps_size + 20), border_radius=10)
-                screen.blit(glow_surf, (psx_scr - ps_size//2 - 10, psy_scr - ps_size//2 - 10))
-                ps_label = font.render("POWER SHOP", True, (255, 150, 255))
-                screen.blit(ps_label, (psx_scr - ps_label.get_width()//2, psy_scr - 45))
-
-            if not (0 <= bx_scr <= SCREEN_W and 0 <= by_scr <= SCREEN_H):
-                dir_x = bx_scr - CX
-                dir_y = by_scr - CY
-                ang = math.atan2(dir_y, dir_x)
-                margin = 40
-                t_vals = []
-                if math.cos(ang) != 0:
-                    t_vals.extend([(margin - CX) / math.cos(ang), (SCREEN_W - margin - CX) / math.cos(ang)])
-                if math.sin(ang) != 0:
-                    t_vals.extend([(margin - CY) / math.sin(ang), (SCREEN_H - margin - CY) / math.sin(ang)])
-                t_edge = min([t for t in t_vals if t > 0], default=1)
-                arrow_x = int(CX + math.cos(ang) * t_edge)
-                arrow_y = int(CY + math.sin(ang) * t_edge)
-                arrow_size = 14
-                p1 = (int(arrow_x + math.cos(ang) * arrow_size), int(arrow_y + math.sin(ang) * arrow_size))
-                p2 = (int(arrow_x + math.cos(ang + 2.5) * arrow_size), int(arrow_y + math.sin(ang + 2.5) * arrow_size))
-                p3 = (int(arrow_x + math.cos(ang - 2.5) * arrow_size), int(arrow_y + math.sin(ang - 2.5) * arrow_size))
-                pygame.draw.polygon(screen, (255, 140, 0), [p1, p2, p3])
-
-            loot_counter = {}
-            for asteroid in asteroids[:]:
-                ax = int(asteroid.x - gs["worldxposition"] + CX)
-                ay = int(asteroid.y - gs["worldyposition"] + CY)
-                size = asteroid.radius * 2
-                img = pygame.transform.smoothscale(asteroid_img, (size, size))
-                
-                # Golden asteroid tint - better visual
-                if asteroid.golden:
-                    # Create a circular gold overlay instead of square
-                    gold_overlay = pygame.Surface((size, size), pygame.SRCALPHA)
-                    center = size // 2
-                    for r in range(asteroid.radius, 0, -2):
-                        alpha = int(80 * (r / asteroid.radius))
-                        pygame.draw.circle(gold_overlay, (255, 215, 0, alpha), (center, center), r)
-                    img.blit(gold_overlay, (0, 0), special_flags=pygame.BLEND_RGBA_ADD)
-                
-                screen.blit(img, (ax - asteroid.radius, ay - asteroid.radius))
-                
-                # Golden asteroid sparkle particles
-                if asteroid.golden:
-                    for _ in range(3):
-                        spark_angle = random.uniform(0, 2 * math.pi)
-                        spark_dist = random.uniform(0, asteroid.radius * 0.9)
-                        spark_x = ax + math.cos(spark_angle) * spark_dist
-                        spark_y = ay + math.sin(spark_angle) * spark_dist
-                        spark_size = random.randint(2, 4)
-                        spark_color = random.choice([(255, 255, 150), (255, 215, 0), (255, 255, 200)])
-                        pygame.draw.circle(screen, spark_color, (int(spark_x), int(spark_y)), spark_size)
-
-                barw = 40 if asteroid.boss else 28
-                barh = 7 if asteroid.boss else 5
-                health_frac = asteroid.health / asteroid.max_health
-                bar_x = ax - barw // 2
-                bar_y = ay - asteroid.radius - (18 if asteroid.boss else 12)
-                pygame.draw.rect(screen, (60, 60, 60), (bar_x, bar_y, barw, barh))
-                pygame.draw.rect(screen, (80, 255, 80), (bar_x, bar_y, int(barw * health_frac), barh))
-                health_text = font.render(f"{max(0, int(asteroid.health))}", True, (255, 255, 255))
-                text_rect = health_text.get_rect(center=(ax, bar_y + barh // 2))
-                screen.blit(health_text, text_rect)
-
-                for b in bullets[:]:
-                    # Skip if this bullet should ignore this asteroid
-                    if b.get("ignore_asteroid_id") == id(asteroid):
-                        continue
-                    
-                    ddx = asteroid.x - b["x"]
-                    ddy = asteroid.y - b["y"]
-                    if math.hypot(ddx, ddy) < asteroid.radius + 6:
-                        damage = 1 + upgrades.get("shot_damage", 0)
-                        asteroid.health -= damage
-                        
-                        # Power effects on hit
-                        equipped_power = gs["powers"].get("equipped")
-                        power_level = gs["powers"]["levels"].get(equipped_power, 0)
-                        
-                        # Bullet Split
-                        if equipped_power == "bullet_split":
-                            num_splits = 1 + power_level
-                            for _ in range(num_splits):
-                                angle = random.uniform(0, 2 * math.pi)
-                                split_speed = bullet_speed * 0.7
-                                # Spawn bullets outside the asteroid radius to prevent instant re-hit
-                                spawn_distance = asteroid.radius + 15
-                                bullets.append({
-                                    "x": asteroid.x + math.cos(angle) * spawn_distance,
-                                    "y": asteroid.y + math.sin(angle) * spawn_distance,
-                                    "vx": math.cos(angle) * split_speed,
-                                    "vy": math.sin(angle) * split_speed,
-                                    "life": bullet_life * 0.5,
-                                    "pierce_count": 0,
-                                    "ignore_asteroid_id": id(asteroid)  # Don't hit the source asteroid
-                                })
-                        
-                        # Explosive Shots - MUCH MORE POWERFUL
-                        if equipped_power == "explosive_shots":
-                            explosion_radius = 100 + power_level * 50  # Increased from 50 + 20
-                            explosion_damage = 5 + power_level * 3  # Increased from 2 + 1
-                            # Damage all asteroids in explosion radius from the hit point
-                            for other_asteroid in asteroids:
-                                dist_to_explosion = math.hypot(other_asteroid.x - b["x"], other_asteroid.y - b["y"])
-                                if dist_to_explosion < explosion_radius:
-                                    # More damage closer to center
-                                    damage_mult = 1.0 - (dist_to_explosion / explosion_radius) * 0.5
-                                    other_asteroid.health -= explosion_damage * damage_mult
-                            
-                            # Visual explosion effect - bigger and more visible
-                            for _ in range(15):
-                                angle = random.uniform(0, 2 * math.pi)
-                                dist = random.uniform(0, explosion_radius)
-                                floating_texts.append({
-                                    "text": "💥",
-                                    "x": b["x"] + math.cos(angle) * dist,
-                                    "y": b["y"] + math.sin(angle) * dist,
-                                    "dx": math.cos(angle) * 50,
-                                    "dy": math.sin(angle) * 50,
-                                    "alpha": 255,
-                                    "timer": 0.0,
-                                    "color": (255, 150, 0)
-                                })
-                        
-                        # Piercing - only remove bullet if it's out of pierces
-                        should_remove = True
-                        # Check if piercing is active via power_effects
-                        piercing_active = False
-                        max_pierce = 0
-                        for effect in gs["power_effects"]:
-                            if effect.get("type") == "piercing":
-                                piercing_active = True
-                                max_pierce = effect.get("pierce_count", 0)
-                                break
-                        
-                        if piercing_active and max_pierce > 0:
-                            if b.get("pierce_count", 0) < max_pierce:
-                                b["pierce_count"] = b.get("pierce_count", 0) + 1
-                                should_remove = False
-                        
-                        if should_remove:
-                            try:
-                                bullets.remove(b)
-                            except ValueError:
-                                pass
-                        
-                        if asteroid.health <= 0:
-                            # Update quests
-                            for quest in gs["quests"]:
-                                if quest.quest_type == "destroy_asteroids":
-                                    quest.update_progress(1)
-                                elif quest.quest_type == "destroy_boss" and asteroid.boss:
-                                    quest.update_progress(1)
-                                elif quest.quest_type == "destroy_golden" and asteroid.golden:
-                                    quest.update_progress(1)
-                                elif quest.quest_type == "destroy_many":
-                                    quest.update_progress(1)
-                            
-                            try:
-                                asteroids.remove(asteroid)
-                            except ValueError:
-                                pass
-                            loot_counter.clear()
-                            loot_table = [
-                                ("Iron", 0.5), ("Copper", 0.2), ("Gold", 0.08), ("Titanium", 0.08),
-                                ("Platinum", 0.06), ("Uranium", 0.05), ("Diamond", 0.03)
-                            ]
-                            if asteroid.boss:
-                                loot_table = [
-                                    ("Diamond", 0.25), ("Uranium", 0.2), ("Platinum", 0.2),
-                                    ("Titanium", 0.15), ("Gold", 0.1), ("Copper", 0.06), ("Iron", 0.04)
-                                ]
-                            loot_count = max(1, int(asteroid.max_health/6 + asteroid.radius/8))
-                            storage_capacity = 5 + 5 * upgrades.get("storage", 0)
-                            for _ in range(loot_count):
-                                r = random.random()
-                                bias = min(1.0, (asteroid.max_health + asteroid.radius) / 120.0)
-                                loot_table_biased = []
-                                for idx, (mat, prob) in enumerate(loot_table):
-                                    if idx >= len(loot_table) - 3:
-                                        prob = prob + prob * bias * 2.5
-                                    loot_table_biased.append((mat, prob))
-                                total_prob = sum(p for _, p in loot_table_biased)
-                                loot_table_biased = [(mat, p/total_prob) for mat, p in loot_table_biased]
-                                acc = 0.0
-                                for mat, prob in loot_table_biased:
-                                    acc += prob
-                                    if r <= acc:
-                                        # Create floating loot instead of directly adding to inventory
-                                        angle = random.uniform(0, 2*math.pi)
-                                        speed = random.uniform(40, 80)
-                                        gs["floating_loot"].append({
-                                            "mat": mat,
-                                            "x": asteroid.x,
-                                            "y": asteroid.y,
-                                            "vx": math.cos(angle) * speed,
-                                            "vy": math.sin(angle) * speed,
-                                            "color": list(color_map.get(mat, (255, 255, 255))),
-                                            "lifetime": -1  # Never despawn
-                                        })
-                                        loot_counter[mat] = loot_counter.get(mat, 0) + 1
-                                        break
-                            
-                            # Power cores from golden asteroids
-                            if asteroid.golden and random.random() < 0.3:  # 30% chance from golden
-                                angle = random.uniform(0, 2*math.pi)
-                                speed = random.uniform(40, 80)
-                                gs["floating_loot"].append({
-                                    "mat": "Power Core",
-                                    "x": asteroid.x,
-                                    "y": asteroid.y,
-                                    "vx": math.cos(angle) * speed,
-                                    "vy": math.sin(angle) * speed,
-                                    "color": [100, 255, 100],  # Green
-                                    "lifetime": -1  # Never despawn
-                                })
-                                loot_counter["Power Core"] = loot_counter.get("Power Core", 0) + 1
-                            
-                            for mat, count in loot_counter.items():
-                                for _ in range(count):
-                                    angle = random.uniform(0, 2*math.pi)
-                                    speed = random.uniform(30, 70)
-                                    # Green text for power cores
-                                    text_color = (100, 255, 100) if mat == "Power Core" else (255, 255, 80)
-                                    floating_texts.append({
-                                        "text": f"+1 {mat}",
-                                        "x": asteroid.x,
-                                        "y": asteroid.y,
-                                        "dx": math.cos(angle)*speed,
-                                        "dy": math.sin(angle)*speed,
-                                        "alpha": 255,
-                                        "timer": 0.0,
-                                        "color": text_color
-                                    })
-
-            gs["spawn_timer"] += dt
-            if gs["spawn_timer"] >= spawn_interval:
-                gs["spawn_timer"] = 0.0
-                if len(asteroids) < max_asteroids:
-                    # Spawn outside camera view
-                    ang = random.random() * 2 * math.pi
-                    # Spawn at edge of screen + some distance
-                    spawn_distance = max(SCREEN_W, SCREEN_H) // 2 + random.randint(100, 300)
-                    rx = gs["worldxposition"] + math.cos(ang) * spawn_distance
-                    ry = gs["worldyposition"] + math.sin(ang) * spawn_distance
-                    base_dist = math.hypot(rx - base_x, ry - base_y)
-                    # Increased spawn chance at far distances
-                    spawn_chance = max(0.15, 1.0 * math.exp(-base_dist / 4500))
-                    if base_dist > 3000:
-                        spawn_chance = min(0.95, spawn_chance * 1.5)  # Much higher chance far away
-                    if random.random() <= spawn_chance:
-                        # Incremental scaling based on distance
-                        # Size scales from 1.0 at base to higher values far away
-                        size_scale = 1.0 + (base_dist / 2000.0)  # Gradual increase
-                        size_scale = min(size_scale, 10.0)  # Cap at 10x
-                        
-                        # Boss probability increases with distance
-                        boss_prob = min(0.15, 0.02 + (base_dist / 20000.0))
-                        is_boss = random.random() < boss_prob and base_dist > 2000
-                        
-                        # Calculate health based on size scale
-                        if is_boss:
-                            base_health = 40
-                            health = int(base_health * size_scale * random.uniform(0.8, 1.2))
-                        else:
-                            base_health = random.randint(6, 18)
-                            health = int(base_health * size_scale * random.uniform(0.9, 1.1))
-                        
-                        # Calculate radius based on size scale
-                        if is_boss:
-                            radius = int((32 + base_dist / 200) * random.uniform(0.9, 1.1))
-                        else:
-                            radius = int((8 + base_dist / 400) * random.uniform(0.9, 1.1))
-                        
-                        radius = max(8, min(radius, 80))  # Clamp between 8 and 80
-                        
-                        asteroids.append(Asteroid(rx, ry, random.uniform(-30, 30), random.uniform(-30, 30), health=health, boss=is_boss))
-                        asteroids[-1].radius = radius
-                        asteroids[-1].max_health = health
-
+            profiler.lap("network")
+
+            world_renderer.set_target(resolution.target(), resolution.zoom)
+            world_renderer.draw(
+                gs, view_x, view_y, view_rotation, lag,
+                ship_color=SHIP_COLORS[settings["ship_color_index"]][1],
+                player_name=settings["player_name"],
+                other_players=network_client.get_other_players() if network_client.connected else None,
+                thrusting=sim_inputs["thrust"],
+                dt=dt,
+                sparkle_emitters=simulation.sparkle_emitters,
+            )
+            profiler.skip()
+            resolution.present()
+            profiler.lap("upscale")
             speed = math.hypot(gs["cam_vx"], gs["cam_vy"])
-            sx = int(gs["cam_vx"] * 0.05)
-            sy = int(gs["cam_vy"] * 0.05)
-            cx, cy = CX, CY
-            pygame.draw.line(screen, (0, 255, 0), (cx, cy), (cx + sx, cy + sy), 3)
-
-            for b in bullets:
-                bx_scr = int(b["x"] - gs["worldxposition"] + CX)
-                by_scr = int(b["y"] - gs["worldyposition"] + CY)
-                # Piercing bullets are blue, normal bullets are yellow
-                is_piercing = any(e.get("type") == "piercing" for e in gs["power_effects"])
-                bullet_color = (100, 200, 255) if is_piercing else (255, 220, 0)
-                pygame.draw.circle(screen, bullet_color, (bx_scr, by_scr), 3)
-            
-            # Draw floating loot
-            for loot in gs["floating_loot"]:
-                lx_scr = int(loot["x"] - gs["worldxposition"] + CX)
-                ly_scr = int(loot["y"] - gs["worldyposition"] + CY)
-                # Draw loot with pulsing effect
-                pulse = 1.0 + 0.2 * math.sin(pygame.time.get_ticks() / 200.0)
-                radius = int(8 * pulse)
-                pygame.draw.circle(screen, tuple(loot["color"]), (lx_scr, ly_scr), radius)
-                pygame.draw.circle(screen, (255, 255, 255), (lx_scr, ly_scr), radius, 2)
-                # Draw glow
-                glow_surf = pygame.Surface((radius * 4, radius * 4), pygame.SRCALPHA)
-                pygame.draw.circle(glow_surf, (*loot["color"], 60), (radius * 2, radius * 2), radius * 2)
-                screen.blit(glow_surf, (lx_scr - radius * 2, ly_scr - radius * 2))
 
             cx, cy = CX, CY
             for i, item in enumerate(carried_items):
-                world_angle = player.rotation + item["rel_angle"]
+                world_angle = view_rotation + item["rel_angle"]
                 ix = cx + int(math.sin(world_angle) * item["length"])
                 iy = cy + int(-math.cos(world_angle) * item["length"])
-                pygame.draw.line(screen, (120, 120, 120), (cx, cy), (ix, iy), 2)
-                pygame.draw.circle(screen, tuple(item["color"]), (ix, iy), 6)
-                
+
                 # Show resource name on hover
                 if math.hypot(mouse_pos[0] - ix, mouse_pos[1] - iy) < 15:
-                    name_surf = font.render(item["mat"], True, (255, 255, 255))
+                    name_surf = text_cache.render(font, item["mat"], True, (255, 255, 255))
                     name_bg = pygame.Rect(mouse_pos[0] + 15, mouse_pos[1] - 10, name_surf.get_width() + 8, name_surf.get_height() + 4)
                     pygame.draw.rect(screen, (40, 40, 60), name_bg, border_radius=4)
                     pygame.draw.rect(screen, (200, 200, 255), name_bg, 1, border_radius=4)
@@ -2123,8 +4055,8 @@ def main():
                     # Drop resource on click
                     if mouse_clicked:
                         # Create floating loot at player position
-                        angle = random.uniform(0, 2*math.pi)
-                        speed = random.uniform(100, 150)  # Faster throw speed
+                        angle = simulation.rng.uniform(0, 2*math.pi)
+                        speed = simulation.rng.uniform(100, 150)  # Faster throw speed
                         gs["floating_loot"].append({
                             "mat": item["mat"],
                             "x": gs["worldxposition"],
@@ -2142,7 +4074,7 @@ def main():
             storage_used = len(carried_items)
             
             # Top right - Money display (big and visible with decimals)
-            money_font = pygame.font.SysFont(None, 48)
+            # Money and speed change from frame to frame, rendering them directly keeps them out of text_cache
             money_text = money_font.render(f"${gs['currency_display']:.2f}", True, (255, 220, 100))
             money_bg = pygame.Rect(SCREEN_W - money_text.get_width() - 30, 10, money_text.get_width() + 20, money_text.get_height() + 10)
             pygame.draw.rect(screen, (40, 40, 60, 200), money_bg, border_radius=8)
@@ -2150,21 +4082,30 @@ def main():
             screen.blit(money_text, (SCREEN_W - money_text.get_width() - 20, 15))
             
             # Top left - Speed and Storage (styled like money)
-            info_font = pygame.font.SysFont(None, 36)
-            speed_text = info_font.render(f"Speed: {speed:.0f}", True, (100, 255, 255))
+            speed_text = medium_font.render(f"Speed: {speed:.0f}", True, (100, 255, 255))
             speed_bg = pygame.Rect(15, 15, speed_text.get_width() + 20, speed_text.get_height() + 8)
             pygame.draw.rect(screen, (30, 40, 50, 200), speed_bg, border_radius=6)
             pygame.draw.rect(screen, (100, 255, 255), speed_bg, 2, border_radius=6)
             screen.blit(speed_text, (25, 19))
             
-            cargo_text = info_font.render(f"Cargo: {storage_used}/{storage_capacity}", True, (255, 180, 100))
+            cargo_text = text_cache.render(medium_font, f"Cargo: {storage_used}/{storage_capacity}", True, (255, 180, 100))
             cargo_bg = pygame.Rect(15, 70, cargo_text.get_width() + 20, cargo_text.get_height() + 8)
             pygame.draw.rect(screen, (30, 40, 50, 200), cargo_bg, border_radius=6)
             pygame.draw.rect(screen, (255, 180, 100), cargo_bg, 2, border_radius=6)
             screen.blit(cargo_text, (25, 74))
             
-            screen.blit(font.render("ESC = Menu | C = Cosmetics | S = Settings", True, (150, 150, 150)), (10, SCREEN_H - 30))
-            
+            screen.blit(text_cache.render(font, "ESC = Menu | C = Cosmetics | S = Settings", True, (150, 150, 150)), (10, SCREEN_H - 30))
+
+            # Bottom right - Minimap of the other players in multiplayer
+            if network_client.connected:
+                draw_minimap(screen, SCREEN_W - MINIMAP_SIZE - 20, SCREEN_H - MINIMAP_SIZE - 40,
+                             view_x, view_y, network_client.get_minimap_positions())
+                net = network_client.stats
+                if net["dropped"] or net["oversized"]:
+                    text = text_cache.render(font, f"{net['dropped']} dropped, {net['oversized']} oversized",
+                                             True, (150, 150, 150))
+                    screen.blit(text, (SCREEN_W - text.get_width() - 20, SCREEN_H - MINIMAP_SIZE - 64))
+
             # Open cosmetics menu with C key
             if KEY[pygame.K_c]:
                 current_state = STATE_COSMETICS
@@ -2175,8 +4116,7 @@ def main():
             
             # Draw "Outer Space" text animation
             if gs["outer_space_anim"] > 0:
-                outer_space_font = pygame.font.SysFont(None, 72)
-                outer_text = outer_space_font.render("< OUTER SPACE >", True, (150, 200, 255))
+                outer_text = outer_space_text
                 # Smooth drop down animation
                 text_y = -100 + (150 * gs["outer_space_anim"])
                 text_alpha = int(255 * gs["outer_space_anim"])
@@ -2205,7 +4145,7 @@ def main():
                 pygame.draw.rect(screen, border_color, panel_rect, 2, border_radius=8)
                 
                 # Quest description
-                desc_surf = font.render(quest.description, True, (255, 255, 255))
+                desc_surf = text_cache.render(font, quest.description, True, (255, 255, 255))
                 screen.blit(desc_surf, (quest_panel_x + 10, panel_y + 10))
                 
                 # Progress bar
@@ -2219,20 +4159,20 @@ def main():
                     pygame.draw.rect(screen, border_color, (bar_x, bar_y, int(bar_w * progress), bar_h), border_radius=3)
                 
                 # Progress text
-                progress_text = font.render(f"{quest.progress}/{quest.target}", True, (255, 255, 255))
+                progress_text = text_cache.render(font, f"{quest.progress}/{quest.target}", True, (255, 255, 255))
                 screen.blit(progress_text, (bar_x + bar_w//2 - progress_text.get_width()//2, bar_y + 1))
                 
                 # Reward
                 if quest.reward_type == "money":
-                    reward_surf = font.render(f"Reward: ${quest.money_reward}", True, (255, 220, 100))
+                    reward_surf = text_cache.render(font, f"Reward: ${quest.money_reward}", True, (255, 220, 100))
                 else:
                     reward_icon = "🚀" if quest.reward_type == "ship" else "🔥"
-                    reward_surf = font.render(f"Reward: {reward_icon} Cosmetic", True, (255, 220, 100))
+                    reward_surf = text_cache.render(font, f"Reward: {reward_icon} Cosmetic", True, (255, 220, 100))
                 screen.blit(reward_surf, (quest_panel_x + 10, panel_y + 60))
                 
                 # Claim button if completed and not claimed
                 if quest.completed and not quest.claimed:
-                    claim_text = font.render("CLAIM!", True, (100, 255, 100))
+                    claim_text = text_cache.render(font, "CLAIM!", True, (100, 255, 100))
                     claim_rect = pygame.Rect(quest_panel_x + quest_panel_w - 70, panel_y + 55, 60, 25)
                     pygame.draw.rect(screen, (60, 120, 60), claim_rect, border_radius=5)
                     screen.blit(claim_text, (claim_rect.x + 8, claim_rect.y + 5))
@@ -2259,7 +4199,7 @@ def main():
                             if quest.reward_type == "ship":
                                 available_ships = [s for s in SHIP_COSMETICS.keys() if s not in cosmetics["unlocked_ships"]]
                                 if available_ships:
-                                    new_ship = random.choice(available_ships)
+                                    new_ship = simulation.rng.choice(available_ships)
                                     cosmetics["unlocked_ships"].append(new_ship)
                                     floating_texts.append({
                                         "text": f"Unlocked {SHIP_COSMETICS[new_ship]['name']}!",
@@ -2274,7 +4214,7 @@ def main():
                             else:  # fire
                                 available_fires = [f for f in FIRE_COSMETICS.keys() if f not in cosmetics["unlocked_fires"]]
                                 if available_fires:
-                                    new_fire = random.choice(available_fires)
+                                    new_fire = simulation.rng.choice(available_fires)
                                     cosmetics["unlocked_fires"].append(new_fire)
                                     floating_texts.append({
                                         "text": f"Unlocked {FIRE_COSMETICS[new_fire]['name']}!",
@@ -2300,17 +4240,17 @@ def main():
                 pygame.draw.rect(screen, (40, 40, 60, 200), cooldown_rect, border_radius=8)
                 pygame.draw.rect(screen, (150, 150, 150), cooldown_rect, 2, border_radius=8)
                 
-                cooldown_text = font.render("New Quest In:", True, (200, 200, 200))
+                cooldown_text = text_cache.render(font, "New Quest In:", True, (200, 200, 200))
                 screen.blit(cooldown_text, (quest_panel_x + 10, cooldown_y + 10))
                 
                 minutes = int(gs["quest_cooldown"] // 60)
                 seconds = int(gs["quest_cooldown"] % 60)
-                time_text = medium_font.render(f"{minutes}:{seconds:02d}", True, (255, 220, 100))
+                time_text = text_cache.render(medium_font, f"{minutes}:{seconds:02d}", True, (255, 220, 100))
                 screen.blit(time_text, (quest_panel_x + quest_panel_w//2 - time_text.get_width()//2, cooldown_y + 35))
             
             pdist = math.hypot(gs["worldxposition"] - base_x, gs["worldyposition"] - base_y)
             if pdist <= base_sell_radius:
-                sell_text = font.render("At base: E = sell, click upgrade below", True, (180, 180, 255))
+                sell_text = text_cache.render(font, "At base: E = sell, click upgrade below", True, (180, 180, 255))
                 screen.blit(sell_text, (SCREEN_W//2 - 160, 10))
 
                 # Different base costs and multipliers for each upgrade
@@ -2336,9 +4276,9 @@ def main():
                         color = (120, 220, 255)
                     pygame.draw.rect(screen, color, rect, border_radius=12)
                     pygame.draw.rect(screen, (200, 200, 255), rect, 2, border_radius=12)
-                    name_surf = font.render(f"{upg_names[i]} (Lv {upgrades[list(upgrades.keys())[i]]+1})", True, (255,255,255))
-                    cost_surf = font.render(f"Cost: {upg_costs[i]:.2f}", True, (255,255,0) if gs["currency"] >= upg_costs[i] else (180,100,100))
-                    desc_surf = font.render(upg_descs[i], True, (200,255,255))
+                    name_surf = text_cache.render(font, f"{upg_names[i]} (Lv {upgrades[list(upgrades.keys())[i]]+1})", True, (255,255,255))
+                    cost_surf = text_cache.render(font, f"Cost: {upg_costs[i]:.2f}", True, (255,255,0) if gs["currency"] >= upg_costs[i] else (180,100,100))
+                    desc_surf = text_cache.render(font, upg_descs[i], True, (200,255,255))
                     screen.blit(name_surf, (bx+12, by+12))
                     screen.blit(cost_surf, (bx+12, by+36))
                     screen.blit(desc_surf, (bx+12, by+60))
@@ -2352,7 +4292,7 @@ def main():
                 dist_to_zone = math.hypot(gs["worldxposition"] - drop_zone_x, gs["worldyposition"] - drop_zone_y)
                 if dist_to_zone < drop_zone_radius:
                     # Show prompt
-                    prompt_text = font.render("Press Q to view Build Quest", True, (100, 255, 100))
+                    prompt_text = text_cache.render(font, "Press Q to view Build Quest", True, (100, 255, 100))
                     screen.blit(prompt_text, (SCREEN_W//2 - prompt_text.get_width()//2, 50))
                     
                     # Show quest panel when Q is pressed
@@ -2366,21 +4306,21 @@ def main():
                         pygame.draw.rect(screen, (40, 40, 60, 230), panel_rect, border_radius=12)
                         pygame.draw.rect(screen, (100, 255, 100), panel_rect, 3, border_radius=12)
                         
-                        title_surf = medium_font.render("BUILD POWER SHOP", True, (100, 255, 100))
+                        title_surf = text_cache.render(medium_font, "BUILD POWER SHOP", True, (100, 255, 100))
                         screen.blit(title_surf, (panel_x + panel_w//2 - title_surf.get_width()//2, panel_y + 15))
                         
-                        desc_surf = font.render("Drop materials in the zone:", True, (200, 200, 200))
+                        desc_surf = text_cache.render(font, "Drop materials in the zone:", True, (200, 200, 200))
                         screen.blit(desc_surf, (panel_x + 20, panel_y + 60))
                         
                         # Required materials
-                        required_mats = {"Iron": 10, "Copper": 5, "Titanium": 3, "Uranium": 2, "Power Core": 1}
+                        required_mats = POWER_SHOP_MATERIALS
                         stored_mats = gs["power_shop_materials"]
                         
                         y_offset = panel_y + 95
                         for mat, qty in required_mats.items():
                             have = stored_mats.get(mat, 0)
                             color = (100, 255, 100) if have >= qty else (255, 180, 100)
-                            req_surf = font.render(f"{mat}: {have}/{qty}", True, color)
+                            req_surf = text_cache.render(font, f"{mat}: {have}/{qty}", True, color)
                             screen.blit(req_surf, (panel_x + 30, y_offset))
                             
                             # Progress bar
@@ -2398,7 +4338,7 @@ def main():
                         # Check if complete
                         has_all = all(stored_mats.get(mat, 0) >= qty for mat, qty in required_mats.items())
                         if has_all:
-                            complete_surf = medium_font.render("COMPLETE! Building...", True, (100, 255, 100))
+                            complete_surf = text_cache.render(medium_font, "COMPLETE! Building...", True, (100, 255, 100))
                             screen.blit(complete_surf, (panel_x + panel_w//2 - complete_surf.get_width()//2, panel_y + panel_h - 40))
                             # Auto-complete after showing
                             for mat in required_mats:
@@ -2412,7 +4352,6 @@ def main():
                     for it in carried_items:
                         counts[it["mat"]] = counts.get(it["mat"], 0) + 1
                         # Create coin animation
-                        angle = random.uniform(0, 2*math.pi)
                         gs["coin_animations"].append({
                             "x": CX,
                             "y": CY,
@@ -2436,18 +4375,22 @@ def main():
             if upgrades.get("powers_unlocked", False):
                 ps_dist = math.hypot(gs["worldxposition"] - power_shop_x, gs["worldyposition"] - power_shop_y)
                 if ps_dist <= power_shop_radius:
-                    ps_text = font.render("At Power Shop: Press P to enter", True, (255, 150, 255))
+                    ps_text = text_cache.render(font, "At Power Shop: Press P to enter", True, (255, 150, 255))
                     screen.blit(ps_text, (SCREEN_W//2 - ps_text.get_width()//2, 40))
                     
                     if KEY[pygame.K_p]:
                         current_state = STATE_POWER_SHOP
 
+            profiler.lap("hud")
+            profiler.draw(screen, font)
+            profiler.lap("overlay")
+
         # ==================== LAN BROWSER STATE ====================
         elif current_state == STATE_LAN_BROWSER:
-            title = title_font.render("LAN GAMES", True, (255, 220, 100))
+            title = text_cache.render(title_font, "LAN GAMES", True, (255, 220, 100))
             screen.blit(title, (CX - title.get_width() // 2, 100))
             
-            info_text = font.render("Scanning local network for games...", True, (200, 200, 200))
+            info_text = text_cache.render(font, "Scanning local network for games...", True, (200, 200, 200))
             screen.blit(info_text, (CX - info_text.get_width() // 2, 200))
             
             # Note: Actual LAN discovery would require UDP broadcast
@@ -2463,17 +4406,17 @@ def main():
                 pygame.draw.rect(screen, (60, 60, 120), rect, border_radius=5)
                 pygame.draw.rect(screen, (100, 100, 200), rect, 2, border_radius=5)
                 
-                name_surf = medium_font.render(game["name"], True, (255, 255, 255))
+                name_surf = text_cache.render(medium_font, game["name"], True, (255, 255, 255))
                 screen.blit(name_surf, (rect.x + 15, rect.y + 8))
                 
-                addr_surf = font.render(f"{game['host']}:{game['port']}", True, (180, 180, 180))
+                addr_surf = text_cache.render(font, f"{game['host']}:{game['port']}", True, (180, 180, 180))
                 screen.blit(addr_surf, (rect.x + 15, rect.y + 32))
                 
                 if rect.collidepoint(mouse_pos) and mouse_clicked:
                     mp_status = "Connecting..."
                     try:
                         if network_client.connect(game["host"], game["port"], settings["player_name"], settings["ship_color_index"]):
-                            game_state = create_new_game_state()
+                            game_state = create_new_game_state(settings["asteroid_backend"])
                             current_world_name = "Multiplayer"
                             current_state = STATE_PLAYING
                             mp_status = ""
@@ -2490,15 +4433,15 @@ def main():
                 mp_status = ""
             
             if mp_status:
-                status_surf = font.render(mp_status, True, (255, 200, 100))
+                status_surf = text_cache.render(font, mp_status, True, (255, 200, 100))
                 screen.blit(status_surf, (CX - status_surf.get_width() // 2, SCREEN_H - 150))
 
         # ==================== PUBLIC SERVERS STATE ====================
         elif current_state == STATE_PUBLIC_SERVERS:
-            title = title_font.render("PUBLIC SERVERS", True, (255, 220, 100))
+            title = text_cache.render(title_font, "PUBLIC SERVERS", True, (255, 220, 100))
             screen.blit(title, (CX - title.get_width() // 2, 100))
             
-            info_text = font.render("Official game servers - anyone can join!", True, (200, 200, 200))
+            info_text = text_cache.render(font, "Official game servers - anyone can join!", True, (200, 200, 200))
             screen.blit(info_text, (CX - info_text.get_width() // 2, 160))
             
             list_y = 240
@@ -2508,24 +4451,24 @@ def main():
                 pygame.draw.rect(screen, (60, 80, 120), rect, border_radius=8)
                 pygame.draw.rect(screen, (100, 150, 255), rect, 2, border_radius=8)
                 
-                name_surf = medium_font.render(server["name"], True, (255, 255, 255))
+                name_surf = text_cache.render(medium_font, server["name"], True, (255, 255, 255))
                 screen.blit(name_surf, (rect.x + 20, rect.y + 12))
                 
-                addr_surf = font.render(f"{server['host']}:{server['port']}", True, (180, 180, 180))
+                addr_surf = text_cache.render(font, f"{server['host']}:{server['port']}", True, (180, 180, 180))
                 screen.blit(addr_surf, (rect.x + 20, rect.y + 42))
                 
                 # Join button
                 join_btn_rect = pygame.Rect(rect.x + rect.w - 100, rect.y + 15, 80, 40)
                 join_color = (80, 180, 80) if join_btn_rect.collidepoint(mouse_pos) else (60, 140, 60)
                 pygame.draw.rect(screen, join_color, join_btn_rect, border_radius=6)
-                join_text = font.render("JOIN", True, (255, 255, 255))
+                join_text = text_cache.render(font, "JOIN", True, (255, 255, 255))
                 screen.blit(join_text, (join_btn_rect.centerx - join_text.get_width()//2, join_btn_rect.centery - join_text.get_height()//2))
                 
                 if join_btn_rect.collidepoint(mouse_pos) and mouse_clicked:
                     mp_status = f"Connecting to {server['name']}..."
                     try:
                         if network_client.connect(server["host"], server["port"], settings["player_name"], settings["ship_color_index"]):
-                            game_state = create_new_game_state()
+                            game_state = create_new_game_state(settings["asteroid_backend"])
                             current_world_name = "Multiplayer"
                             current_state = STATE_PLAYING
                             mp_status = ""
@@ -2542,7 +4485,7 @@ def main():
                 mp_status = ""
             
             if mp_status:
-                status_surf = font.render(mp_status, True, (255, 200, 100))
+                status_surf = text_cache.render(font, mp_status, True, (255, 200, 100))
                 screen.blit(status_surf, (CX - status_surf.get_width() // 2, SCREEN_H - 150))
 
         # ==================== CONFIRM EXIT STATE ====================
@@ -2558,10 +4501,10 @@ def main():
             pygame.draw.rect(screen, (40, 40, 60), dialog_rect, border_radius=12)
             pygame.draw.rect(screen, (200, 200, 255), dialog_rect, 3, border_radius=12)
             
-            title_text = medium_font.render("Save and Exit?", True, (255, 255, 255))
+            title_text = text_cache.render(medium_font, "Save and Exit?", True, (255, 255, 255))
             screen.blit(title_text, (CX - title_text.get_width()//2, CY - 80))
             
-            info_text = font.render("Your progress will be saved", True, (200, 200, 200))
+            info_text = text_cache.render(font, "Your progress will be saved", True, (200, 200, 200))
             screen.blit(info_text, (CX - info_text.get_width()//2, CY - 30))
             
             # Buttons
@@ -2589,10 +4532,10 @@ def main():
             gs = game_state
             powers = gs["powers"]
             
-            title = title_font.render("SUPERPOWER SHOP", True, (255, 150, 255))
+            title = text_cache.render(title_font, "SUPERPOWER SHOP", True, (255, 150, 255))
             screen.blit(title, (CX - title.get_width() // 2, 50))
             
-            coins_text = medium_font.render(f"Coins: ${gs['currency']:.2f}", True, (255, 220, 100))
+            coins_text = text_cache.render(medium_font, f"Coins: ${gs['currency']:.2f}", True, (255, 220, 100))
             screen.blit(coins_text, (CX - coins_text.get_width() // 2, 120))
             
             # Display powers in a grid
@@ -2634,24 +4577,24 @@ def main():
                 pygame.draw.rect(screen, (200, 200, 255), rect, 2, border_radius=10)
                 
                 # Power name
-                name_surf = font.render(power_data["name"], True, (255, 255, 255))
+                name_surf = text_cache.render(font, power_data["name"], True, (255, 255, 255))
                 screen.blit(name_surf, (px + 10, py + 10))
                 
                 # Description
-                desc_surf = font.render(power_data["description"], True, (200, 200, 200))
+                desc_surf = text_cache.render(font, power_data["description"], True, (200, 200, 200))
                 screen.blit(desc_surf, (px + 10, py + 35))
                 
                 # Level/Cost info
                 if owned:
-                    level_surf = font.render(f"Level: {level}/{max_level}", True, (255, 255, 100))
+                    level_surf = text_cache.render(font, f"Level: {level}/{max_level}", True, (255, 255, 100))
                     screen.blit(level_surf, (px + 10, py + 60))
                     
                     if level < max_level:
                         upgrade_cost = int(power_data["base_cost"] * (power_data["upgrade_cost_mult"] ** level))
-                        cost_surf = font.render(f"Upgrade: ${upgrade_cost}", True, (255, 255, 0) if gs["currency"] >= upgrade_cost else (180, 100, 100))
+                        cost_surf = text_cache.render(font, f"Upgrade: ${upgrade_cost}", True, (255, 255, 0) if gs["currency"] >= upgrade_cost else (180, 100, 100))
                         screen.blit(cost_surf, (px + 10, py + 85))
                     else:
-                        max_surf = font.render("MAX LEVEL", True, (100, 255, 100))
+                        max_surf = text_cache.render(font, "MAX LEVEL", True, (100, 255, 100))
                         screen.blit(max_surf, (px + 10, py + 85))
                     
                     # Equip button
@@ -2659,13 +4602,13 @@ def main():
                         equip_btn = pygame.Rect(px + 10, py + 115, 120, 50)
                         equip_color = (100, 200, 100) if equip_btn.collidepoint(mouse_pos) else (60, 150, 60)
                         pygame.draw.rect(screen, equip_color, equip_btn, border_radius=8)
-                        equip_text = font.render("EQUIP", True, (255, 255, 255))
+                        equip_text = text_cache.render(font, "EQUIP", True, (255, 255, 255))
                         screen.blit(equip_text, (equip_btn.centerx - equip_text.get_width()//2, equip_btn.centery - equip_text.get_height()//2))
                         
                         if equip_btn.collidepoint(mouse_pos) and mouse_clicked:
                             powers["equipped"] = power_id
                     else:
-                        equipped_surf = font.render("EQUIPPED", True, (100, 255, 100))
+                        equipped_surf = text_cache.render(font, "EQUIPPED", True, (100, 255, 100))
                         screen.blit(equipped_surf, (px + 10, py + 130))
                     
                     # Upgrade button
@@ -2675,7 +4618,7 @@ def main():
                         can_afford = gs["currency"] >= upgrade_cost
                         upgrade_color = (200, 150, 50) if upgrade_btn.collidepoint(mouse_pos) and can_afford else (120, 90, 30) if can_afford else (60, 60, 60)
                         pygame.draw.rect(screen, upgrade_color, upgrade_btn, border_radius=8)
-                        upgrade_text = font.render("UPGRADE", True, (255, 255, 255) if can_afford else (120, 120, 120))
+                        upgrade_text = text_cache.render(font, "UPGRADE", True, (255, 255, 255) if can_afford else (120, 120, 120))
                         screen.blit(upgrade_text, (upgrade_btn.centerx - upgrade_text.get_width()//2, upgrade_btn.centery - upgrade_text.get_height()//2))
                         
                         if upgrade_btn.collidepoint(mouse_pos) and mouse_clicked and can_afford:
@@ -2684,14 +4627,14 @@ def main():
                 else:
                     # Buy button
                     buy_cost = power_data["base_cost"]
-                    cost_surf = font.render(f"Cost: ${buy_cost}", True, (255, 255, 0) if gs["currency"] >= buy_cost else (180, 100, 100))
+                    cost_surf = text_cache.render(font, f"Cost: ${buy_cost}", True, (255, 255, 0) if gs["currency"] >= buy_cost else (180, 100, 100))
                     screen.blit(cost_surf, (px + 10, py + 60))
                     
                     buy_btn = pygame.Rect(px + 10, py + 115, 260, 50)
                     can_afford = gs["currency"] >= buy_cost
                     buy_color = (180, 80, 255) if buy_btn.collidepoint(mouse_pos) and can_afford else (120, 50, 180) if can_afford else (60, 60, 60)
                     pygame.draw.rect(screen, buy_color, buy_btn, border_radius=8)
-                    buy_text = medium_font.render("BUY POWER", True, (255, 255, 255) if can_afford else (120, 120, 120))
+                    buy_text = text_cache.render(medium_font, "BUY POWER", True, (255, 255, 255) if can_afford else (120, 120, 120))
                     screen.blit(buy_text, (buy_btn.centerx - buy_text.get_width()//2, buy_btn.centery - buy_text.get_height()//2))
                     
                     if buy_btn.collidepoint(mouse_pos) and mouse_clicked and can_afford:
@@ -2711,11 +4654,11 @@ def main():
             gs = game_state
             cosmetics = gs["cosmetics"]
             
-            title = title_font.render("COSMETICS", True, (255, 220, 100))
+            title = text_cache.render(title_font, "COSMETICS", True, (255, 220, 100))
             screen.blit(title, (CX - title.get_width() // 2, 50))
             
             # Ship selection section
-            ship_title = medium_font.render("Ship Design", True, (200, 200, 255))
+            ship_title = text_cache.render(medium_font, "Ship Design", True, (200, 200, 255))
             screen.blit(ship_title, (CX - 400, 150))
             
             ship_y = 200
@@ -2731,17 +4674,19 @@ def main():
                     pygame.draw.rect(screen, color, rect, border_radius=8)
                     pygame.draw.rect(screen, (200, 200, 255), rect, 2, border_radius=8)
                     
-                    name_surf = font.render(ship_data["name"], True, (255, 255, 255))
+                    name_surf = text_cache.render(font, ship_data["name"], True, (255, 255, 255))
                     screen.blit(name_surf, (rect.x + 15, rect.y + 20))
+                    preview = world_renderer.ship_sprites.sprite(ship_id, SHIP_COLORS[settings["ship_color_index"]][1], 0)
+                    screen.blit(preview, preview.get_rect(center=(rect.x + 170, rect.centery)))
                     
                     if is_equipped:
-                        equipped_surf = font.render("EQUIPPED", True, (100, 255, 100))
+                        equipped_surf = text_cache.render(font, "EQUIPPED", True, (100, 255, 100))
                         screen.blit(equipped_surf, (rect.x + rect.w - 100, rect.y + 20))
                     else:
                         equip_btn = pygame.Rect(rect.x + rect.w - 90, rect.y + 15, 75, 30)
                         equip_color = (100, 200, 100) if equip_btn.collidepoint(mouse_pos) else (60, 150, 60)
                         pygame.draw.rect(screen, equip_color, equip_btn, border_radius=5)
-                        equip_text = font.render("EQUIP", True, (255, 255, 255))
+                        equip_text = text_cache.render(font, "EQUIP", True, (255, 255, 255))
                         screen.blit(equip_text, (equip_btn.centerx - equip_text.get_width()//2, equip_btn.centery - equip_text.get_height()//2))
                         
                         if equip_btn.collidepoint(mouse_pos) and mouse_clicked:
@@ -2750,7 +4695,7 @@ def main():
                     ship_y += 70
             
             # Fire trail selection section
-            fire_title = medium_font.render("Fire Trail", True, (255, 180, 100))
+            fire_title = text_cache.render(medium_font, "Fire Trail", True, (255, 180, 100))
             screen.blit(fire_title, (CX + 50, 150))
             
             fire_y = 200
@@ -2766,17 +4711,17 @@ def main():
                     pygame.draw.rect(screen, color, rect, border_radius=8)
                     pygame.draw.rect(screen, (255, 180, 100), rect, 2, border_radius=8)
                     
-                    name_surf = font.render(fire_data["name"], True, (255, 255, 255))
+                    name_surf = text_cache.render(font, fire_data["name"], True, (255, 255, 255))
                     screen.blit(name_surf, (rect.x + 15, rect.y + 20))
                     
                     if is_equipped:
-                        equipped_surf = font.render("EQUIPPED", True, (255, 200, 100))
+                        equipped_surf = text_cache.render(font, "EQUIPPED", True, (255, 200, 100))
                         screen.blit(equipped_surf, (rect.x + rect.w - 100, rect.y + 20))
                     else:
                         equip_btn = pygame.Rect(rect.x + rect.w - 90, rect.y + 15, 75, 30)
                         equip_color = (200, 150, 50) if equip_btn.collidepoint(mouse_pos) else (150, 100, 30)
                         pygame.draw.rect(screen, equip_color, equip_btn, border_radius=5)
-                        equip_text = font.render("EQUIP", True, (255, 255, 255))
+                        equip_text = text_cache.render(font, "EQUIP", True, (255, 255, 255))
                         screen.blit(equip_text, (equip_btn.centerx - equip_text.get_width()//2, equip_btn.centery - equip_text.get_height()//2))
                         
                         if equip_btn.collidepoint(mouse_pos) and mouse_clicked:
@@ -2785,7 +4730,7 @@ def main():
                     fire_y += 70
             
             # Info text
-            info_text = font.render("Complete quests to unlock more cosmetics!", True, (180, 180, 180))
+            info_text = text_cache.render(font, "Complete quests to unlock more cosmetics!", True, (180, 180, 180))
             screen.blit(info_text, (CX - info_text.get_width()//2, SCREEN_H - 120))
             
             # Back button
@@ -2799,7 +4744,32 @@ def main():
             if pygame.key.get_pressed()[pygame.K_ESCAPE]:
                 current_state = STATE_PLAYING
 
-        pygame.display.flip()
+        profiler.lap("ui")
+        if in_menu:
+            # Composite the background and the menu layer, pushing only what moved when the menu is unchanged
+            screen = display_surface
+            if frame_state in MENU_BACKGROUND_STATES:
+                menu_background.update(dt)
+            if draw_ui:
+                screen.fill(MENU_BG_COLOR)
+                if frame_state in MENU_BACKGROUND_STATES:
+                    menu_background.draw(screen)
+                screen.blit(menu_layer.surface, (0, 0))
+                pygame.display.flip()
+            elif frame_state in MENU_BACKGROUND_STATES:
+                dirty = menu_background.last_rects
+                for rect in dirty:
+                    screen.fill(MENU_BG_COLOR, rect)
+                dirty = menu_background.draw(screen)
+                for rect in dirty:
+                    screen.blit(menu_layer.surface, rect, rect)
+                pygame.display.update(dirty)
+        else:
+            # Timed before the flip, which waits for the vertical blank under vsync
+            resolution.adjust((time.perf_counter() - frame_start) * 1000.0, dt)
+            pygame.display.flip()
+        profiler.lap("flip")
+        profiler.end_frame(dt)
 
     if current_state == STATE_PLAYING and current_world_name and game_state:
         save_world(current_world_name, game_state)
@@ -2807,4 +4777,6 @@ def main():
     pygame.quit()
 
 if __name__ == "__main__":
+    if "--headless" in sys.argv:
+        sys.exit(headless_main(sys.argv[1:]))
     main()
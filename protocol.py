@@ -0,0 +1,287 @@
+"""
+Asteroid Miner wire protocol
+Binary player update and state messages shared by NetworkClient and GameServer
+
+join, joined and leave stay JSON. A client that sends "protocol": PROTOCOL_VERSION
+in its join and gets the same back in joined switches to these messages, anyone
+else keeps the JSON ones. Every binary message starts with a type byte below
+ord("{"), so the server tells the two apart from the first byte.
+
+States are deltas against the last state the client acknowledged in its
+updates: only players whose fields changed are sent, with just those fields,
+plus the ids of players that left. Keyframes carry everyone and replace the
+client's roster, they go out when there is no usable acknowledgement and
+periodically so packet loss can't leave a client out of step. Every player in
+a keyframe has all fields, so they go as fixed-size records with the names
+after them, which decode reads in a single pass.
+
+States only cover players near the recipient. Everyone else comes in a
+low-rate summary of coarse positions, for the minimap.
+
+Messages longer than MAX_DATAGRAM go out as numbered fragments that the
+receiver joins back together before decoding; losing any one of them loses
+the message, which deltas and keyframes already recover from.
+"""
+import math
+import struct
+
+PROTOCOL_VERSION = 3
+
+MSG_UPDATE = 1  # Client -> server, one player's state and the last state seen
+MSG_STATE = 2  # Server -> client, changes to every nearby player's state
+MSG_SUMMARY = 3  # Server -> client, coarse positions of the players too far away for states
+MSG_FRAGMENT = 4  # One part of a message too long for a single datagram
+
+# Ship designs by wire index, index 0 doubles as the fallback for unknown names
+SHIP_DESIGNS = ("default", "arrow", "wide", "needle", "delta")
+SHIP_INDEX = {name: i for i, name in enumerate(SHIP_DESIGNS)}
+
+MAX_NAME_BYTES = 32
+
+HEADER = struct.Struct("<BBH")  # type, version, sequence
+UPDATE = struct.Struct("<HffHBB")  # ack, x, y, rotation, color_index, ship
+STATE_INFO = struct.Struct("<HBHH")  # base sequence, flags, changed players, removed players
+PLAYER_ID = struct.Struct("<HB")  # id, changed field mask
+KEYFRAME_PLAYER = struct.Struct("<HffHBBB")  # id, x, y, rotation, color_index, ship, name length
+REMOVED_ID = struct.Struct("<H")
+SUMMARY_COUNT = struct.Struct("<H")
+SUMMARY_PLAYER = struct.Struct("<Hhh")  # id, x and y in SUMMARY_SCALE units
+SUMMARY_SCALE = 16.0  # World units per summary step, positions reach +-524k
+FRAGMENT = struct.Struct("<BB")  # part index, part count
+
+MAX_DATAGRAM = 1200  # Bytes, inside the path MTU of nearly any route with IP and UDP headers added
+MAX_FRAGMENTS = 255  # So the longest message is about 300 KB
+FRAGMENT_SLOTS = 4  # Partly received messages kept at once, older ones are given up on
+
+STATE_KEYFRAME = 1
+
+# Player fields in snapshot tuple and wire order: mask bit, struct format
+FIELD_X = 1
+FIELD_Y = 2
+FIELD_ROTATION = 4
+FIELD_COLOR = 8
+FIELD_SHIP = 16
+FIELD_NAME = 32
+FIELDS = ((FIELD_X, "f"), (FIELD_Y, "f"), (FIELD_ROTATION, "H"), (FIELD_COLOR, "B"), (FIELD_SHIP, "B"),
+          (FIELD_NAME, "B"))  # The name goes as its length, the bytes follow the record
+ALL_FIELDS = 63
+FIELD_STRUCTS = [struct.Struct("<" + "".join(fmt for bit, fmt in FIELDS if mask & bit)) for mask in range(64)]
+
+ROTATION_STEPS = 65536
+SEQ_MODULO = 65536
+NO_SEQ = 0  # Never used for a message, stands for "nothing received yet"
+STATE_HISTORY = 32  # States each side keeps to delta against, 1.6 s of broadcasts
+
+
+def pack_rotation(rotation):
+    """Radians to a uint16 turn fraction, about 0.0055 degrees a step"""
+    return round(rotation % (2 * math.pi) * ROTATION_STEPS / (2 * math.pi)) % ROTATION_STEPS
+
+def unpack_rotation(value):
+    return value * 2 * math.pi / ROTATION_STEPS
+
+def next_seq(seq):
+    """Sequence numbers run 1..65535 and wrap, skipping NO_SEQ"""
+    return seq % (SEQ_MODULO - 1) + 1
+
+def seq_newer(seq, last):
+    """True when seq comes after last, allowing for the uint16 wrap"""
+    return last is None or last == NO_SEQ or 0 < (seq - last) % SEQ_MODULO < SEQ_MODULO // 2
+
+def is_binary(data):
+    return len(data) > 0 and data[0] < 0x7B  # JSON messages open with "{"
+
+
+def encode_update(seq, ack, x, y, rotation, color_index, ship):
+    """ack is the sequence of the last state applied, NO_SEQ before the first"""
+    return HEADER.pack(MSG_UPDATE, PROTOCOL_VERSION, seq) + UPDATE.pack(
+        ack, x, y, pack_rotation(rotation), color_index & 0xFF, SHIP_INDEX.get(ship, 0))
+
+def snapshot_entry(player):
+    """A player dict as the tuple of values it goes on the wire with, for comparing snapshots
+
+    x and y stay doubles, packing rounds them to float32.
+    """
+    return (player["x"], player["y"], pack_rotation(player["rotation"]), player["color_index"] & 0xFF,
+            SHIP_INDEX.get(player["ship"], 0), player["name"].encode("utf-8")[:MAX_NAME_BYTES])
+
+def encode_record(pid, entry, old=None):
+    """One player's id, field mask and the fields that differ from old, all of them without it"""
+    if old is None:
+        mask = ALL_FIELDS
+        values = entry[:5]
+    else:
+        mask = 0
+        values = []
+        for i, (bit, _) in enumerate(FIELDS[:5]):
+            if entry[i] != old[i]:
+                mask |= bit
+                values.append(entry[i])
+        if entry[5] != old[5]:
+            mask |= FIELD_NAME
+    if not mask & FIELD_NAME:
+        return PLAYER_ID.pack(pid, mask) + FIELD_STRUCTS[mask].pack(*values)
+    return PLAYER_ID.pack(pid, mask) + FIELD_STRUCTS[mask].pack(*values, len(entry[5])) + entry[5]
+
+def encode_state(seq, snapshot, base=None, base_seq=NO_SEQ, records=None):
+    """State message for snapshot ({id: snapshot_entry}) as a delta against base
+
+    With base None it is a keyframe. records, when given, caches encoded players
+    between calls for the same snapshot. Returns None when the delta would be empty.
+    """
+    if base is None:
+        return encode_keyframe(seq, snapshot, records)
+    parts = []
+    removed = []
+    for pid, entry in snapshot.items():
+        old = base.get(pid)
+        if old is entry or old == entry:
+            continue  # Idle players are left out
+        if records is None:
+            parts.append(encode_record(pid, entry, old))
+            continue
+        key = (pid, old)
+        record = records.get(key)
+        if record is None:
+            record = records[key] = encode_record(pid, entry, old)
+        parts.append(record)
+    removed = [pid for pid in base if pid not in snapshot]
+    if not parts and not removed:
+        return None
+    header = HEADER.pack(MSG_STATE, PROTOCOL_VERSION, seq) + STATE_INFO.pack(base_seq, 0, len(parts), len(removed))
+    return b"".join([header] + [REMOVED_ID.pack(pid) for pid in removed] + parts)
+
+def encode_keyframe(seq, snapshot, records=None):
+    """Keyframe state message: every player's KEYFRAME_PLAYER record, then their names back to back
+
+    records caches the records by id, like encode_state's.
+    """
+    pack = KEYFRAME_PLAYER.pack
+    if records is None:
+        parts = [pack(pid, *entry[:5], len(entry[5])) for pid, entry in snapshot.items()]
+    else:
+        parts = []
+        for pid, entry in snapshot.items():
+            record = records.get(pid)
+            if record is None:
+                record = records[pid] = pack(pid, *entry[:5], len(entry[5]))
+            parts.append(record)
+    header = HEADER.pack(MSG_STATE, PROTOCOL_VERSION, seq) + STATE_INFO.pack(NO_SEQ, STATE_KEYFRAME, len(parts), 0)
+    return b"".join([header] + parts + [entry[5] for entry in snapshot.values()])
+
+def encode_summary(seq, positions):
+    """Summary of (id, x, y) positions, clamped to the int16 range"""
+    parts = [HEADER.pack(MSG_SUMMARY, PROTOCOL_VERSION, seq), SUMMARY_COUNT.pack(len(positions))]
+    pack = SUMMARY_PLAYER.pack
+    for pid, x, y in positions:
+        parts.append(pack(pid, max(-32768, min(32767, int(round(x / SUMMARY_SCALE)))),
+                          max(-32768, min(32767, int(round(y / SUMMARY_SCALE))))))
+    return b"".join(parts)
+
+def fragment(seq, msg):
+    """msg as datagrams of at most MAX_DATAGRAM bytes, or None if it needs more than MAX_FRAGMENTS
+
+    seq numbers the fragmented message, separately from the messages themselves.
+    """
+    if len(msg) <= MAX_DATAGRAM:
+        return [msg]
+    room = MAX_DATAGRAM - HEADER.size - FRAGMENT.size
+    count = -(-len(msg) // room)
+    if count > MAX_FRAGMENTS:
+        return None
+    header = HEADER.pack(MSG_FRAGMENT, PROTOCOL_VERSION, seq)
+    return [header + FRAGMENT.pack(i, count) + msg[i * room:(i + 1) * room] for i in range(count)]
+
+
+def decode(data):
+    """(type, sequence, body) for a binary message, ValueError if it is malformed
+
+    body is a player dict with an "ack" for MSG_UPDATE. For MSG_STATE it is a
+    dict with "base" (None for keyframes), "removed" ids and "players", which
+    maps ids to dicts of just the fields that changed. For MSG_SUMMARY it is a
+    list of (id, x, y), and for MSG_FRAGMENT (index, count, payload).
+    """
+    try:
+        msg_type, version, seq = HEADER.unpack_from(data, 0)
+        if version != PROTOCOL_VERSION:
+            raise ValueError(f"unsupported protocol version {version}")
+        offset = HEADER.size
+        if msg_type == MSG_UPDATE:
+            ack, x, y, rotation, color_index, ship = UPDATE.unpack_from(data, offset)
+            return msg_type, seq, {"ack": ack, "x": x, "y": y, "rotation": unpack_rotation(rotation),
+                                   "color_index": color_index, "ship": SHIP_DESIGNS[ship % len(SHIP_DESIGNS)]}
+        if msg_type == MSG_STATE:
+            base_seq, flags, count, removed_count = STATE_INFO.unpack_from(data, offset)
+            offset += STATE_INFO.size
+            removed = [pid for (pid,) in REMOVED_ID.iter_unpack(data[offset:offset + removed_count * REMOVED_ID.size])]
+            if len(removed) != removed_count:
+                raise ValueError("truncated message: removed players")
+            offset += removed_count * REMOVED_ID.size
+            players = {}
+            turn = 2 * math.pi / ROTATION_STEPS
+            if flags & STATE_KEYFRAME:
+                end = offset + count * KEYFRAME_PLAYER.size
+                if len(data) < end:
+                    raise ValueError("truncated message: players")
+                names = bytes(data[end:])
+                start = 0
+                for pid, x, y, rotation, color_index, ship, name_len in KEYFRAME_PLAYER.iter_unpack(data[offset:end]):
+                    players[pid] = {"x": x, "y": y, "rotation": rotation * turn, "color_index": color_index,
+                                    "ship": SHIP_DESIGNS[ship % len(SHIP_DESIGNS)],
+                                    "name": names[start:start + name_len].decode("utf-8", "replace")}
+                    start += name_len
+                if len(names) < start:
+                    raise ValueError("truncated message: player names")
+                return msg_type, seq, {"base": None, "removed": removed, "players": players}
+            for _ in range(count):
+                pid, mask = PLAYER_ID.unpack_from(data, offset)
+                offset += PLAYER_ID.size
+                fields_struct = FIELD_STRUCTS[mask & ALL_FIELDS]
+                values = fields_struct.unpack_from(data, offset)
+                offset += fields_struct.size
+                if mask == ALL_FIELDS:  # Players joining, who come with everything
+                    x, y, rotation, color_index, ship, name_len = values
+                    end = offset + name_len
+                    if len(data) < end:
+                        raise ValueError("truncated message: player name")
+                    players[pid] = {"x": x, "y": y, "rotation": rotation * turn, "color_index": color_index,
+                                    "ship": SHIP_DESIGNS[ship % len(SHIP_DESIGNS)],
+                                    "name": bytes(data[offset:end]).decode("utf-8", "replace")}
+                    offset = end
+                    continue
+                values = iter(values)
+                player = {}
+                if mask & FIELD_X:
+                    player["x"] = next(values)
+                if mask & FIELD_Y:
+                    player["y"] = next(values)
+                if mask & FIELD_ROTATION:
+                    player["rotation"] = next(values) * turn
+                if mask & FIELD_COLOR:
+                    player["color_index"] = next(values)
+                if mask & FIELD_SHIP:
+                    player["ship"] = SHIP_DESIGNS[next(values) % len(SHIP_DESIGNS)]
+                if mask & FIELD_NAME:
+                    name_len = next(values)
+                    if len(data) < offset + name_len:
+                        raise ValueError("truncated message: player name")
+                    player["name"] = bytes(data[offset:offset + name_len]).decode("utf-8", "replace")
+                    offset += name_len
+                players[pid] = player
+            return msg_type, seq, {"base": base_seq, "removed": removed, "players": players}
+        if msg_type == MSG_SUMMARY:
+            (count,) = SUMMARY_COUNT.unpack_from(data, offset)
+            offset += SUMMARY_COUNT.size
+            end = offset + count * SUMMARY_PLAYER.size
+            if len(data) < end:
+                raise ValueError("truncated message: summary")
+            return msg_type, seq, [(pid, x * SUMMARY_SCALE, y * SUMMARY_SCALE)
+                                   for pid, x, y in SUMMARY_PLAYER.iter_unpack(data[offset:end])]
+        if msg_type == MSG_FRAGMENT:
+            index, count = FRAGMENT.unpack_from(data, offset)
+            if index >= count:
+                raise ValueError(f"fragment {index} of {count}")
+            return msg_type, seq, (index, count, bytes(data[offset + FRAGMENT.size:]))
+    except struct.error as e:
+        raise ValueError(f"truncated message: {e}")
+    raise ValueError(f"unknown message type {msg_type}")
@@ -1,17 +1,48 @@
 import socket
+import selectors
 import threading
 import json
 import time
+import protocol
+
+RECV_BUFFER = 4096
+RECV_SOCKET_BUFFER = 1024 * 1024  # Kernel queue for bursts between wakeups
+MAX_DATAGRAMS_PER_WAKEUP = 1024  # Keeps broadcasts on time under a flood
+LEGACY_MAX_DATAGRAM = 4096  # What JSON-only clients read per datagram
+DEFAULT_INTEREST_RADIUS = 1500.0  # World units, a 1080p screen is 1920 wide and ships draw 100 px past it
 
 class GameServer:
-    def __init__(self, host="0.0.0.0", port=5555):
+    def __init__(self, host="0.0.0.0", port=5555, interest_radius=DEFAULT_INTEREST_RADIUS):
         self.host = host
-        self.port = port
         self.server = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
-        self.server.bind((self.host, self.port))
-        self.players = {}  # {addr: {name, x, y, rotation, color_index, last_seen}}
+        try:
+            self.server.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, RECV_SOCKET_BUFFER)
+        except OSError:
+            pass
+        self.server.bind((self.host, port))
+        self.port = self.server.getsockname()[1]  # The real port when bound to 0
+        self.server.setblocking(False)
+        # {addr: {pid, protocol, seq, acked, sent, last_keyframe, interest, next_summary,
+        #         name, x, y, rotation, color_index, ship, last_seen}}
+        self.players = {}
+        self.next_pid = 1  # Small integer ids for the binary protocol
+        self.broadcast_seq = 0
+        self.fragment_seq = 0
         self.running = True
         self.timeout = 5.0  # Remove players after 5 seconds of no updates
+        self.broadcast_interval = 0.05  # 20 times per second
+        self.cleanup_interval = 1.0
+        self.keyframe_interval = 1.0  # Full binary states this often per client, whatever it acknowledged
+        self.interest_radius = interest_radius  # Players get states for everyone this close
+        self.interest_hysteresis = 0.25  # ... and keep getting them until 25% farther, so edges don't flicker
+        self.summary_interval = 1.0  # Far players' positions go to binary clients this often
+        # dropped: malformed datagrams in and failed sends, oversized: messages cut or not sent for size
+        self.stats = {"packets_in": 0, "bytes_in": 0, "packets_out": 0, "bytes_out": 0, "wakeups": 0,
+                      "dropped": 0, "oversized": 0, "fragmented": 0}
+        self.reported = {"dropped": 0, "oversized": 0}
+        # stop() writes here to wake a loop blocked with nobody connected
+        self._wake_r, self._wake_w = socket.socketpair()
+        self._wake_r.setblocking(False)
 
     def cleanup_players(self):
         """Remove disconnected players"""
@@ -23,49 +54,201 @@ class GameServer:
         for addr in to_remove:
             print(f"Player {self.players[addr].get('name', 'Unknown')} timed out")
             del self.players[addr]
+        # Report packet trouble once per cleanup rather than per packet
+        dropped = self.stats["dropped"] - self.reported["dropped"]
+        oversized = self.stats["oversized"] - self.reported["oversized"]
+        if dropped or oversized:
+            print(f"Dropped {dropped} packets, {oversized} messages too large")
+            self.reported = {"dropped": self.stats["dropped"], "oversized": self.stats["oversized"]}
 
     def broadcast_state(self):
-        """Send all player states to all players"""
+        """Send every player the players near them, and binary clients a summary of the rest now and then"""
         if not self.players:
             return
         
-        # Build player list (excluding sender for each recipient)
-        all_players = []
+        # Build player list, each recipient gets the nearby part of it
+        all_players = {}
         for addr, data in self.players.items():
-            all_players.append({
+            all_players[data["pid"]] = {
                 "id": f"{addr[0]}:{addr[1]}",
+                "pid": data["pid"],
                 "name": data.get("name", "Player"),
                 "x": data.get("x", 0),
                 "y": data.get("y", 0),
                 "rotation": data.get("rotation", 0),
                 "color_index": data.get("color_index", 0),
-            })
-        
-        state_msg = json.dumps({"type": "state", "players": all_players}).encode()
-        
-        for addr in self.players.keys():
+                "ship": data.get("ship", "default"),
+            }
+
+        # Grid cells as wide as the largest interest distance, so 3x3 of them cover anyone in range
+        reach = self.interest_radius * (1 + self.interest_hysteresis)
+        grid = {}
+        for data in self.players.values():
+            cell = (int(data.get("x", 0) // reach), int(data.get("y", 0) // reach))
+            grid.setdefault(cell, []).append(data)
+
+        # The binary snapshot is built once, and only if someone needs it
+        self.broadcast_seq = protocol.next_seq(self.broadcast_seq)
+        now = time.monotonic()
+        snapshot = None
+        records = {}  # (pid, base entry), or pid in keyframes -> encoded player, shared by clients on the same base
+        json_players = {}  # pid -> JSON text, shared by the legacy clients
+        for addr, data in self.players.items():
+            near = self.interest(data, grid, reach)
+            if data["protocol"] >= 1:
+                if snapshot is None:
+                    snapshot = {pid: protocol.snapshot_entry(p) for pid, p in all_players.items()}
+                state_msg = self.binary_state(data, {pid: snapshot[pid] for pid in near}, records, now)
+                if now >= data["next_summary"]:
+                    data["next_summary"] = now + self.summary_interval
+                    far = [(pid, p["x"], p["y"]) for pid, p in all_players.items()
+                           if pid not in near and pid != data["pid"]]
+                    self.send(protocol.encode_summary(self.broadcast_seq, far), addr)
+                if state_msg is None:
+                    continue  # Nothing changed since the state this client acknowledged
+            else:
+                for pid in near:
+                    if pid not in json_players:
+                        json_players[pid] = json.dumps({k: v for k, v in all_players[pid].items() if k != "pid"})
+                shown = self.legacy_roster(data, near, all_players, json_players)
+                state_msg = ('{"type": "state", "players": [' + ", ".join(json_players[pid] for pid in shown)
+                             + "]}").encode()
+            self.send(state_msg, addr)
+
+    def legacy_roster(self, client, near, all_players, json_players):
+        """The near players, or the closest of them that fit one JSON client's receive buffer
+
+        JSON clients can't join fragments and replace their roster with every
+        state, so a roster that doesn't fit loses its farthest players instead.
+        """
+        size = 32 + sum(len(json_players[pid]) + 2 for pid in near)
+        if size <= LEGACY_MAX_DATAGRAM:
+            return near
+        self.stats["oversized"] += 1
+        x = client.get("x", 0)
+        y = client.get("y", 0)
+        shown = []
+        size = 32
+        for pid in sorted(near, key=lambda pid: (all_players[pid]["x"] - x) ** 2 + (all_players[pid]["y"] - y) ** 2):
+            size += len(json_players[pid]) + 2
+            if size > LEGACY_MAX_DATAGRAM:
+                break
+            shown.append(pid)
+        return shown
+
+    def interest(self, client, grid, reach):
+        """Ids of the players within interest_radius of client, or within reach if they already were"""
+        x = client.get("x", 0)
+        y = client.get("y", 0)
+        cx, cy = int(x // reach), int(y // reach)
+        enter = self.interest_radius * self.interest_radius
+        stay = reach * reach
+        was_near = client["interest"]
+        near = set()
+        for gx in (cx - 1, cx, cx + 1):
+            for gy in (cy - 1, cy, cy + 1):
+                for other in grid.get((gx, gy), ()):
+                    if other is client:
+                        continue
+                    d2 = (other.get("x", 0) - x) ** 2 + (other.get("y", 0) - y) ** 2
+                    if d2 <= enter or (d2 <= stay and other["pid"] in was_near):
+                        near.add(other["pid"])
+        client["interest"] = near
+        return near
+
+    def send(self, msg, addr):
+        """Send msg, as fragments of at most protocol.MAX_DATAGRAM bytes if it is a longer binary message"""
+        datagrams = [msg]
+        if len(msg) > protocol.MAX_DATAGRAM and protocol.is_binary(msg):
+            self.fragment_seq = protocol.next_seq(self.fragment_seq)
+            datagrams = protocol.fragment(self.fragment_seq, msg)
+            if datagrams is None:
+                self.stats["oversized"] += 1
+                return
+            self.stats["fragmented"] += 1
+        for datagram in datagrams:
             try:
-                self.server.sendto(state_msg, addr)
+                self.server.sendto(datagram, addr)
+                self.stats["packets_out"] += 1
+                self.stats["bytes_out"] += len(datagram)
             except:
-                pass
+                self.stats["dropped"] += 1
+
+    def binary_state(self, client, view, records, now):
+        """Delta from the client's acknowledged state to view, or a keyframe when due
+
+        Views go into the client's history as they are, so they must not be changed afterwards.
+        """
+        sent = client["sent"]
+        base = sent.get(client["acked"])
+        if base is None or now - client["last_keyframe"] >= self.keyframe_interval:
+            msg = protocol.encode_state(self.broadcast_seq, view, records=records)
+            client["last_keyframe"] = now
+        else:
+            msg = protocol.encode_state(self.broadcast_seq, view, base, client["acked"], records=records)
+            if msg is None:
+                return None
+        sent[self.broadcast_seq] = view
+        while len(sent) > protocol.STATE_HISTORY:
+            del sent[next(iter(sent))]
+        return msg
+
+    def handle_binary(self, data, addr):
+        """Apply a binary update, dropping ones from unknown senders or older than the last seen"""
+        player = self.players.get(addr)
+        if player is None:
+            return
+        try:
+            msg_type, seq, body = protocol.decode(data)
+        except ValueError:
+            self.stats["dropped"] += 1
+            return
+        if msg_type != protocol.MSG_UPDATE or not protocol.seq_newer(seq, player["seq"]):
+            return
+        ack = body.pop("ack")
+        if ack in player["sent"] and protocol.seq_newer(ack, player["acked"]):
+            player["acked"] = ack
+        player.update(body)
+        player["seq"] = seq
+        player["last_seen"] = time.time()
 
     def handle_message(self, data, addr):
+        if protocol.is_binary(data):
+            self.handle_binary(data, addr)
+            return
         try:
             msg = json.loads(data.decode())
             msg_type = msg.get("type")
 
             if msg_type == "join":
+                if addr in self.players:
+                    pid = self.players[addr]["pid"]  # A repeated join keeps its id
+                else:
+                    pid = self.next_pid
+                    self.next_pid = protocol.next_seq(self.next_pid)
+                # Clients without this binary protocol version keep JSON
+                version = protocol.PROTOCOL_VERSION if int(msg.get("protocol", 0)) >= protocol.PROTOCOL_VERSION else 0
                 self.players[addr] = {
+                    "pid": pid,
+                    "protocol": version,
+                    "seq": None,
+                    "acked": protocol.NO_SEQ,
+                    "sent": {},  # Broadcast sequence -> the snapshot this client was sent
+                    "last_keyframe": 0.0,
+                    "interest": set(),  # Ids of the players in this client's states
+                    "next_summary": 0.0,
                     "name": msg.get("name", "Player"),
                     "x": msg.get("x", 0),
                     "y": msg.get("y", 0),
                     "rotation": msg.get("rotation", 0),
                     "color_index": msg.get("color_index", 0),
+                    "ship": msg.get("ship", "default"),
                     "last_seen": time.time()
                 }
                 print(f"Player {msg.get('name')} joined from {addr}")
                 # Send confirmation
-                response = json.dumps({"type": "joined", "id": f"{addr[0]}:{addr[1]}"}).encode()
+                response = json.dumps({"type": "joined", "id": f"{addr[0]}:{addr[1]}",
+                                       "player_id": pid, "protocol": version}).encode()
                 self.server.sendto(response, addr)
 
             elif msg_type == "update":
@@ -75,6 +258,7 @@ class GameServer:
                         "y": msg.get("y", self.players[addr]["y"]),
                         "rotation": msg.get("rotation", self.players[addr]["rotation"]),
                         "color_index": msg.get("color_index", self.players[addr]["color_index"]),
+                        "ship": msg.get("ship", self.players[addr]["ship"]),
                         "last_seen": time.time()
                     })
 
@@ -83,57 +267,103 @@ class GameServer:
                     print(f"Player {self.players[addr].get('name')} left")
                     del self.players[addr]
 
-        except json.JSONDecodeError:
-            pass
+        except (json.JSONDecodeError, UnicodeDecodeError):
+            self.stats["dropped"] += 1
         except Exception as e:
             print(f"Error handling message: {e}")
 
-    def run(self):
-        print(f"Server started on {self.host}:{self.port}")
-        self.server.setblocking(False)
-        
-        last_broadcast = time.time()
-        last_cleanup = time.time()
-        broadcast_interval = 0.05  # 20 times per second
-        cleanup_interval = 1.0
-
-        while self.running:
+    def drain(self):
+        """Handle every datagram already queued, up to MAX_DATAGRAMS_PER_WAKEUP"""
+        for _ in range(MAX_DATAGRAMS_PER_WAKEUP):
             try:
-                data, addr = self.server.recvfrom(4096)
-                self.handle_message(data, addr)
+                data, addr = self.server.recvfrom(RECV_BUFFER)
             except BlockingIOError:
-                pass
+                return
+            except ConnectionResetError:
+                continue  # Windows reports an earlier send to a closed client here
             except Exception as e:
                 print(f"Error receiving: {e}")
+                return
+            self.stats["packets_in"] += 1
+            self.stats["bytes_in"] += len(data)
+            self.handle_message(data, addr)
 
-            current_time = time.time()
-            
-            # Broadcast state periodically
-            if current_time - last_broadcast >= broadcast_interval:
-                self.broadcast_state()
-                last_broadcast = current_time
+    def run(self):
+        """Sleep in select() until a datagram arrives or the next broadcast or cleanup is due
 
-            # Cleanup disconnected players
-            if current_time - last_cleanup >= cleanup_interval:
-                self.cleanup_players()
-                last_cleanup = current_time
+        With nobody connected there are no timers, so the loop blocks until someone joins.
+        """
+        print(f"Server started on {self.host}:{self.port}")
+        selector = selectors.DefaultSelector()
+        selector.register(self.server, selectors.EVENT_READ)
+        selector.register(self._wake_r, selectors.EVENT_READ)
+        next_broadcast = None
+        next_cleanup = None
 
-            time.sleep(0.01)  # Prevent CPU spinning
+        try:
+            while self.running:
+                now = time.monotonic()
+                if self.players:
+                    if next_broadcast is None:
+                        next_broadcast = now + self.broadcast_interval
+                        next_cleanup = now + self.cleanup_interval
+                    timeout = max(0.0, min(next_broadcast, next_cleanup) - now)
+                else:
+                    next_broadcast = next_cleanup = None
+                    timeout = None
+
+                for key, _ in selector.select(timeout):
+                    if key.fileobj is self.server:
+                        self.drain()
+                    else:
+                        try:
+                            self._wake_r.recv(64)
+                        except BlockingIOError:
+                            pass
+                self.stats["wakeups"] += 1
+
+                now = time.monotonic()
+                # Broadcast state on a fixed schedule, skipping ticks rather than bursting after a stall
+                if next_broadcast is not None and now >= next_broadcast:
+                    self.broadcast_state()
+                    next_broadcast += self.broadcast_interval
+                    if next_broadcast <= now:
+                        next_broadcast = now + self.broadcast_interval
+
+                # Cleanup disconnected players
+                if next_cleanup is not None and now >= next_cleanup:
+                    self.cleanup_players()
+                    next_cleanup = now + self.cleanup_interval
+        finally:
+            selector.close()
+            self.server.close()
+            self._wake_r.close()
+            self._wake_w.close()
 
     def stop(self):
+        """Ask run() to return, safe to call from another thread"""
         self.running = False
-        self.server.close()
+        try:
+            self._wake_w.send(b"\0")
+        except OSError:
+            pass
 
 if __name__ == "__main__":
     import sys
     port = 5555
+    interest_radius = DEFAULT_INTEREST_RADIUS
     if len(sys.argv) > 1:
         try:
             port = int(sys.argv[1])
         except:
             pass
+    if len(sys.argv) > 2:
+        try:
+            interest_radius = float(sys.argv[2])
+        except:
+            pass
     
-    server = GameServer(port=port)
+    server = GameServer(port=port, interest_radius=interest_radius)
     try:
         server.run()
     except KeyboardInterrupt: